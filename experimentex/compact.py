@@ -0,0 +1,142 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import exputil
+
+from rootclasses.rootclasses import retrieve_root_class_names_list, get_root_class_interpreter
+
+
+def retrieve_root_class_name_of_run_dir_name(run_dir_name):
+    """
+    Retrieve the root class of a run directory, of which the name starts with the root class name.
+
+    :param run_dir_name:  Run directory name
+
+    :return: Root class name (None if it does not belong to any root class)
+    """
+    matching = list(filter(lambda x: run_dir_name.startswith(x + "-"), retrieve_root_class_names_list()))
+    if len(matching) == 0:
+        return None
+    return max(matching, key=len)
+
+
+def is_run_dir_finished(run_dir, output_dir_names):
+    if len(output_dir_names) == 0:
+        return False
+    for output_dir_name in output_dir_names:
+        finished_filename = run_dir + "/" + output_dir_name + "/finished.txt"
+        if not os.path.exists(finished_filename):
+            return False
+        with open(finished_filename, "r") as f_in:
+            if f_in.read().strip() != "Yes":
+                return False
+    return True
+
+
+def compact(extension, min_size_byte):
+
+    print("COMPACT FINISHED RUNS")
+
+    # Runs directory
+    runs_path = "../temp/runs"
+    if not os.path.isdir(runs_path):
+        raise ValueError("Runs directory does not exist: %s" % runs_path)
+
+    # Go over all finished run directories
+    num_finished_runs = 0
+    num_compressed_files = 0
+    total_size_before_byte = 0
+    total_size_after_byte = 0
+    for run_dir_name in sorted(os.listdir(runs_path)):
+        run_dir = runs_path + "/" + run_dir_name
+        root_class_name = retrieve_root_class_name_of_run_dir_name(run_dir_name)
+        if not os.path.isdir(run_dir) or root_class_name is None:
+            continue
+        output_dir_names = get_root_class_interpreter(root_class_name).get_run_dir_output_dir_names()
+        if not is_run_dir_finished(run_dir, output_dir_names):
+            continue
+        num_finished_runs += 1
+
+        # Compress the output files, except the small ones and the finished.txt (or system_<id>_finished.txt
+        # of a distributed run) which run.sh and the interpretation check
+        for output_dir_name in output_dir_names:
+            for dir_path, _, filenames in os.walk(run_dir + "/" + output_dir_name):
+                for filename in sorted(filenames):
+                    file_path = os.path.join(dir_path, filename)
+                    if filename.endswith("finished.txt") \
+                            or filename.endswith(exputil.COMPRESSED_FILENAME_EXTENSIONS) \
+                            or filename.endswith(".tmp") \
+                            or os.path.getsize(file_path) < min_size_byte:
+                        continue
+                    total_size_before_byte += os.path.getsize(file_path)
+                    total_size_after_byte += os.path.getsize(exputil.compress_file(file_path, extension))
+                    num_compressed_files += 1
+
+    # Print statistics
+    print("  > # of finished runs......... " + str(num_finished_runs))
+    print("  > # of compressed files...... " + str(num_compressed_files))
+    if num_compressed_files > 0:
+        print("  > Size of compressed files... %.1f MB -> %.1f MB (%.1fx)" % (
+            total_size_before_byte / 1000000.0,
+            total_size_after_byte / 1000000.0,
+            total_size_before_byte / float(max(1, total_size_after_byte))
+        ))
+    print("")
+
+
+def print_usage():
+    print("Usage: python3 compact.py [--zstd] [--min-size <byte>]")
+    print("")
+    print("Compresses the output files (e.g., logs_ns3/*.csv) of all finished runs in temp/runs, which")
+    print("are afterwards read transparently by the plotters. Unfinished runs are left untouched.")
+    print("")
+    print("Optional arguments:")
+    print("   --zstd              Compress using zstd (.zst, requires zstandard) instead of gzip (.gz)")
+    print("   --min-size <byte>   Only compress files of at least this size (default: 4096)")
+    print("")
+
+
+def main():
+    args = sys.argv[1:]
+
+    # Optional arguments
+    extension = ".gz"
+    min_size_byte = 4096
+    while len(args) > 0:
+        if args[0] == "--zstd":
+            extension = ".zst"
+            args = args[1:]
+        elif args[0] == "--min-size" and len(args) >= 2:
+            min_size_byte = int(args[1])
+            args = args[2:]
+        else:
+            print_usage()
+            exit(1)
+
+    print("")
+    compact(extension, min_size_byte)
+
+
+if __name__ == "__main__":
+    main()
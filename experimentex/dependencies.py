@@ -0,0 +1,287 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import ast
+import glob
+import inspect
+import re
+from hashlib import sha256
+
+import exputil
+
+from rootclasses.rootclasses import get_root_class_plotter
+
+######################################################################
+# FRAMEWORKS
+#
+# Below you must define for each framework which files its build (step 1)
+# depends on, which paths its build produces, and which frameworks the runs
+# (and plots) of each root class depend on. A run only depends on those of
+# them which its run.sh uses (frameworks/<name>). All paths are relative to the core.
+
+framework_build_inputs = {
+    "mmfa": ["frameworks/mmfa/*.py"],
+    "ns-3-bs": [
+        "frameworks/ns-3-bs/build.sh",
+        "frameworks/ns-3-bs/*.zip",
+        "frameworks/ns-3-bs/ns-3/contrib/**",
+        "frameworks/ns-3-bs/ns-3/scratch/**",
+    ],
+    "top-lists": ["frameworks/top-lists/*.py", "frameworks/top-lists/*.sh", "frameworks/top-lists/*.tar.gz"],
+}
+
+framework_build_outputs = {
+    "mmfa": [],
+    "ns-3-bs": ["frameworks/ns-3-bs/ns-3/build"],
+    "top-lists": ["frameworks/top-lists/data", "frameworks/top-lists/pdf"],
+}
+
+root_class_to_framework_names = {
+    "mmfa": ["mmfa"],
+    "one-link-tcp": ["ns-3-bs"],
+    "load-ls": ["ns-3-bs", "mmfa"],  # mmfa for the flow-level preview runs
+    "top-lists": ["top-lists"],
+}
+
+######################################################################
+######################################################################
+######################################################################
+######################################################################
+######################################################################
+# YOU SHOULD NOT NEED TO EDIT BELOW
+
+path_to_core = ".."
+
+
+class BuildState:
+    """
+    State database of the build driver. It records for each node (build, interpret, run, plot, pdf)
+    the fingerprint of its inputs when it was last successfully built. File content hashes are cached
+    by (size, modification time), such that unchanged files do not have to be read again.
+    It is also used by plot.py to record the fingerprint of each expinclude file it plotted.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        if os.path.exists(filename):
+            with open(filename, "r") as f_in:
+                state = ast.literal_eval(f_in.read())
+            self.file_hashes = state["file_hashes"]
+            self.node_fingerprints = state["node_fingerprints"]
+        else:
+            self.file_hashes = {}
+            self.node_fingerprints = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        with open(self.filename + ".tmp", "w+") as f_out:
+            f_out.write(str({"file_hashes": self.file_hashes, "node_fingerprints": self.node_fingerprints}))
+        os.replace(self.filename + ".tmp", self.filename)
+
+    def hash_file(self, path):
+        key = os.path.relpath(path, path_to_core)
+        st = os.stat(path)
+        cached = self.file_hashes.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = sha256()
+        with open(path, "rb") as f_in:
+            for block in iter(lambda: f_in.read(1 << 20), b""):
+                h.update(block)
+        self.file_hashes[key] = (st.st_size, st.st_mtime_ns, h.hexdigest())
+        return h.hexdigest()
+
+    def hash_files(self, paths, extra=()):
+        h = sha256()
+        for path in sorted(set(paths)):
+            h.update(("%s:%s\n" % (os.path.relpath(path, path_to_core), self.hash_file(path))).encode("utf-8"))
+        for item in extra:
+            h.update(("%s\n" % item).encode("utf-8"))
+        return h.hexdigest()
+
+    def is_up_to_date(self, node_id, fingerprint):
+        return self.node_fingerprints.get(node_id) == fingerprint
+
+    def record(self, node_id, fingerprint, save=True):
+        self.node_fingerprints[node_id] = fingerprint
+        if save:
+            self.save()
+
+    def forget(self, node_id):
+        if node_id in self.node_fingerprints:
+            del self.node_fingerprints[node_id]
+            self.save()
+
+
+def list_files(paths_or_patterns):
+    """
+    List all files matching the glob patterns (relative to the core), recursing into directories.
+
+    :param paths_or_patterns: List of paths or glob patterns
+
+    :return: Sorted list of file paths
+    """
+    files = set()
+    for pattern in paths_or_patterns:
+        for path in glob.glob(path_to_core + "/" + pattern, recursive=True):
+            if os.path.isfile(path):
+                files.add(path)
+            elif os.path.isdir(path):
+                for dir_path, _, filenames in os.walk(path):
+                    for filename in filenames:
+                        files.add(os.path.join(dir_path, filename))
+    return list(sorted(files))
+
+
+def list_local_module_files(module_filename):
+    """
+    List the module file and all the local modules it (transitively) imports via relative imports.
+
+    :param module_filename: Python module filename
+
+    :return: Sorted list of module filenames
+    """
+    module_filenames = set()
+    to_visit = [os.path.abspath(module_filename)]
+    while len(to_visit) != 0:
+        filename = to_visit.pop()
+        if filename in module_filenames:
+            continue
+        module_filenames.add(filename)
+        with open(filename, "r") as f_in:
+            tree = ast.parse(f_in.read(), filename)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.level >= 1:
+                base_dir = os.path.dirname(filename)
+                for _ in range(node.level - 1):
+                    base_dir = os.path.dirname(base_dir)
+                if node.module is not None:
+                    candidates = [os.path.join(base_dir, *node.module.split("."))]
+                else:
+                    candidates = list(map(lambda x: os.path.join(base_dir, x.name), node.names))
+                for candidate in candidates:
+                    if os.path.isfile(candidate + ".py"):
+                        to_visit.append(candidate + ".py")
+                    elif os.path.isfile(candidate + "/__init__.py"):
+                        to_visit.append(candidate + "/__init__.py")
+    return list(sorted(module_filenames))
+
+
+def list_root_class_plotter_dependency_files(root_class_name):
+    """
+    List the files the plotter of a root class depends on: its module and local modules it imports,
+    the gnuplot templates referenced in those, plot.py itself and the exputil package.
+
+    :param root_class_name: Root class name
+
+    :return: List of file paths
+    """
+    module_filenames = list_local_module_files(inspect.getsourcefile(type(get_root_class_plotter(root_class_name))))
+    gnuplot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rootclasses", "gnuplot")
+    template_filenames = set()
+    for module_filename in module_filenames:
+        with open(module_filename, "r") as f_in:
+            for template_name in re.findall(r"[\w\-]+\.plt", f_in.read()):
+                if os.path.isfile(os.path.join(gnuplot_dir, template_name)):
+                    template_filenames.add(os.path.join(gnuplot_dir, template_name))
+    exputil_dir = os.path.dirname(os.path.abspath(exputil.__file__))
+    return (
+        module_filenames
+        + list(sorted(template_filenames))
+        + [os.path.abspath("plot.py")]
+        + list(sorted(glob.glob(exputil_dir + "/*.py")))
+    )
+
+
+def list_run_dir_files(run_dir, output_dir_names, inputs):
+    """
+    List either the input files or the output files of a run directory.
+
+    :param run_dir:           Run directory path
+    :param output_dir_names:  Names of the output directories within the run directory
+    :param inputs:            True to list the inputs (everything not in an output directory), False for the outputs
+
+    :return: List of file paths
+    """
+    files = []
+    for dir_path, dir_names, filenames in os.walk(run_dir):
+        if dir_path == run_dir:
+            dir_names[:] = list(filter(lambda x: (x in output_dir_names) != inputs, dir_names))
+            if not inputs:
+                continue
+        for filename in filenames:
+            files.append(os.path.join(dir_path, filename))
+    return files
+
+
+def list_run_dir_framework_names(run_dir, root_class_name):
+    """
+    List the frameworks a run depends on: those of its root class which its run.sh uses.
+
+    :param run_dir:           Run directory path
+    :param root_class_name:   Root class name of the run
+
+    :return: List of framework names
+    """
+    with open(run_dir + "/run.sh", "r") as f_in:
+        run_sh = f_in.read()
+    return list(filter(
+        lambda x: re.search(r"frameworks/" + re.escape(x) + r"(/|\s|$)", run_sh, re.MULTILINE) is not None,
+        root_class_to_framework_names[root_class_name]
+    ))
+
+
+def calculate_framework_name_to_fingerprint(state):
+    """
+    Calculate the fingerprint of the build inputs of each framework.
+
+    :param state:   Build state (of which the file hash cache is used)
+
+    :return: Mapping of framework name to fingerprint
+    """
+    framework_name_to_fingerprint = {}
+    for framework_name in sorted(framework_build_inputs.keys()):
+        framework_name_to_fingerprint[framework_name] = state.hash_files(
+            list_files(framework_build_inputs[framework_name])
+        )
+    return framework_name_to_fingerprint
+
+
+def calculate_root_class_plotter_fingerprint(state, root_class_name, framework_name_to_fingerprint):
+    """
+    Calculate the fingerprint of the plotter of a root class, which covers its code, gnuplot templates
+    and the frameworks it depends on (e.g., the top-lists data produced by its build).
+
+    :param state:                           Build state (of which the file hash cache is used)
+    :param root_class_name:                 Root class name
+    :param framework_name_to_fingerprint:   Mapping of framework name to fingerprint
+
+    :return: Plotter fingerprint
+    """
+    return state.hash_files(
+        list_root_class_plotter_dependency_files(root_class_name),
+        list(map(
+            lambda x: x + "=" + framework_name_to_fingerprint[x],
+            root_class_to_framework_names[root_class_name]
+        ))
+    )
@@ -21,6 +21,10 @@
 # SOFTWARE.
 
 from .shell import RemoteShell, LocalShell, FailedCommandError, InvalidCommandError, OutputRedirect
+from .supervisor import ProcessSupervisor, JobStatus
+from .shell_trace import SHELL_TRACE_ENVIRONMENT_VARIABLE, enable_shell_trace, disable_shell_trace, \
+    read_shell_trace, summarize_shell_trace, print_shell_trace_summary
 from .input_output import InstantWriter, PropertiesConfig, parse_int, parse_float, \
     parse_positive_int, parse_positive_float, parse_float_between_0_and_1, parse_positive_int_less_than, \
-    read_csv_direct_in_columns
+    read_csv_direct_in_columns, iterate_csv_in_column_batches, split_into_newline_aligned_byte_ranges, \
+    COMPRESSED_FILENAME_EXTENSIONS, resolve_possibly_compressed_filename, open_possibly_compressed, compress_file
@@ -20,6 +20,97 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import io
+import os
+import sys
+import gzip
+import shutil
+import array
+import warnings
+import itertools
+import multiprocessing
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only required for the numpy engine of the CSV reader
+    np = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is only required to read and write .zst compressed files
+    zstandard = None
+
+# Compressed variants of a file are named as the file with one of these extensions appended
+COMPRESSED_FILENAME_EXTENSIONS = (".gz", ".zst")
+
+
+def resolve_possibly_compressed_filename(filename):
+    """
+    Resolve which file to read: the file itself if it exists, else its compressed variant
+    (filename.gz or filename.zst) if that exists.
+
+    :param filename:  Filename (uncompressed)
+
+    :return: Filename to read (the filename itself if neither exists)
+    """
+    if os.path.exists(filename):
+        return filename
+    for extension in COMPRESSED_FILENAME_EXTENSIONS:
+        if os.path.exists(filename + extension):
+            return filename + extension
+    return filename
+
+
+def open_possibly_compressed(filename):
+    """
+    Open a text file for reading, which transparently reads its compressed variant
+    (filename.gz or filename.zst) if the file itself does not exist.
+
+    :param filename:  Filename (uncompressed)
+
+    :return: Text file object
+    """
+    resolved_filename = resolve_possibly_compressed_filename(filename)
+    if resolved_filename.endswith(".gz"):
+        return gzip.open(resolved_filename, "rt")
+    elif resolved_filename.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("Reading a .zst compressed file requires zstandard to be installed: " + resolved_filename)
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(resolved_filename, "rb")))
+    else:
+        return open(resolved_filename, "r")
+
+
+def compress_file(filename, extension=".gz", level=None):
+    """
+    Compress a file into its compressed variant (filename + extension), after which the file itself is removed.
+    The compressed variant is first written under a temporary name, such that it is never incomplete.
+
+    :param filename:   Filename (uncompressed)
+    :param extension:  Compression as filename extension, one of: .gz, .zst
+    :param level:      Compression level (None for the default of the compression)
+
+    :return: Compressed filename
+    """
+    if extension not in COMPRESSED_FILENAME_EXTENSIONS:
+        raise ValueError("Compression extension must be one of: " + ", ".join(COMPRESSED_FILENAME_EXTENSIONS))
+    if extension == ".zst" and zstandard is None:
+        raise ValueError("Writing a .zst compressed file requires zstandard to be installed")
+    compressed_filename = filename + extension
+    temporary_filename = compressed_filename + ".tmp"
+    with open(filename, "rb") as f_in:
+        if extension == ".gz":
+            with gzip.open(temporary_filename, "wb", compresslevel=(6 if level is None else level)) as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        else:
+            with open(temporary_filename, "wb") as f_out:
+                compressor = zstandard.ZstdCompressor(level=(3 if level is None else level))
+                with compressor.stream_writer(f_out) as f_out_compressed:
+                    shutil.copyfileobj(f_in, f_out_compressed)
+    os.replace(temporary_filename, compressed_filename)
+    os.remove(filename)
+    return compressed_filename
+
 
 class InstantWriter:
 
@@ -44,7 +135,7 @@ class PropertiesConfig:
 
         # Open file
         self.properties = {}
-        with open(filename, "rt") as properties_file:
+        with open_possibly_compressed(filename) as properties_file:
 
             # Go over each stripped line
             for line in properties_file:
@@ -140,7 +231,122 @@ def parse_positive_int_less_than(str_value, less_than_int_value):
         return res
 
 
-def read_csv_direct_in_columns(csv_filename, line_values_format, row_filter_keep_function=None):
+def _parse_line_values_format(line_values_format):
+    formats = []
+    for f in line_values_format.split(","):
+        if f != "int" and f != "idx_int" and f != "pos_int" and f != "float" and f != "pos_float" and f != "string":
+            raise ValueError(
+                "Value format must be one of: int, idx_int, pos_int, float, pos_float, string"
+                " (separated by comma without whitespace)"
+            )
+        formats.append(f)
+    return formats
+
+
+_ROW_FILTER_PREDICATE_OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "in", "not in", "range")
+
+
+class _CsvReadPlan:
+
+    def __init__(self, line_values_format, row_filter_keep_function, row_filter_predicates, column_indices, engine,
+                 storage):
+        """
+        Check and store what is to be read from a CSV file.
+
+        :param line_values_format:          Line format
+        :param row_filter_keep_function:    Row filter function (or None)
+        :param row_filter_predicates:       List of row filter predicates (or None)
+        :param column_indices:              List of column indices to return (or None for all)
+        :param engine:                      Engine
+        :param storage:                     Column storage (or None for the default of the engine)
+        """
+        self.line_values_format = line_values_format
+        self.formats = _parse_line_values_format(line_values_format)
+        self.row_filter_keep_function = row_filter_keep_function
+
+        # Engine and column storage
+        if engine != "python" and engine != "numpy":
+            raise ValueError("Engine must be one of: python, numpy")
+        self.engine = engine
+        if storage is None:
+            storage = "list" if engine == "python" else "numpy"
+        if storage != "list" and storage != "array" and storage != "numpy":
+            raise ValueError("Storage must be one of: list, array, numpy")
+        if (engine == "numpy" or storage == "numpy") and np is None:
+            raise ValueError("The numpy engine and numpy storage require NumPy to be installed")
+        self.storage = storage
+
+        # Row filter predicates
+        self.row_filter_predicates = [] if row_filter_predicates is None else list(row_filter_predicates)
+        for predicate in self.row_filter_predicates:
+            if not isinstance(predicate, tuple) or len(predicate) != 3:
+                raise ValueError(
+                    "Row filter predicate must be a tuple (column index, operator, operand): %s" % str(predicate)
+                )
+            self._check_column_index(predicate[0])
+            if predicate[1] not in _ROW_FILTER_PREDICATE_OPERATORS:
+                raise ValueError(
+                    "Row filter predicate operator must be one of: %s" % ", ".join(_ROW_FILTER_PREDICATE_OPERATORS)
+                )
+            if predicate[1] in ("in", "not in") and not isinstance(predicate[2], (list, tuple, set, frozenset)):
+                raise ValueError("Operand of row filter predicate operator %s must be a collection" % predicate[1])
+            if predicate[1] == "range" and (not isinstance(predicate[2], tuple) or len(predicate[2]) != 2):
+                raise ValueError("Operand of row filter predicate operator range must be a tuple (lower, upper)")
+
+        # Column projection
+        self.column_indices = list(range(len(self.formats))) if column_indices is None else list(column_indices)
+        for column_idx in self.column_indices:
+            self._check_column_index(column_idx)
+        if len(set(self.column_indices)) != len(self.column_indices):
+            raise ValueError("Column indices must be unique")
+
+        # The predicate columns are parsed first, the others only if the row passed the predicates
+        # (all columns are needed if the row filter function is called)
+        self.predicate_column_indices = list(dict.fromkeys(map(lambda x: x[0], self.row_filter_predicates)))
+        if row_filter_keep_function is not None:
+            other_column_indices = range(len(self.formats))
+        else:
+            other_column_indices = self.column_indices
+        self.other_column_indices = sorted(set(other_column_indices) - set(self.predicate_column_indices))
+
+    def _check_column_index(self, column_idx):
+        if not isinstance(column_idx, int) or column_idx < 0 or column_idx >= len(self.formats):
+            raise ValueError("Column index out of range: %s" % str(column_idx))
+
+
+def _evaluate_row_filter_predicate(value, operator, operand):
+    """
+    Evaluate a row filter predicate on either a single value or on an entire NumPy column at once.
+
+    :param value:       Value (or NumPy array of values)
+    :param operator:    Operator
+    :param operand:     Operand
+
+    :return: True/False (or NumPy array of booleans)
+    """
+    if operator == "==":
+        return value == operand
+    elif operator == "!=":
+        return value != operand
+    elif operator == "<":
+        return value < operand
+    elif operator == "<=":
+        return value <= operand
+    elif operator == ">":
+        return value > operand
+    elif operator == ">=":
+        return value >= operand
+    elif operator == "in":
+        return np.isin(value, list(operand)) if np is not None and isinstance(value, np.ndarray) else value in operand
+    elif operator == "not in":
+        return ~np.isin(value, list(operand)) if np is not None and isinstance(value, np.ndarray) \
+            else value not in operand
+    else:
+        return (operand[0] <= value) & (value < operand[1])
+
+
+def read_csv_direct_in_columns(csv_filename, line_values_format, row_filter_keep_function=None, engine="python",
+                               row_filter_predicates=None, column_indices=None, storage=None, num_processes=1):
     """
     Directly read in the entire CSV file.
 
@@ -150,63 +356,489 @@ def read_csv_direct_in_columns(csv_filename, line_values_format, row_filter_keep
     :param row_filter_keep_function    function(row) -> True/False
                                        For each parsed row (provided as an array), it must return True or False.
                                        True iff to keep and add row split into the columns, else False to not add.
+    :param engine:                     "python" (default) to parse line-by-line, or "numpy" to parse the entire
+                                       file at once into typed NumPy arrays (int64 for int, idx_int and pos_int,
+                                       float64 for float and pos_float, object of interned strings for string),
+                                       which is several times faster for large files (requires NumPy)
+    :param row_filter_predicates:      List of predicates (column index, operator, operand) which a row must
+                                       all satisfy to be kept (in addition to the row filter function), with
+                                       as operator one of: ==, !=, <, <=, >, >=, in, not in (operand is a
+                                       collection), range (operand is a tuple (lower, upper), with lower <= value
+                                       < upper), e.g., [(4, "range", (1000, 2000)), (8, "==", "YES")].
+                                       The python engine evaluates them before parsing the other values of the
+                                       row, the numpy engine evaluates them on entire columns at once.
+    :param column_indices:             List of the indices of the columns to return (in that order), e.g., [4, 8].
+                                       Values of columns which are not returned, used by a predicate or needed
+                                       for the row filter function are not parsed, and as such not checked
+                                       against their format.
+    :param storage:                    How each data column is stored (default: "list" for the python engine,
+                                       "numpy" for the numpy engine):
+                                       "list" as Python list,
+                                       "array" as array.array of 8 byte values ("q" for int, idx_int and pos_int,
+                                       "d" for float and pos_float) and string columns as list of interned strings,
+                                       "numpy" as NumPy array (int64, float64, and string columns as object array
+                                       of interned strings).
+                                       Interning makes each repeated string value (e.g., "YES") a single object, such
+                                       that every value costs a reference (8 bytes) rather than a string object.
+                                       Integers must fit in 64 bits for the "array" and "numpy" storage.
+    :param num_processes:              Number of processes to parse with (default: 1, None for the CPU count).
+                                       If more than one, the file is split into newline-aligned byte ranges
+                                       (of at least 1 MiB) which are parsed by a process pool, after which the
+                                       columns are concatenated in order. Rows can then only be filtered using
+                                       the row filter predicates (not the row filter function).
+                                       A compressed file (see below) is always parsed by a single process.
+
+    If the CSV file does not exist, its compressed variant (csv_filename.gz or csv_filename.zst) is read instead.
 
     :return: Array of data column arrays (e.g., [ array[idx_int], array[pos_int], array[float],
              array[string], array[int], array[pos_float] ]
     """
 
-    # Determine the formats
-    formats = []
-    for f in line_values_format.split(","):
-        if f != "int" and f != "idx_int" and f != "pos_int" and f != "float" and f != "pos_float" and f != "string":
-            raise ValueError(
-                "Value format must be one of: int, idx_int, pos_int, float, pos_float, string"
-                " (separated by comma without whitespace)"
-            )
-        formats.append(f)
+    # Determine what to read
+    plan = _CsvReadPlan(
+        line_values_format, row_filter_keep_function, row_filter_predicates, column_indices, engine, storage
+    )
+
+    # Split over multiple processes
+    if num_processes is None:
+        num_processes = os.cpu_count()
+    if not isinstance(num_processes, int) or num_processes < 1:
+        raise ValueError("Number of processes must be a positive integer: %s" % str(num_processes))
+    if num_processes > 1 and resolve_possibly_compressed_filename(csv_filename) == csv_filename:
+        if row_filter_keep_function is not None:
+            raise ValueError("Row filter function cannot be used with multiple processes (use predicates instead)")
+        byte_ranges = split_into_newline_aligned_byte_ranges(
+            csv_filename, min(num_processes, int(os.path.getsize(csv_filename) / _MIN_PARALLEL_BYTE_RANGE_SIZE))
+        )
+        if len(byte_ranges) > 1:
+            return _read_csv_direct_in_columns_parallel(csv_filename, plan, byte_ranges, num_processes)
+
+    # Engine
+    if engine == "numpy":
+        return _read_csv_direct_in_columns_numpy(csv_filename, plan)
+
+    # Read in the CSV file line-by-line
+    with open_possibly_compressed(csv_filename) as csv_file:
+        return _parse_csv_lines_python(csv_file, plan, 0)
+
+
+def iterate_csv_in_column_batches(csv_filename, line_values_format, batch_size=100000, row_filter_keep_function=None,
+                                  engine="python", row_filter_predicates=None, column_indices=None, storage=None):
+    """
+    Iterate over the CSV file in batches of lines, such that only one batch is in memory at a time.
+
+    Each batch is parsed and validated (including the index integer constraint, which continues across
+    batches) exactly as read_csv_direct_in_columns() does for the entire file. Statistics can be folded
+    in incrementally, e.g.:
+
+        total = 0
+        for data_columns in iterate_csv_in_column_batches("tcp_flows.csv", "idx_int,...", 100000):
+            total += sum(data_columns[1])
+
+    :param csv_filename:               CSV filename
+    :param line_values_format:         Line format (see read_csv_direct_in_columns())
+    :param batch_size:                 Maximum number of lines in a batch (before row filtering)
+    :param row_filter_keep_function    function(row) -> True/False (see read_csv_direct_in_columns())
+    :param engine:                     "python" (default) or "numpy" (see read_csv_direct_in_columns())
+    :param row_filter_predicates:      List of row filter predicates (see read_csv_direct_in_columns())
+    :param column_indices:             List of the indices of the columns to return (see read_csv_direct_in_columns())
+    :param storage:                    How each data column is stored (see read_csv_direct_in_columns())
+
+    :return: Generator of data column arrays, one for each batch (only batches with at least one line)
+    """
+
+    # Arguments are checked now rather than upon the first batch
+    plan = _CsvReadPlan(
+        line_values_format, row_filter_keep_function, row_filter_predicates, column_indices, engine, storage
+    )
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise ValueError("Batch size must be a positive integer: %s" % str(batch_size))
+
+    return _iterate_csv_in_column_batches(csv_filename, plan, batch_size)
+
+
+def _iterate_csv_in_column_batches(csv_filename, plan, batch_size):
+    with open_possibly_compressed(csv_filename) as csv_file:
+        first_line_idx = 0
+        while True:
+            lines = list(itertools.islice(csv_file, batch_size))
+            if len(lines) == 0:
+                break
+            if plan.engine == "numpy":
+                yield _parse_csv_content_numpy("".join(lines), plan, first_line_idx)
+            else:
+                yield _parse_csv_lines_python(lines, plan, first_line_idx)
+            first_line_idx += len(lines)
+
 
-    # Data will be stored in columns
+_MIN_PARALLEL_BYTE_RANGE_SIZE = 1048576
+
+
+def split_into_newline_aligned_byte_ranges(filename, num_ranges):
+    """
+    Split a file into byte ranges of roughly equal size, each of which starts at the start of a line
+    and ends just after a newline (or at the end of the file).
+
+    :param filename:     Filename
+    :param num_ranges:   Number of ranges to aim for (fewer are returned if the file has too few lines)
+
+    :return: List of non-empty byte ranges (start (incl.), end (excl.)) which together cover the file in order
+    """
+    file_size = os.path.getsize(filename)
+    if file_size == 0:
+        return []
+    num_ranges = max(1, num_ranges)
+
+    # Each boundary is moved forward to just after the first newline at or after it
+    boundaries = [0]
+    with open(filename, "rb") as f_in:
+        for k in range(1, num_ranges):
+            offset = max(boundaries[-1], int(file_size * k / num_ranges))
+            f_in.seek(offset)
+            while True:
+                block = f_in.read(65536)
+                if len(block) == 0:
+                    offset = file_size
+                    break
+                newline_pos = block.find(b"\n")
+                if newline_pos != -1:
+                    offset += newline_pos + 1
+                    break
+                offset += len(block)
+            if boundaries[-1] < offset < file_size:
+                boundaries.append(offset)
+    boundaries.append(file_size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _read_byte_range(filename, byte_range):
+    with open(filename, "rb") as f_in:
+        f_in.seek(byte_range[0])
+        return f_in.read(byte_range[1] - byte_range[0])
+
+
+def _count_lines_in_byte_range(filename, byte_range):
+    return _read_byte_range(filename, byte_range).count(b"\n")
+
+
+def _parse_csv_byte_range(filename, byte_range, plan, first_line_idx):
+    # Decoding and newline handling as open() in text mode does
+    with io.TextIOWrapper(io.BytesIO(_read_byte_range(filename, byte_range))) as text_in:
+        if plan.engine == "numpy":
+            return _parse_csv_content_numpy(text_in.read(), plan, first_line_idx)
+        else:
+            return _parse_csv_lines_python(text_in, plan, first_line_idx)
+
+
+def _read_csv_direct_in_columns_parallel(csv_filename, plan, byte_ranges, num_processes):
+    """
+    Parse newline-aligned byte ranges of a CSV file in a process pool.
+
+    :param csv_filename:    CSV filename
+    :param plan:            What to read
+    :param byte_ranges:     List of newline-aligned byte ranges covering the file in order
+    :param num_processes:   Number of processes
+
+    :return: Array of data column arrays, concatenated in the order of the byte ranges
+    """
+    with multiprocessing.Pool(min(num_processes, len(byte_ranges))) as pool:
+
+        # The line index of the first line of each range is needed for the index integer constraint
+        num_lines_per_range = pool.starmap(
+            _count_lines_in_byte_range, map(lambda x: (csv_filename, x), byte_ranges)
+        )
+        first_line_idx_per_range = list(itertools.accumulate([0] + num_lines_per_range[:-1]))
+
+        # Parse each range separately
+        data_columns_per_range = pool.starmap(
+            _parse_csv_byte_range,
+            map(lambda k: (csv_filename, byte_ranges[k], plan, first_line_idx_per_range[k]), range(len(byte_ranges)))
+        )
+
+    # Concatenate the columns in order
     data_columns = []
-    for i in range(len(formats)):
-        data_columns.append([])
+    for k in range(len(plan.column_indices)):
+        parts = list(map(lambda x: x[k], data_columns_per_range))
+        if plan.storage == "numpy":
+            data_columns.append(np.concatenate(parts))
+        else:
+            column = parts[0]
+            for part in parts[1:]:
+                column.extend(part)
+            data_columns.append(column)
+    return data_columns
 
-    # Read in the CSV file line-by-line
-    with open(csv_filename, "r") as csv_file:
-        i = 0
-        for line in csv_file:
-            spl = line.split(",")
 
-            # Check split size
-            if len(spl) != len(formats):
-                raise ValueError(
-                    "Error on line %d: line split length does not match format length\nLine: %s\nFormat: %s"
-                    % (i, line.strip(), line_values_format)
-                )
+def _parse_csv_value_python(str_value, value_format, line_idx):
+    if value_format == "int":
+        return parse_int(str_value)
+    elif value_format == "idx_int":
+        int_val = int(str_value)
+        if int_val != line_idx:
+            raise ValueError("Index integer constraint violated on line %d" % line_idx)
+        return int_val
+    elif value_format == "pos_int":
+        return parse_positive_int(str_value)
+    elif value_format == "float":
+        return parse_float(str_value)
+    elif value_format == "pos_float":
+        return parse_positive_float(str_value)
+    else:
+        return str_value.strip()
 
-            # Save into the data columns
-            row = []
-            for j in range(len(spl)):
-                if formats[j] == "int":
-                    row.append(parse_int(spl[j]))
-                elif formats[j] == "idx_int":
-                    int_val = int(spl[j])
-                    if int_val != i:
-                        raise ValueError("Index integer constraint violated on line %d" % i)
-                    row.append(int_val)
-                elif formats[j] == "pos_int":
-                    row.append(parse_positive_int(spl[j]))
-                elif formats[j] == "float":
-                    row.append(parse_float(spl[j]))
-                elif formats[j] == "pos_float":
-                    row.append(parse_positive_float(spl[j]))
-                else:
-                    row.append(spl[j].strip())
 
-            # Only add to columns if the filter function allows it
-            if row_filter_keep_function is None or row_filter_keep_function(row):
-                for j in range(len(spl)):
-                    data_columns[j].append(row[j])
+def _parse_csv_lines_python(lines, plan, first_line_idx):
+    """
+    Parse CSV lines one-by-one into columns.
+
+    :param lines:           Iterable of lines
+    :param plan:            What to read
+    :param first_line_idx:  Line index (in the file) of the first line
+
+    :return: Array of data column arrays
+    """
+    formats = plan.formats
 
-            i += 1
+    # Data will be stored in columns (array-backed columns are appended to directly)
+    data_columns = []
+    for j in plan.column_indices:
+        if plan.storage == "list" or formats[j] == "string":
+            data_columns.append([])
+        else:
+            data_columns.append(array.array("d" if formats[j] == "float" or formats[j] == "pos_float" else "q"))
+    intern_string_column = list(map(
+        lambda j: plan.storage != "list" and formats[j] == "string", range(len(formats))
+    ))
+
+    i = first_line_idx
+    row = [None] * len(formats)
+    for line in lines:
+        spl = line.split(",")
+
+        # Check split size
+        if len(spl) != len(formats):
+            raise ValueError(
+                "Error on line %d: line split length does not match format length\nLine: %s\nFormat: %s"
+                % (i, line.strip(), plan.line_values_format)
+            )
+
+        # The values of the row which fails a predicate are not parsed further
+        for j in plan.predicate_column_indices:
+            row[j] = _parse_csv_value_python(spl[j], formats[j], i)
+        keep = True
+        for column_idx, operator, operand in plan.row_filter_predicates:
+            if not _evaluate_row_filter_predicate(row[column_idx], operator, operand):
+                keep = False
+                break
+
+        if keep:
+            for j in plan.other_column_indices:
+                row[j] = _parse_csv_value_python(spl[j], formats[j], i)
+
+            # Only add to columns if the filter function allows it
+            if plan.row_filter_keep_function is None or plan.row_filter_keep_function(list(row)):
+                for k in range(len(plan.column_indices)):
+                    j = plan.column_indices[k]
+                    if intern_string_column[j]:
+                        data_columns[k].append(sys.intern(row[j]))
+                    else:
+                        try:
+                            data_columns[k].append(row[j])
+                        except OverflowError:
+                            raise ValueError("Integer value does not fit in 64 bits on line %d" % i)
+
+        i += 1
+
+    # NumPy arrays are created at the end from the array-backed columns
+    if plan.storage == "numpy":
+        data_columns = list(map(
+            lambda x: np.array(x, dtype=object) if isinstance(x, list) else np.frombuffer(x, dtype=(
+                np.float64 if x.typecode == "d" else np.int64
+            )),
+            data_columns
+        ))
 
     return data_columns
+
+
+def _parse_numeric_values_numpy(joined_values, num_values, dtype):
+    """
+    Parse comma-separated values into a NumPy array in one go.
+
+    :param joined_values:   Values joined by commas
+    :param num_values:      Number of values expected
+    :param dtype:           np.int64 or np.float64
+
+    :return: NumPy array of the dtype, or None if the values could not (all) be parsed
+    """
+
+    # The separator form of fromstring() parses in C, and warns (or raises) if it cannot read everything
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(joined_values, dtype=dtype, sep=",")
+        except (ValueError, DeprecationWarning):
+            return None
+    if len(values) != num_values:
+        return None
+
+    # Integers which do not fit in 64 bits are saturated by fromstring()
+    if dtype == np.int64 and np.any((values == np.iinfo(np.int64).max) | (values == np.iinfo(np.int64).min)):
+        return None
+
+    return values
+
+
+def _parse_numeric_column_numpy(column_values, dtype):
+    """
+    Parse a list of value strings into a NumPy array.
+
+    :param column_values:   List of value strings
+    :param dtype:           np.int64 or np.float64
+
+    :return: NumPy array of the dtype
+    """
+    values = _parse_numeric_values_numpy(",".join(column_values), len(column_values), dtype)
+    if values is not None:
+        return values
+
+    # Parse value-by-value to either get the same error as the python engine, or the exact result
+    try:
+        return np.array(list(map(parse_int if dtype == np.int64 else parse_float, column_values)), dtype=dtype)
+    except OverflowError:
+        raise ValueError("Integer value does not fit in 64 bits")
+
+
+def _read_csv_direct_in_columns_numpy(csv_filename, plan):
+    if np is None:
+        raise ValueError("The numpy engine requires NumPy to be installed")
+
+    # Read in the entire file
+    with open_possibly_compressed(csv_filename) as csv_file:
+        return _parse_csv_content_numpy(csv_file.read(), plan, 0)
+
+
+def _parse_csv_content_numpy(content, plan, first_line_idx):
+    """
+    Parse CSV content into typed NumPy columns.
+
+    :param content:         Content consisting of complete lines
+    :param plan:            What to read
+    :param first_line_idx:  Line index (in the file) of the first line
+
+    :return: Array of data column NumPy arrays
+    """
+    formats = plan.formats
+
+    # Empty content has no lines
+    if len(content) == 0:
+        return list(map(lambda j: _convert_numpy_column_to_storage(np.array([], dtype=(
+            object if formats[j] == "string" else (
+                np.float64 if formats[j] == "float" or formats[j] == "pos_float" else np.int64
+            )
+        )), plan.storage), plan.column_indices))
+
+    # Line i is followed by newline i (the final newline is optional)
+    if content.endswith("\n"):
+        content = content[:-1]
+    num_lines = content.count("\n") + 1
+
+    # Check the split size of each line at once by counting the commas of each line
+    content_bytes = np.frombuffer(content.encode("utf-8"), dtype=np.uint8)
+    newline_positions = np.flatnonzero(content_bytes == ord("\n"))
+    comma_line_idx = np.searchsorted(newline_positions, np.flatnonzero(content_bytes == ord(",")))
+    wrong_split_lines = np.flatnonzero(np.bincount(comma_line_idx, minlength=num_lines) != len(formats) - 1)
+    if len(wrong_split_lines) > 0:
+        i = int(wrong_split_lines[0])
+        raise ValueError(
+            "Error on line %d: line split length does not match format length\nLine: %s\nFormat: %s"
+            % (first_line_idx + i, content.split("\n")[i].strip(), plan.line_values_format)
+        )
+    del content_bytes, newline_positions, comma_line_idx
+
+    # Only the columns which are needed are parsed
+    parsed_column_indices = sorted(set(plan.predicate_column_indices) | set(plan.other_column_indices))
+    data_columns = [None] * len(formats)
+
+    # If all columns are of the same numeric type, the entire file is parsed at once
+    if all(map(lambda x: x in ("int", "idx_int", "pos_int"), formats)):
+        all_values = _parse_numeric_values_numpy(content.replace("\n", ","), num_lines * len(formats), np.int64)
+    elif all(map(lambda x: x in ("float", "pos_float"), formats)):
+        all_values = _parse_numeric_values_numpy(content.replace("\n", ","), num_lines * len(formats), np.float64)
+    else:
+        all_values = None
+    if all_values is not None:
+        all_values = all_values.reshape(num_lines, len(formats))
+        for j in parsed_column_indices:
+            data_columns[j] = np.ascontiguousarray(all_values[:, j])
+        del all_values
+
+    # Otherwise every value in order, of which column j are every len(formats)-th starting at j
+    else:
+        values = content.replace("\n", ",").split(",")
+        for j in parsed_column_indices:
+            column_values = values[j::len(formats)]
+            if formats[j] == "string":
+                data_columns[j] = np.array(list(map(lambda x: sys.intern(x.strip()), column_values)), dtype=object)
+            elif formats[j] == "float" or formats[j] == "pos_float":
+                data_columns[j] = _parse_numeric_column_numpy(column_values, np.float64)
+            else:
+                data_columns[j] = _parse_numeric_column_numpy(column_values, np.int64)
+        del values
+    del content
+
+    # Same value constraints as the per-value parsing
+    for j in parsed_column_indices:
+        if formats[j] == "idx_int":
+            violations = np.flatnonzero(data_columns[j] != np.arange(first_line_idx, first_line_idx + num_lines))
+            if len(violations) > 0:
+                raise ValueError("Index integer constraint violated on line %d" % (first_line_idx + violations[0]))
+        elif formats[j] == "pos_int" or formats[j] == "pos_float":
+            negatives = np.flatnonzero(data_columns[j] < 0)
+            if len(negatives) > 0:
+                raise ValueError("%s value is not positive: %s" % (
+                    "Integer" if formats[j] == "pos_int" else "Float", str(data_columns[j][negatives[0]])
+                ))
+
+    # The predicates are evaluated on entire columns at once
+    keep = None
+    for column_idx, operator, operand in plan.row_filter_predicates:
+        predicate_keep = np.asarray(_evaluate_row_filter_predicate(data_columns[column_idx], operator, operand))
+        keep = predicate_keep if keep is None else (keep & predicate_keep)
+
+    # The filter function is still called for each row (with the row values as Python objects)
+    if plan.row_filter_keep_function is not None:
+        function_keep = np.fromiter(
+            map(
+                lambda row: bool(plan.row_filter_keep_function(list(row))),
+                zip(*map(lambda x: x.tolist(), data_columns))
+            ),
+            dtype=bool,
+            count=num_lines
+        )
+        keep = function_keep if keep is None else (keep & function_keep)
+
+    if keep is None:
+        return list(map(lambda j: _convert_numpy_column_to_storage(data_columns[j], plan.storage), plan.column_indices))
+    else:
+        return list(map(
+            lambda j: _convert_numpy_column_to_storage(data_columns[j][keep], plan.storage), plan.column_indices
+        ))
+
+
+def _convert_numpy_column_to_storage(column, storage):
+    """
+    Convert a NumPy data column (int64, float64 or object of interned strings) to the column storage.
+
+    :param column:     NumPy array
+    :param storage:    Column storage
+
+    :return: Data column in the storage
+    """
+    if storage == "numpy":
+        return column
+    elif storage == "list" or column.dtype == object:
+        return column.tolist()
+    else:
+        return array.array("d" if column.dtype == np.float64 else "q", np.ascontiguousarray(column).tobytes())
@@ -21,11 +21,19 @@
 # SOFTWARE.
 
 import subprocess
+import asyncio
+import signal
 import json
+import time
 import sys
+import os
 import re
+import glob
+import shutil
+import tempfile
 from enum import Enum
 from abc import ABC, abstractmethod
+from .shell_trace import record_shell_trace
 
 
 class OutputRedirect(Enum):
@@ -37,10 +45,11 @@ class OutputRedirect(Enum):
 
 class ShellExecResult:
     
-    def __init__(self, return_code, output, process):
+    def __init__(self, return_code, output, process, duration_s=None):
         self.return_code = return_code
         self.output = output
         self.process = process
+        self.duration_s = duration_s  # Wall time (s) of the execution (None if async or not a process)
 
     def __str__(self):
         return "ShellExecResult(return_code=%d, output=%s, process=%s)" % (
@@ -83,7 +92,14 @@ class FailedCommandError(Exception):
         self.sec = sec
 
 
-def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefix_arr=None):
+def _raise_if_dangerous(command):
+    stripped_command = command.strip()
+    if stripped_command in ["rm -rf /", "rm -r /", "rm -rf ~", "rm -r ~", "rm -rf ~/", "rm -r ~/", "rm -rf *",
+                            "rm -rf /*", "rm -rf ~/*", "rm -rf /*/", "rm -rf ~/*/", "rm -r *"]:
+        raise ValueError("Refusal to remove root directory or home directory.")
+
+
+def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefix_arr=None, input_content=None):
     """
     Execute the command in the local shell.
 
@@ -91,6 +107,7 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
     :param sync:                           True iff synchronized (i.e., wait till completion)
     :param output_redirect:                Where should the output be directed to
     :param remote_exec_prefix_arr:         Array of ["ssh", "a@b"] to prefix
+    :param input_content:                  String written to the stdin of the command (only if sync)
 
     :return: 3-tuple of: (1) Return code of the process (-1 if async, as the process has not finished yet)
                          (2) If output_redirect is SIMPLE_STRING: a string combining stderr and stdout. Else: "".
@@ -105,10 +122,7 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
             output_redirect = OutputRedirect.PIPE_VARIABLE
 
     # Small safety built-in
-    stripped_command = command.strip()
-    if stripped_command in ["rm -rf /", "rm -r /", "rm -rf ~", "rm -r ~", "rm -rf ~/", "rm -r ~/", "rm -rf *",
-                            "rm -rf /*", "rm -rf ~/*", "rm -rf /*/", "rm -rf ~/*/", "rm -r *"]:
-        raise ValueError("Refusal to remove root directory or home directory.")
+    _raise_if_dangerous(command)
 
     # Compose the actual command
     if remote_exec_prefix_arr is None:
@@ -117,6 +131,7 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
     else:
         actual_command = remote_exec_prefix_arr + [command]
         enable_shell = False
+    remote = None if remote_exec_prefix_arr is None else remote_exec_prefix_arr[-1]  # For tracing
 
     # Determine output redirection
     if output_redirect == OutputRedirect.CONSOLE:
@@ -135,21 +150,97 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
         set_stderr = subprocess.STDOUT
     else:
         raise ValueError("Invalid output redirect value: " + str(output_redirect))
+    if input_content is not None and not sync:
+        raise ValueError("Input content cannot be written to the stdin if async.")
 
     # Execute the command
     if sync:
-        proc = subprocess.run(actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell)
+        start = time.perf_counter()
+        proc = subprocess.run(
+            actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell,
+            input=None if input_content is None else input_content.encode("utf-8")
+        )
         if output_redirect == OutputRedirect.SIMPLE_STRING:
             output = proc.stdout.decode("utf-8")
         else:
             output = ""
-        return ShellExecResult(proc.returncode, output, proc)
+        res = ShellExecResult(proc.returncode, output, proc, time.perf_counter() - start)
+        record_shell_trace(
+            command, res.duration_s, res.return_code,
+            output if output_redirect == OutputRedirect.SIMPLE_STRING else None,
+            remote
+        )
+        return res
 
     else:
         proc = subprocess.Popen(actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell)
+        record_shell_trace(command, None, None, None, remote)
         return ShellExecResult(-1, "", proc)
 
 
+def _kill_process_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # Already finished
+
+
+async def _async_exec(command, output_redirect, remote_exec_prefix_arr):
+    """
+    Execute the command in the local shell as asyncio subprocess, in its own process group such
+    that it is killed as a whole (including the processes it started) if the execution is cancelled.
+
+    :param command:                 Command (e.g., "ls")
+    :param output_redirect:         Where should the output be directed to (CONSOLE, SILENT or SIMPLE_STRING)
+    :param remote_exec_prefix_arr:  Array of ["ssh", "a@b"] to prefix (None if local)
+
+    :return: ShellExecResult (with the asyncio process as process)
+    """
+    _raise_if_dangerous(command)
+
+    # Determine output redirection
+    if output_redirect == OutputRedirect.CONSOLE:
+        set_stdout = None
+        set_stderr = None
+    elif output_redirect == OutputRedirect.SILENT:
+        set_stdout = asyncio.subprocess.DEVNULL
+        set_stderr = asyncio.subprocess.DEVNULL
+    elif output_redirect == OutputRedirect.SIMPLE_STRING:
+        set_stdout = asyncio.subprocess.PIPE
+        set_stderr = asyncio.subprocess.STDOUT
+    else:
+        raise ValueError("Invalid output redirect value for executing many: " + str(output_redirect))
+
+    # Execute the command (the creation is shielded, as else a cancellation during it waits for the process)
+    remote = None if remote_exec_prefix_arr is None else remote_exec_prefix_arr[-1]  # For tracing
+    start = time.perf_counter()
+    if remote_exec_prefix_arr is None:
+        creation = asyncio.ensure_future(asyncio.create_subprocess_shell(
+            command, stdout=set_stdout, stderr=set_stderr, start_new_session=True
+        ))
+    else:
+        creation = asyncio.ensure_future(asyncio.create_subprocess_exec(
+            *(remote_exec_prefix_arr + [command]), stdout=set_stdout, stderr=set_stderr, start_new_session=True
+        ))
+    try:
+        proc = await asyncio.shield(creation)
+        stdout, _ = await proc.communicate()
+    except asyncio.CancelledError:
+        proc = await creation
+        _kill_process_group(proc)
+        await proc.wait()
+        record_shell_trace(command, time.perf_counter() - start, proc.returncode, None, remote)
+        raise
+    output = stdout.decode("utf-8") if output_redirect == OutputRedirect.SIMPLE_STRING else ""
+    res = ShellExecResult(proc.returncode, output, proc, time.perf_counter() - start)
+    record_shell_trace(
+        command, res.duration_s, res.return_code,
+        output if output_redirect == OutputRedirect.SIMPLE_STRING else None,
+        remote
+    )
+    return res
+
+
 class Shell(ABC):
 
     @staticmethod
@@ -164,19 +255,21 @@ class Shell(ABC):
             raise FailedCommandError(res.output, res)
 
     @abstractmethod
-    def exec(self, command, sync=True, output_redirect=None) -> ShellExecResult:
+    def exec(self, command, sync=True, output_redirect=None, input_content=None) -> ShellExecResult:
         """
         Execute the command.
 
         :param command:           Bash command
         :param sync:              True iff if the command should be done synchronously
         :param output_redirect:   Output redirection
+        :param input_content:     String written to the stdin of the command (only if sync)
 
         :return: ShellExecResult
         """
         pass  # Abstract method
     
-    def perfect_exec(self, command, output_redirect=OutputRedirect.SIMPLE_STRING) -> ShellExecResult:
+    def perfect_exec(self, command, output_redirect=OutputRedirect.SIMPLE_STRING,
+                     input_content=None) -> ShellExecResult:
         """
         Execute the command synchronously and by default with output.
         Everything must have gone perfectly, else an exception is raised.
@@ -187,14 +280,16 @@ class Shell(ABC):
 
         :param command: Bash command
         :param output_redirect:     Where should the output be directed to
+        :param input_content:       String written to the stdin of the command (None: no input)
 
         :return: ShellExecResult (with valid=True and return_code=0 guaranteed)
         """
-        res = self.exec(command, sync=True, output_redirect=output_redirect)
+        res = self.exec(command, sync=True, output_redirect=output_redirect, input_content=input_content)
         self._raise_if_invalid_or_fail(res)
         return res
 
-    def valid_exec(self, command, output_redirect=OutputRedirect.SIMPLE_STRING) -> ShellExecResult:
+    def valid_exec(self, command, output_redirect=OutputRedirect.SIMPLE_STRING,
+                   input_content=None) -> ShellExecResult:
         """
         Execute the command synchronously and by default with output.
         Only if the command is invalid (return code > 100), an exception is raised.
@@ -204,13 +299,78 @@ class Shell(ABC):
 
         :param command:             Bash command
         :param output_redirect:     Where should the output be directed to
+        :param input_content:       String written to the stdin of the command (None: no input)
 
         :return: ShellExecResult (with valid=True and return_code=0 or 1 guaranteed)
         """
-        res = self.exec(command, sync=True, output_redirect=output_redirect)
+        res = self.exec(command, sync=True, output_redirect=output_redirect, input_content=input_content)
         self._raise_if_invalid(res)
         return res
 
+    def _remote_exec_prefix_arr(self):
+        """
+        Prefix of the arguments to execute a command in this shell from the local shell.
+
+        :return: Array of ["ssh", "a@b"] (None if this is the local shell)
+        """
+        return None
+
+    async def exec_many_async(self, commands, max_concurrency=None, output_redirect=OutputRedirect.SIMPLE_STRING,
+                              fail_fast=False) -> list:
+        """
+        Execute the commands concurrently, with at most max_concurrency executing at the same time.
+        If it is cancelled, the executing commands are killed and the others are not started.
+
+        FailedCommandError: if fail_fast and a command failed due to it returning not 0
+        InvalidCommandError: if fail_fast and a command failed due to it being invalid (i.e., returned > 100)
+
+        :param commands:            List of bash commands
+        :param max_concurrency:     Maximum number of commands executing at the same time (None: number of CPUs)
+        :param output_redirect:     Where should the output be directed to (CONSOLE, SILENT or SIMPLE_STRING)
+        :param fail_fast:           True iff the first command which does not return 0 kills the others
+                                    and raises its exception (as perfect_exec() would)
+
+        :return: List of ShellExecResult (with duration_s), in the same order as the commands
+        """
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        if max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1: %s" % str(max_concurrency))
+        semaphore = asyncio.Semaphore(max_concurrency)
+        remote_exec_prefix_arr = self._remote_exec_prefix_arr()
+
+        async def exec_one(command):
+            async with semaphore:
+                res = await _async_exec(command, output_redirect, remote_exec_prefix_arr)
+            if fail_fast:
+                self._raise_if_invalid_or_fail(res)
+            return res
+
+        tasks = [asyncio.ensure_future(exec_one(command)) for command in commands]
+        try:
+            return list(await asyncio.gather(*tasks))
+        finally:
+            # On failure or cancellation, all the commands which are still executing are killed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def exec_many(self, commands, max_concurrency=None, output_redirect=OutputRedirect.SIMPLE_STRING,
+                  fail_fast=False) -> list:
+        """
+        Execute the commands concurrently and wait till completion (see exec_many_async()).
+        It cannot be called from within a running asyncio event loop (use exec_many_async() instead).
+
+        :param commands:            List of bash commands
+        :param max_concurrency:     Maximum number of commands executing at the same time (None: number of CPUs)
+        :param output_redirect:     Where should the output be directed to (CONSOLE, SILENT or SIMPLE_STRING)
+        :param fail_fast:           True iff the first command which does not return 0 kills the others
+                                    and raises its exception (as perfect_exec() would)
+
+        :return: List of ShellExecResult (with duration_s), in the same order as the commands
+        """
+        return asyncio.run(self.exec_many_async(commands, max_concurrency, output_redirect, fail_fast))
+
     def count_screens(self):
         res = self.valid_exec("screen -ls")
         return res.output.count("(Detached)")
@@ -283,21 +443,168 @@ class Shell(ABC):
             return res.output.strip().split("\n")
 
 
+# Paths which a shell would take literally (no whitespace, quotes, globs, expansions, remote host prefix, or options)
+_PLAIN_PATH_REGEX = re.compile(r'^[A-Za-z0-9_./+,@=%][A-Za-z0-9_./+,@=%-]*$')
+
+
+def _is_plain_path(path):
+    return _PLAIN_PATH_REGEX.match(path) is not None
+
+
+def _native_exec(operation):
+    """
+    Perform a file operation in-process, with the same result and exception contract as perfect_exec().
+
+    :param operation:   Function without arguments which performs the operation, and returns its output (or None)
+
+    :return: ShellExecResult (with return_code=0 and process=None)
+    """
+    try:
+        output = operation()
+    except OSError as e:
+        message = str(e) + "\n"
+        raise FailedCommandError(message, ShellExecResult(1, message, None))
+    return ShellExecResult(0, "" if output is None else output, None)
+
+
+def _write_file_content(file_path, content):
+    with open(file_path, "wb") as f_out:
+        f_out.write(content)
+
+
+def _read_file_content(file_path):
+    with open(file_path, "rb") as f_in:
+        return f_in.read()
+
+
+def _replace_in_file_content(target_file, search_term, replace_term):
+    content = _read_file_content(target_file)
+    temporary_file = target_file + ".original"
+    _write_file_content(temporary_file, content.replace(search_term.encode("utf-8"), replace_term.encode("utf-8")))
+    shutil.copymode(target_file, temporary_file)
+    os.replace(temporary_file, target_file)
+
+
 class LocalShell(Shell):
 
     # def __init__(self):
     # For now, local shell is just default constructor
 
-    def exec(self, command, sync=True, output_redirect=None) -> ShellExecResult:
-        return local_shell_exec(command, sync, output_redirect)
+    def exec(self, command, sync=True, output_redirect=None, input_content=None) -> ShellExecResult:
+        return local_shell_exec(command, sync, output_redirect, input_content=input_content)
+
+    # The file operations below are done in-process if their paths are plain (else by the shell as usual),
+    # which saves starting a process for each of them
+
+    def make_full_dir(self, directory):
+        if not _is_plain_path(directory):
+            return super().make_full_dir(directory)
+        return _native_exec(lambda: os.makedirs(directory, exist_ok=True))
+
+    def write_file(self, file_path, content=""):
+        if not _is_plain_path(file_path):
+            return super().write_file(file_path, content)
+        return _native_exec(lambda: _write_file_content(file_path, (content + "\n").encode("utf-8")))
+
+    def read_file(self, file_path):
+        if not _is_plain_path(file_path):
+            return super().read_file(file_path)
+        return _native_exec(lambda: _read_file_content(file_path).decode("utf-8")).output
+
+    def remove(self, path):
+        if not _is_plain_path(path):
+            return super().remove(path)
+        return _native_exec(lambda: os.remove(path))
+
+    def copy_file(self, source_file, target_path):
+        if not _is_plain_path(source_file) or not _is_plain_path(target_path):
+            return super().copy_file(source_file, target_path)
+        return _native_exec(lambda: shutil.copy(source_file, target_path) and None)
+
+    def sed_replace_in_file_plain(self, target_file, search_term, replace_term):
+        if not _is_plain_path(target_file) or len(search_term) == 0 \
+                or "\n" in search_term or "\n" in replace_term:
+            return super().sed_replace_in_file_plain(target_file, search_term, replace_term)
+        return _native_exec(lambda: _replace_in_file_content(target_file, search_term, replace_term))
+
+    def path_exists(self, path):
+        if not _is_plain_path(path):
+            return super().path_exists(path)
+        return os.path.isdir(path)
+
+    def file_exists(self, file_path):
+        if not _is_plain_path(file_path):
+            return super().file_exists(file_path)
+        return os.path.isfile(file_path)
+
+    def get_direct_sub_dirs(self, target_dir):
+        if not _is_plain_path(target_dir):
+            return super().get_direct_sub_dirs(target_dir)
+        return sorted(filter(os.path.isdir, glob.glob(target_dir + "/*")))
+
+
+def _ssh_control_dir():
+    control_dir = os.path.join(tempfile.gettempdir(), "exputil-ssh-%d" % os.getuid())
+    os.makedirs(control_dir, mode=0o700, exist_ok=True)
+    return control_dir
 
 
 class RemoteShell(Shell):
 
-    def __init__(self, user, host):
+    def __init__(self, user, host, multiplex=True, control_persist_s=600):
+        """
+        Shell which executes each command on the remote host using ssh.
+
+        :param user:                Remote user
+        :param host:                Remote host
+        :param multiplex:           True iff all commands (also of other remote shells to the same user@host)
+                                    share a single persistent ssh connection, such that only the first
+                                    command pays for the connection set-up
+        :param control_persist_s:   How long (s) the shared connection stays open after its last command
+        """
         self.user = user
         self.host = host
-        self.remote = ["ssh", "%s@%s" % (self.user, self.host)]
+        self.multiplex = multiplex
+        if multiplex:
+            self.control_options = [
+                "-o", "ControlPath=%s/%%C" % _ssh_control_dir(),
+                "-o", "ControlPersist=%d" % control_persist_s,
+            ]
+            self.remote = ["ssh", "-o", "ControlMaster=auto"] + self.control_options + ["%s@%s" % (self.user, self.host)]
+        else:
+            self.control_options = []
+            self.remote = ["ssh", "%s@%s" % (self.user, self.host)]
 
-    def exec(self, command, sync=True, output_redirect=None) -> ShellExecResult:
-        return local_shell_exec(command, sync, output_redirect, self.remote)
+    def _remote_exec_prefix_arr(self):
+        return self.remote
+
+    def _control_exec(self, control_command):
+        return subprocess.run(
+            ["ssh", "-O", control_command] + self.control_options + ["%s@%s" % (self.user, self.host)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ).returncode == 0
+
+    def is_connected(self):
+        """
+        Check whether the shared connection is open.
+
+        :return: True iff multiplexed and the shared connection is open
+        """
+        return self.multiplex and self._control_exec("check")
+
+    def close(self):
+        """
+        Close the shared connection (it is opened again by the next command).
+        """
+        if self.multiplex:
+            self._control_exec("exit")
+
+    def exec(self, command, sync=True, output_redirect=None, input_content=None) -> ShellExecResult:
+        res = local_shell_exec(command, sync, output_redirect, self.remote, input_content)
+
+        # ssh returns 255 if the connection failed: if the shared connection is no longer open
+        # (e.g., the network was interrupted), it is reconnected and the command is retried once
+        if sync and self.multiplex and res.return_code == 255 and not self.is_connected():
+            self.close()
+            res = local_shell_exec(command, sync, output_redirect, self.remote, input_content)
+        return res
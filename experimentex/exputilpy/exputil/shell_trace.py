@@ -0,0 +1,178 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import re
+import json
+import time
+import shlex
+
+
+# The trace file is passed on through the environment, such that the commands of
+# child processes (e.g., a plot script started by a pipeline step) are traced as well
+SHELL_TRACE_ENVIRONMENT_VARIABLE = "EXPUTIL_SHELL_TRACE"
+
+
+def enable_shell_trace(trace_filename):
+    """
+    Enable tracing of the commands executed through a shell (of this process and its child processes).
+    Each command is appended as a JSON line to the trace file.
+
+    :param trace_filename:  Trace filename (e.g., shell-trace.jsonl)
+    """
+    os.environ[SHELL_TRACE_ENVIRONMENT_VARIABLE] = os.path.abspath(trace_filename)
+
+
+def disable_shell_trace():
+    """
+    Disable tracing of the commands executed through a shell.
+    """
+    os.environ.pop(SHELL_TRACE_ENVIRONMENT_VARIABLE, None)
+
+
+def extract_executable(command):
+    """
+    Extract the name of the executable a command executes, skipping leading "cd" commands
+    and environment variable assignments (e.g., "cd a && X=1 ./waf build" executes "waf").
+
+    :param command:     Bash command
+
+    :return: Executable name (empty string if there is none)
+    """
+    for segment in re.split(r"&&|\|\||;|\|", command):
+        try:
+            tokens = shlex.split(segment)
+        except ValueError:
+            tokens = segment.split()  # Quotes which span multiple segments
+        while len(tokens) > 0 and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", tokens[0]):
+            tokens = tokens[1:]
+        if len(tokens) == 0 or tokens[0] == "cd":
+            continue
+        return os.path.basename(tokens[0])
+    return ""
+
+
+def record_shell_trace(command, duration_s, return_code, output, remote=None):
+    """
+    Append the execution of a command to the trace file (if tracing is enabled).
+
+    :param command:         Bash command
+    :param duration_s:      Wall time (s) of the execution (None if unknown, e.g. if it is async)
+    :param return_code:     Return code (None if unknown)
+    :param output:          Output (None if it was not captured)
+    :param remote:          user@host it was executed at (None if local)
+    """
+    trace_filename = os.environ.get(SHELL_TRACE_ENVIRONMENT_VARIABLE)
+    if not trace_filename:
+        return
+    record = {
+        "time": time.time(),
+        "command": command,
+        "executable": extract_executable(command),
+        "cwd": os.getcwd(),
+        "remote": remote,
+        "duration_s": duration_s,
+        "return_code": return_code,
+        "output_size_byte": None if output is None else len(output.encode("utf-8")),
+    }
+    with open(trace_filename, "a") as f_out:
+        f_out.write(json.dumps(record) + "\n")
+
+
+def read_shell_trace(trace_filename):
+    """
+    Read the records of a trace file.
+
+    :param trace_filename:  Trace filename
+
+    :return: List of records (dictionaries), in order of completion
+    """
+    records = []
+    with open(trace_filename, "r") as f_in:
+        for line in f_in:
+            if len(line.strip()) > 0:
+                records.append(json.loads(line))
+    return records
+
+
+def summarize_shell_trace(trace_filename):
+    """
+    Summarize a trace file by executable.
+
+    :param trace_filename:  Trace filename
+
+    :return: List of (executable, summary) sorted by total duration (descending), with each summary
+             a dictionary of count, total_duration_s, max_duration_s, num_failed and total_output_size_byte
+    """
+    executable_to_summary = {}
+    for record in read_shell_trace(trace_filename):
+        summary = executable_to_summary.setdefault(record["executable"], {
+            "count": 0,
+            "total_duration_s": 0.0,
+            "max_duration_s": 0.0,
+            "num_failed": 0,
+            "total_output_size_byte": 0,
+        })
+        summary["count"] += 1
+        if record["duration_s"] is not None:
+            summary["total_duration_s"] += record["duration_s"]
+            summary["max_duration_s"] = max(summary["max_duration_s"], record["duration_s"])
+        if record["return_code"] is not None and record["return_code"] != 0:
+            summary["num_failed"] += 1
+        if record["output_size_byte"] is not None:
+            summary["total_output_size_byte"] += record["output_size_byte"]
+    return sorted(executable_to_summary.items(), key=lambda x: (-x[1]["total_duration_s"], x[0]))
+
+
+def print_shell_trace_summary(trace_filename):
+    """
+    Print the summary by executable of a trace file.
+
+    :param trace_filename:  Trace filename
+    """
+    summaries = summarize_shell_trace(trace_filename)
+    overall_duration_s = sum(map(lambda x: x[1]["total_duration_s"], summaries))
+    print("%-20s %8s %12s %8s %12s %8s %14s" % (
+        "Executable", "Count", "Total (s)", "Share", "Mean (ms)", "Failed", "Output (byte)"
+    ))
+    for executable, summary in summaries:
+        print("%-20s %8d %12.3f %7.1f%% %12.1f %8d %14d" % (
+            executable if len(executable) > 0 else "(none)",
+            summary["count"],
+            summary["total_duration_s"],
+            summary["total_duration_s"] / overall_duration_s * 100.0 if overall_duration_s > 0 else 0.0,
+            summary["total_duration_s"] / summary["count"] * 1000.0,
+            summary["num_failed"],
+            summary["total_output_size_byte"]
+        ))
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 -m exputil.shell_trace <trace filename>")
+        exit(1)
+    print_shell_trace_summary(sys.argv[1])
+
+
+if __name__ == "__main__":
+    main()
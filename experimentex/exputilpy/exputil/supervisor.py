@@ -0,0 +1,250 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+import time
+import shlex
+from enum import Enum
+
+
+class JobStatus(Enum):
+    RUNNING = 0
+    FINISHED = 1  # It exited by itself, and its return code is known
+    LOST = 2      # It is no longer running, but did not record its return code (e.g., it was killed)
+
+
+_JOB_NAME_REGEX = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+class ProcessSupervisor:
+    """
+    Supervisor of detached processes (jobs) executed through a shell, which also works over a RemoteShell.
+
+    Each job is started in its own session (so it survives the shell and can be killed as a whole),
+    and has three files in the state directory:
+     - <name>.pid: process identifier of the job (also its process group and session identifier)
+     - <name>.exit: return code of the job, which is (atomically) written once it has exited
+     - <name>.log: output (stdout and stderr) of the job
+
+    The status of all jobs is retrieved by executing a single command.
+    """
+
+    def __init__(self, shell, state_dir):
+        """
+        :param shell:       Shell to execute the jobs in (LocalShell or RemoteShell)
+        :param state_dir:   Directory of the state files of the jobs (relative paths are relative
+                            to the working directory of the shell, e.g., the home directory if remote)
+        """
+        self.shell = shell
+        self.state_dir = state_dir
+        self.collected = set()
+
+    def _state_file(self, name, extension):
+        return shlex.quote(self.state_dir + "/" + name + extension)
+
+    def start(self, name, command, cwd=None, cpu_time_limit_s=None, memory_limit_byte=None, max_num_open_files=None):
+        """
+        Start a job in the background.
+
+        :param name:                Job name (unique within the state directory, consisting of [A-Za-z0-9_.-])
+        :param command:             Bash command
+        :param cwd:                 Working directory of the command (None: working directory of the shell)
+        :param cpu_time_limit_s:    Limit on the CPU time (s) of each of its processes (None: no limit)
+        :param memory_limit_byte:   Limit on the virtual memory (byte) of each of its processes (None: no limit)
+        :param max_num_open_files:  Limit on the number of open files of each of its processes (None: no limit)
+
+        :return: Process identifier of the job
+        """
+        if _JOB_NAME_REGEX.match(name) is None:
+            raise ValueError("Invalid job name (must consist of [A-Za-z0-9_.-]): %s" % name)
+
+        # The command is executed in a sub-shell with its resource limits
+        limits = []
+        if cpu_time_limit_s is not None:
+            limits.append("ulimit -t %d" % int(cpu_time_limit_s))
+        if memory_limit_byte is not None:
+            limits.append("ulimit -v %d" % (int(memory_limit_byte) // 1024))
+        if max_num_open_files is not None:
+            limits.append("ulimit -n %d" % int(max_num_open_files))
+        if cwd is not None:
+            limits.append("cd %s" % shlex.quote(cwd))
+        wrapper = "(%s); echo $? > %s && mv %s %s" % (
+            " && ".join(limits + ["exec bash -c %s" % shlex.quote(command)]),
+            self._state_file(name, ".exit.tmp"),
+            self._state_file(name, ".exit.tmp"),
+            self._state_file(name, ".exit"),
+        )
+
+        # Its process identifier is written before the start command returns
+        self.collected.discard(name)
+        self.shell.perfect_exec(
+            "mkdir -p %s && rm -f %s %s && { setsid bash -c %s > %s 2>&1 < /dev/null & echo $! > %s; }" % (
+                shlex.quote(self.state_dir),
+                self._state_file(name, ".pid"),
+                self._state_file(name, ".exit"),
+                shlex.quote(wrapper),
+                self._state_file(name, ".log"),
+                self._state_file(name, ".pid"),
+            )
+        )
+        return int(self.shell.read_file(self.state_dir + "/" + name + ".pid").strip())
+
+    def statuses(self):
+        """
+        Retrieve the status of all jobs in the state directory.
+
+        :return: Mapping of job name to (JobStatus, return code (None if not FINISHED))
+        """
+        res = self.shell.perfect_exec(
+            "if [ -d %s ]; then cd %s && for f in *.pid; do "
+            "[ -f \"$f\" ] || continue; n=\"${f%%.pid}\"; "
+            "if [ -f \"$n.exit\" ]; then echo \"$n F $(cat \"$n.exit\")\"; "
+            "elif kill -0 \"$(cat \"$f\")\" 2>/dev/null; then echo \"$n R\"; "
+            "else echo \"$n L\"; fi; done; fi" % (shlex.quote(self.state_dir), shlex.quote(self.state_dir))
+        )
+        name_to_status = {}
+        for line in res.output.strip().split("\n"):
+            spl = line.split()
+            if len(spl) == 0:
+                continue
+            if spl[1] == "F":
+                name_to_status[spl[0]] = (JobStatus.FINISHED, int(spl[2]))
+            elif spl[1] == "R":
+                name_to_status[spl[0]] = (JobStatus.RUNNING, None)
+            else:
+                name_to_status[spl[0]] = (JobStatus.LOST, None)
+        return name_to_status
+
+    def status(self, name):
+        """
+        Retrieve the status of a job.
+
+        :param name:    Job name
+
+        :return: (JobStatus, return code (None if not FINISHED))
+        """
+        name_to_status = self.statuses()
+        if name not in name_to_status:
+            raise ValueError("Job does not exist: %s" % name)
+        return name_to_status[name]
+
+    def count_running(self):
+        """
+        Count the number of jobs which are running.
+
+        :return: Number of running jobs
+        """
+        return len(list(filter(lambda x: x[0] == JobStatus.RUNNING, self.statuses().values())))
+
+    def wait_any(self, names=None, poll_interval_s=0.1, timeout_s=None):
+        """
+        Wait till any job has exited which has not been returned by a wait before.
+
+        :param names:               Job names to wait for (None: all jobs in the state directory)
+        :param poll_interval_s:     Time (s) in between retrievals of the status
+        :param timeout_s:           Maximum time (s) to wait (None: no maximum)
+
+        :return: (Job name, JobStatus, return code (None if LOST)), or None if there is no job left to wait for
+        """
+        start = time.perf_counter()
+        while True:
+            name_to_status = self.statuses()
+            pending = list(filter(
+                lambda x: x not in self.collected, name_to_status.keys() if names is None else names
+            ))
+            if len(pending) == 0:
+                return None
+            for name in sorted(pending):
+                if name not in name_to_status:
+                    raise ValueError("Job does not exist: %s" % name)
+                if name_to_status[name][0] != JobStatus.RUNNING:
+                    self.collected.add(name)
+                    return name, name_to_status[name][0], name_to_status[name][1]
+            if timeout_s is not None and time.perf_counter() - start + poll_interval_s > timeout_s:
+                raise TimeoutError("Timeout of %.1f s exceeded while waiting for any job to exit" % timeout_s)
+            time.sleep(poll_interval_s)
+
+    def wait_all(self, names=None, poll_interval_s=0.1, timeout_s=None):
+        """
+        Wait till all jobs have exited which have not been returned by a wait before.
+
+        :param names:               Job names to wait for (None: all jobs in the state directory)
+        :param poll_interval_s:     Time (s) in between retrievals of the status
+        :param timeout_s:           Maximum time (s) to wait (None: no maximum)
+
+        :return: Mapping of job name to (JobStatus, return code (None if LOST))
+        """
+        start = time.perf_counter()
+        name_to_result = {}
+        while True:
+            remaining_timeout_s = None if timeout_s is None else max(0.0, timeout_s - (time.perf_counter() - start))
+            result = self.wait_any(names, poll_interval_s, remaining_timeout_s)
+            if result is None:
+                return name_to_result
+            name_to_result[result[0]] = (result[1], result[2])
+
+    def kill(self, name, signal_name="TERM"):
+        """
+        Send a signal to all processes of a job.
+
+        :param name:            Job name
+        :param signal_name:     Signal name (e.g., TERM or KILL)
+
+        :return: True iff the job was still running
+        """
+        res = self.shell.valid_exec("kill -%s -$(cat %s) 2>/dev/null" % (
+            shlex.quote(signal_name), self._state_file(name, ".pid")
+        ))
+        return res.return_code == 0
+
+    def kill_all(self, signal_name="TERM"):
+        """
+        Send a signal to all processes of all running jobs.
+
+        :param signal_name:     Signal name (e.g., TERM or KILL)
+        """
+        for name, status in self.statuses().items():
+            if status[0] == JobStatus.RUNNING:
+                self.kill(name, signal_name)
+
+    def read_log(self, name):
+        """
+        Read the output (stdout and stderr) of a job.
+
+        :param name:    Job name
+
+        :return: Output
+        """
+        return self.shell.read_file(self.state_dir + "/" + name + ".log")
+
+    def remove(self, name):
+        """
+        Remove the state files of a job which is no longer running.
+
+        :param name:    Job name
+        """
+        if self.status(name)[0] == JobStatus.RUNNING:
+            raise ValueError("Job is still running: %s" % name)
+        self.shell.perfect_exec("rm -f %s %s %s" % (
+            self._state_file(name, ".pid"), self._state_file(name, ".exit"), self._state_file(name, ".log")
+        ))
+        self.collected.discard(name)
@@ -20,9 +20,12 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
 import unittest
 import random
+import tracemalloc
 from exputil import *
+from exputil import input_output
 
 
 class TestCsv(unittest.TestCase):
@@ -286,3 +289,497 @@ class TestCsv(unittest.TestCase):
         except ValueError:
             self.assertTrue(True)
 
+    def test_numpy_engine_same_as_python_engine(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        for content, line_values_format, row_filter_keep_function in [
+            ("a,b,10,-9.3\nabc,def,-100000,30.24", "string,string,int,float", None),
+            ("a,b,10,-9.3\nabc,def,-100000,30.24\nc,ghi,-1440000, -1294898294", "string,string,int,float",
+             lambda row: row[2] >= -100000),
+            ("a,10\nb,100\nc,-2\n", "string,float", lambda row: row[1] >= -2),
+            ("9998.8,-0", "pos_float,int", None),
+            ("\n", "string", None),
+            ("", "idx_int,string", None),
+            ("0, x ,3\n1,,0\n2,y\t,5\n", "idx_int,string,pos_int", None),
+        ]:
+            with open("temp/test.csv", "w+") as f_out:
+                f_out.write(content)
+            data_columns_python = read_csv_direct_in_columns(
+                "temp/test.csv", line_values_format, row_filter_keep_function
+            )
+            data_columns_numpy = read_csv_direct_in_columns(
+                "temp/test.csv", line_values_format, row_filter_keep_function, engine="numpy"
+            )
+            self.assertEqual(len(data_columns_python), len(data_columns_numpy))
+            for j in range(len(data_columns_python)):
+                self.assertEqual(data_columns_python[j], data_columns_numpy[j].tolist())
+        local_shell.remove_force_recursive("temp")
+
+    def test_numpy_engine_big(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(88888888)
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(100000):
+                f_out.write("%d,%d,%s,%s,%d,%s\n" % (
+                    i, random.randint(-99999, 999999), str(random.random() * 10000000.0 - 5000000.0),
+                    "a" * random.randint(0, 30), random.randint(0, 999999), str(random.random() * 10000000.0)
+                ))
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        data_columns_python = read_csv_direct_in_columns("temp/test.csv", line_values_format)
+        data_columns_numpy = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="numpy")
+        self.assertEqual(data_columns_python, list(map(lambda x: x.tolist(), data_columns_numpy)))
+        self.assertEqual(str(data_columns_numpy[0].dtype), "int64")
+        self.assertEqual(str(data_columns_numpy[2].dtype), "float64")
+        local_shell.remove_force_recursive("temp")
+
+    def test_numpy_engine_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        for content, line_values_format in [
+            ("\n", "int"),
+            ("\n", "string,int"),
+            ("-9.3,56", "int,int"),
+            ("-9.3,56,abc", "string,int,float"),
+            ("-0.00001", "pos_float"),
+            ("-1", "pos_int"),
+            ("1", "idx_int"),
+            ("0\n1\n3", "idx_int"),
+            ("99999999999999999999", "int"),
+            ("-9.3,56,abc,9", "float,int,string"),
+            ("-9.3,56", "float,int,int"),
+            ("-9.4", "float,int"),
+            ("1,2\n3", "int,int"),
+            ("1,2\n3,4,5\n6", "int,int"),
+            ("-9.4", "floatint"),
+            ("-9.4,8", "string,tsring"),
+            ("-9.4,8", "string,"),
+            ("-9.4", ""),
+        ]:
+            with open("temp/test.csv", "w+") as f_out:
+                f_out.write(content)
+            try:
+                read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="numpy")
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid engine
+        try:
+            read_csv_direct_in_columns("temp/test.csv", "string", engine="fast")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        local_shell.remove_force_recursive("temp")
+
+    def test_batches_same_as_whole_file(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(77777777)
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(1003):
+                f_out.write("%d,%d,%s,%s\n" % (
+                    i, random.randint(0, 999999), str(random.random() * 100.0 - 50.0), "b" * random.randint(0, 5)
+                ))
+        line_values_format = "idx_int,pos_int,float,string"
+        for row_filter_keep_function in [None, lambda row: row[2] >= 0.0]:
+            data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, row_filter_keep_function)
+            for engine in ["python", "numpy"]:
+                for batch_size in [1, 10, 1003, 5000]:
+                    batches = list(iterate_csv_in_column_batches(
+                        "temp/test.csv", line_values_format, batch_size, row_filter_keep_function, engine
+                    ))
+                    self.assertEqual(len(batches), int((1003 + batch_size - 1) / batch_size))
+                    for j in range(4):
+                        concatenated = []
+                        for batch in batches:
+                            concatenated.extend(batch[j] if engine == "python" else batch[j].tolist())
+                        self.assertEqual(data_columns[j], concatenated)
+
+        # Folding a statistic incrementally
+        total = 0
+        for batch in iterate_csv_in_column_batches("temp/test.csv", line_values_format, 100):
+            total += sum(batch[1])
+        self.assertEqual(total, sum(read_csv_direct_in_columns("temp/test.csv", line_values_format)[1]))
+        local_shell.remove_force_recursive("temp")
+
+    def test_batches_empty_file(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        with open("temp/test.csv", "w+") as f_out:
+            f_out.write("")
+        for engine in ["python", "numpy"]:
+            self.assertEqual(
+                list(iterate_csv_in_column_batches("temp/test.csv", "idx_int,string", 10, engine=engine)), []
+            )
+        local_shell.remove_force_recursive("temp")
+
+    def test_batches_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        for content, line_values_format, batch_size in [
+            ("0\n1\n3", "idx_int", 1),
+            ("0\n1\n3", "idx_int", 2),
+            ("0\n2\n3", "idx_int", 1),
+            ("1,2\n3", "int,int", 1),
+            ("1,2\n3,4\n-5,6", "pos_int,int", 2),
+            ("-9.4", "floatint", 1),
+            ("1", "int", 0),
+            ("1", "int", -1),
+            ("1", "int", 1.5),
+        ]:
+            local_shell.write_file("temp/test.csv", content)
+            for engine in ["python", "numpy"]:
+                try:
+                    for _ in iterate_csv_in_column_batches(
+                            "temp/test.csv", line_values_format, batch_size, engine=engine
+                    ):
+                        pass
+                    self.fail()
+                except ValueError:
+                    self.assertTrue(True)
+
+        # Index integer constraint error refers to the line in the file
+        local_shell.write_file("temp/test.csv", "0\n1\n2\n4")
+        for engine in ["python", "numpy"]:
+            try:
+                list(iterate_csv_in_column_batches("temp/test.csv", "idx_int", 2, engine=engine))
+                self.fail()
+            except ValueError as e:
+                self.assertEqual(str(e), "Index integer constraint violated on line 3")
+
+        # Invalid engine is reported upon calling, not only upon iterating
+        try:
+            iterate_csv_in_column_batches("temp/test.csv", "string", 10, engine="fast")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        local_shell.remove_force_recursive("temp")
+
+    def test_predicates_same_as_filter_function(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(66666666)
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(2000):
+                f_out.write("%d,%d,%s,%s,%d\n" % (
+                    i, random.randint(0, 99), str(random.random() * 100.0 - 50.0),
+                    random.choice(["YES", "NO_ONGOING", "NO_CONN_FAIL"]), random.randint(-5, 5)
+                ))
+        line_values_format = "idx_int,pos_int,float,string,int"
+        for row_filter_predicates, row_filter_keep_function in [
+            ([(1, "==", 50)], lambda row: row[1] == 50),
+            ([(1, "!=", 50)], lambda row: row[1] != 50),
+            ([(2, "<", 0.0)], lambda row: row[2] < 0.0),
+            ([(2, "<=", 10.5)], lambda row: row[2] <= 10.5),
+            ([(4, ">", 0)], lambda row: row[4] > 0),
+            ([(4, ">=", 0)], lambda row: row[4] >= 0),
+            ([(3, "in", ("YES", "NO_CONN_FAIL"))], lambda row: row[3] in ("YES", "NO_CONN_FAIL")),
+            ([(4, "not in", {-5, 0, 5})], lambda row: row[4] not in {-5, 0, 5}),
+            ([(1, "range", (10, 20))], lambda row: 10 <= row[1] < 20),
+            ([(1, "range", (10, 90)), (3, "==", "YES"), (2, ">", -25.0)],
+             lambda row: 10 <= row[1] < 90 and row[3] == "YES" and row[2] > -25.0),
+            ([], lambda row: True),
+        ]:
+            data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, row_filter_keep_function)
+            for engine in ["python", "numpy"]:
+
+                # All columns
+                data_columns_predicates = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, row_filter_predicates=row_filter_predicates
+                )
+                self.assertEqual(data_columns, list(map(list, data_columns_predicates)))
+
+                # Projected columns
+                data_columns_projected = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, row_filter_predicates=row_filter_predicates,
+                    column_indices=[3, 0]
+                )
+                self.assertEqual(len(data_columns_projected), 2)
+                self.assertEqual(data_columns[3], list(data_columns_projected[0]))
+                self.assertEqual(data_columns[0], list(data_columns_projected[1]))
+
+                # Predicates and filter function combined, batch-by-batch
+                concatenated = [[], []]
+                for batch in iterate_csv_in_column_batches(
+                        "temp/test.csv", line_values_format, 300, lambda row: row[0] % 2 == 0, engine,
+                        row_filter_predicates, [0, 2]
+                ):
+                    concatenated[0].extend(batch[0])
+                    concatenated[1].extend(batch[1])
+                self.assertEqual(list(filter(lambda x: x % 2 == 0, data_columns[0])), concatenated[0])
+                self.assertEqual(
+                    list(map(lambda x: x[1], filter(lambda x: x[0] % 2 == 0, zip(data_columns[0], data_columns[2])))),
+                    concatenated[1]
+                )
+        local_shell.remove_force_recursive("temp")
+
+    def test_projection_does_not_parse_other_columns(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.csv", "0,abc,1.5\n1,def,-2.5\n2,,3.5")
+        for engine in ["python", "numpy"]:
+            data_columns = read_csv_direct_in_columns(
+                "temp/test.csv", "idx_int,int,float", engine=engine, column_indices=[2]
+            )
+            self.assertEqual([1.5, -2.5, 3.5], list(data_columns[0]))
+
+        # The python engine does not parse the other values of rows which do not satisfy the predicates
+        local_shell.write_file("temp/test.csv", "0,abc\n1,5")
+        data_columns = read_csv_direct_in_columns(
+            "temp/test.csv", "idx_int,int", row_filter_predicates=[(0, "==", 1)]
+        )
+        self.assertEqual([[1], [5]], data_columns)
+        local_shell.remove_force_recursive("temp")
+
+    def test_predicates_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.csv", "0,1\n1,2")
+        for row_filter_predicates, column_indices in [
+            ([(2, "==", 1)], None),
+            ([(-1, "==", 1)], None),
+            ([("0", "==", 1)], None),
+            ([(0, "=", 1)], None),
+            ([(0, "==")], None),
+            ([[0, "==", 1]], None),
+            ([(0, "in", 1)], None),
+            ([(0, "range", (1, 2, 3))], None),
+            ([(0, "range", [1, 2])], None),
+            (None, [2]),
+            (None, [0, 0]),
+            (None, [1.0]),
+        ]:
+            for engine in ["python", "numpy"]:
+                try:
+                    read_csv_direct_in_columns(
+                        "temp/test.csv", "idx_int,int", engine=engine, row_filter_predicates=row_filter_predicates,
+                        column_indices=column_indices
+                    )
+                    self.fail()
+                except ValueError:
+                    self.assertTrue(True)
+        local_shell.remove_force_recursive("temp")
+
+    def test_storage(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(55555555)
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(1000):
+                f_out.write("%d,%d,%s,%s,%d\n" % (
+                    i, random.randint(0, 99), str(random.random() * 100.0 - 50.0),
+                    random.choice(["YES", "NO_ONGOING"]), random.randint(-5, 5)
+                ))
+        line_values_format = "idx_int,pos_int,float,string,int"
+        data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format)
+        for engine in ["python", "numpy"]:
+            for storage in ["list", "array", "numpy"]:
+                data_columns_storage = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, storage=storage,
+                    row_filter_predicates=[(4, "!=", 0)]
+                )
+
+                # Indexing and iterating are the same
+                self.assertEqual(len(data_columns_storage), 5)
+                for j in range(5):
+                    expected = list(map(lambda x: x[j], filter(lambda x: x[4] != 0, zip(*data_columns))))
+                    self.assertEqual(len(expected), len(data_columns_storage[j]))
+                    self.assertEqual(expected, list(data_columns_storage[j]))
+                    self.assertEqual(expected[7], data_columns_storage[j][7])
+
+                # Types
+                if storage == "list":
+                    self.assertTrue(all(map(lambda x: isinstance(x, list), data_columns_storage)))
+                elif storage == "array":
+                    self.assertEqual(data_columns_storage[0].typecode, "q")
+                    self.assertEqual(data_columns_storage[1].typecode, "q")
+                    self.assertEqual(data_columns_storage[2].typecode, "d")
+                    self.assertTrue(isinstance(data_columns_storage[3], list))
+                    self.assertEqual(data_columns_storage[4].typecode, "q")
+                else:
+                    self.assertEqual(str(data_columns_storage[0].dtype), "int64")
+                    self.assertEqual(str(data_columns_storage[2].dtype), "float64")
+                    self.assertEqual(str(data_columns_storage[3].dtype), "object")
+
+                # Strings are interned such that equal values are the same object
+                if storage != "list":
+                    yes_values = list(filter(lambda x: x == "YES", data_columns_storage[3]))
+                    self.assertTrue(all(map(lambda x: x is yes_values[0], yes_values)))
+
+            # Batches and empty file
+            for storage in ["list", "array", "numpy"]:
+                total = 0
+                for batch in iterate_csv_in_column_batches(
+                        "temp/test.csv", line_values_format, 300, engine=engine, storage=storage
+                ):
+                    total += sum(batch[1])
+                self.assertEqual(sum(data_columns[1]), total)
+        with open("temp/empty.csv", "w+") as f_out:
+            f_out.write("")
+        for engine in ["python", "numpy"]:
+            for storage in ["list", "array", "numpy"]:
+                data_columns_storage = read_csv_direct_in_columns(
+                    "temp/empty.csv", line_values_format, engine=engine, storage=storage
+                )
+                self.assertEqual([[], [], [], [], []], list(map(list, data_columns_storage)))
+        local_shell.remove_force_recursive("temp")
+
+    def test_storage_is_compact(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(100000):
+                f_out.write("%d,%d,%d,%s\n" % (i, i * 1000, 1000000000 + i, "YES" if i % 3 == 0 else "NO_ONGOING"))
+        line_values_format = "idx_int,pos_int,pos_int,string"
+        tracemalloc.start()
+        memory_use = {}
+        for engine, storage in [("python", "list"), ("python", "array"), ("numpy", "numpy")]:
+            before, _ = tracemalloc.get_traced_memory()
+            data_columns = read_csv_direct_in_columns(
+                "temp/test.csv", line_values_format, engine=engine, storage=storage
+            )
+            after, _ = tracemalloc.get_traced_memory()
+            memory_use[storage] = after - before
+            del data_columns
+        tracemalloc.stop()
+        self.assertLess(memory_use["array"] * 3, memory_use["list"])
+        self.assertLess(memory_use["numpy"] * 3, memory_use["list"])
+        local_shell.remove_force_recursive("temp")
+
+    def test_storage_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.csv", "0,99999999999999999999")
+
+        # Integers which do not fit in 64 bits are only allowed in list storage
+        self.assertEqual(
+            [[0], [99999999999999999999]], read_csv_direct_in_columns("temp/test.csv", "idx_int,int", storage="list")
+        )
+        for engine, storage in [("python", "array"), ("python", "numpy"), ("numpy", "list"), ("numpy", "array")]:
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,int", engine=engine, storage=storage)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid storage
+        try:
+            read_csv_direct_in_columns("temp/test.csv", "idx_int,int", storage="dict")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        local_shell.remove_force_recursive("temp")
+
+    def test_split_into_newline_aligned_byte_ranges(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        for content in ["", "a", "a\n", "abc\ndef\nghi\n", "abc\ndef\nghi", "\n\n\n\n\n\n", "x" * 1000 + "\ny\n"]:
+            with open("temp/test.csv", "w+") as f_out:
+                f_out.write(content)
+            for num_ranges in [1, 2, 3, 7, 100]:
+                byte_ranges = split_into_newline_aligned_byte_ranges("temp/test.csv", num_ranges)
+                self.assertTrue(len(byte_ranges) <= num_ranges)
+                self.assertEqual("".join(map(lambda x: content[x[0]:x[1]], byte_ranges)), content)
+                for byte_range in byte_ranges:
+                    self.assertTrue(byte_range[0] < byte_range[1])
+                    self.assertTrue(byte_range[1] == len(content) or content[byte_range[1] - 1] == "\n")
+        local_shell.remove_force_recursive("temp")
+
+    def test_parallel_same_as_serial(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(44444444)
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(60000):
+                f_out.write("%d,%d,%s,%s,%d\n" % (
+                    i, random.randint(0, 99999999), str(random.random() * 100.0 - 50.0),
+                    random.choice(["YES", "NO_ONGOING"]), random.randint(-5, 5)
+                ))
+        line_values_format = "idx_int,pos_int,float,string,int"
+        data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format)
+        for engine in ["python", "numpy"]:
+            for storage in ["list", "array", "numpy"]:
+                data_columns_parallel = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, storage=storage,
+                    row_filter_predicates=[(4, ">=", 0)], column_indices=[0, 2, 3], num_processes=3
+                )
+                kept = list(filter(lambda x: x[4] >= 0, zip(*data_columns)))
+                self.assertEqual(list(map(lambda x: x[0], kept)), list(data_columns_parallel[0]))
+                self.assertEqual(list(map(lambda x: x[2], kept)), list(data_columns_parallel[1]))
+                self.assertEqual(list(map(lambda x: x[3], kept)), list(data_columns_parallel[2]))
+
+        # Index integer constraint is checked across the byte ranges
+        with open("temp/test.csv", "a") as f_out:
+            f_out.write("60001,1,1.0,YES,1\n")
+        for engine in ["python", "numpy"]:
+            try:
+                read_csv_direct_in_columns("temp/test.csv", line_values_format, engine=engine, num_processes=3)
+                self.fail()
+            except ValueError as e:
+                self.assertEqual(str(e), "Index integer constraint violated on line 60000")
+
+        # Row filter function cannot be sent to other processes, and invalid number of processes
+        for num_processes in [2, 0, -1, 1.5]:
+            try:
+                read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, lambda row: True, num_processes=num_processes
+                )
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+        local_shell.remove_force_recursive("temp")
+
+    def test_compressed(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(33333333)
+        content = ""
+        for i in range(5000):
+            content += "%d,%d,%s\n" % (i, random.randint(0, 999), random.choice(["YES", "NO_ONGOING"]))
+        line_values_format = "idx_int,pos_int,string"
+        extensions = [".gz"] if input_output.zstandard is None else [".gz", ".zst"]
+        for extension in extensions:
+            with open("temp/test.csv", "w+") as f_out:
+                f_out.write(content)
+            data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format)
+            uncompressed_size_byte = os.path.getsize("temp/test.csv")
+            self.assertEqual(compress_file("temp/test.csv", extension), "temp/test.csv" + extension)
+            self.assertFalse(os.path.exists("temp/test.csv"))
+            self.assertEqual(resolve_possibly_compressed_filename("temp/test.csv"), "temp/test.csv" + extension)
+            self.assertLess(os.path.getsize("temp/test.csv" + extension) * 3, uncompressed_size_byte)
+
+            # Same as the uncompressed file for every way of reading
+            with open_possibly_compressed("temp/test.csv") as f_in:
+                self.assertEqual(content, f_in.read())
+            for engine in ["python", "numpy"]:
+                self.assertEqual(data_columns, list(map(list, read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine
+                ))))
+                self.assertEqual(data_columns, list(map(list, read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, num_processes=2
+                ))))
+                total = 0
+                for batch in iterate_csv_in_column_batches("temp/test.csv", line_values_format, 1000, engine=engine):
+                    total += sum(batch[1])
+                self.assertEqual(sum(data_columns[1]), total)
+            local_shell.remove("temp/test.csv" + extension)
+
+        # The uncompressed file takes precedence
+        local_shell.write_file("temp/test.csv", "0,1,YES")
+        compress_file("temp/test.csv", ".gz")
+        local_shell.write_file("temp/test.csv", "0,2,NO")
+        self.assertEqual([[0], [2], ["NO"]], read_csv_direct_in_columns("temp/test.csv", line_values_format))
+
+        # Neither exists, or unknown compression
+        try:
+            read_csv_direct_in_columns("temp/does-not-exist.csv", line_values_format)
+            self.fail()
+        except FileNotFoundError:
+            self.assertTrue(True)
+        try:
+            compress_file("temp/test.csv", ".bz2")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        local_shell.remove_force_recursive("temp")
@@ -0,0 +1,144 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import random
+import time
+import os
+from exputil import *
+
+
+# The benchmarks take a while, as such they are only run if enabled (their correctness is covered by test_csv.py)
+ENABLE_BENCHMARK = False
+
+
+def write_tcp_flows_like_csv(filename, num_rows):
+    random.seed(77777777)
+    with open(filename, "w+") as f_out:
+        for i in range(num_rows):
+            start_time_ns = random.randint(0, 10000000000)
+            duration_ns = random.randint(1000, 1000000000)
+            f_out.write("%d,%d,%d,%d,%d,%d,%d,%d,%s,\n" % (
+                i, random.randint(0, 100), random.randint(0, 100), 50000, start_time_ns,
+                start_time_ns + duration_ns, duration_ns, 50000, random.choice(["YES", "NO_ONGOING"])
+            ))
+
+
+def write_utilization_like_csv(filename, num_rows):
+    random.seed(66666666)
+    with open(filename, "w+") as f_out:
+        for i in range(num_rows):
+            f_out.write("%d,%d,%d,%d,%d\n" % (
+                i % 100, (i + 1) % 100, (i // 100) * 1000000000, (i // 100 + 1) * 1000000000,
+                random.randint(0, 1000000000)
+            ))
+
+
+def time_read(filename, line_values_format, repetitions, **kwargs):
+    best_s = None
+    data_columns = None
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        data_columns = read_csv_direct_in_columns(filename, line_values_format, **kwargs)
+        elapsed_s = time.perf_counter() - start
+        if best_s is None or elapsed_s < best_s:
+            best_s = elapsed_s
+    return best_s, data_columns
+
+
+class TestCsvBenchmark(unittest.TestCase):
+
+    def test_benchmark_engines(self):
+        if not ENABLE_BENCHMARK:
+            return
+
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        num_rows = 200000
+        write_tcp_flows_like_csv("temp/tcp_flows.csv", num_rows)
+        line_values_format = "idx_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,string,string"
+
+        # Best of three for each engine
+        python_s, data_columns_python = time_read("temp/tcp_flows.csv", line_values_format, 3)
+        numpy_s, data_columns_numpy = time_read("temp/tcp_flows.csv", line_values_format, 3, engine="numpy")
+        print("")
+        print("CSV reading benchmark (%d rows of tcp_flows.csv format):" % num_rows)
+        print("  > python engine... %.3f s" % python_s)
+        print("  > numpy engine.... %.3f s (%.1fx)" % (numpy_s, python_s / numpy_s))
+
+        # Both engines must produce the same
+        for j in range(len(data_columns_python)):
+            self.assertEqual(data_columns_python[j], data_columns_numpy[j].tolist())
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_benchmark_engines_only_integers(self):
+        if not ENABLE_BENCHMARK:
+            return
+
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        num_rows = 200000
+        write_utilization_like_csv("temp/link_net_device_utilization.csv", num_rows)
+        line_values_format = "pos_int,pos_int,pos_int,pos_int,pos_int"
+
+        # Best of three for each engine
+        python_s, data_columns_python = time_read("temp/link_net_device_utilization.csv", line_values_format, 3)
+        numpy_s, data_columns_numpy = time_read(
+            "temp/link_net_device_utilization.csv", line_values_format, 3, engine="numpy"
+        )
+        print("")
+        print("CSV reading benchmark (%d rows of link_net_device_utilization.csv format):" % num_rows)
+        print("  > python engine... %.3f s" % python_s)
+        print("  > numpy engine.... %.3f s (%.1fx)" % (numpy_s, python_s / numpy_s))
+
+        # Both engines must produce the same
+        for j in range(len(data_columns_python)):
+            self.assertEqual(data_columns_python[j], data_columns_numpy[j].tolist())
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_benchmark_parallel(self):
+        if not ENABLE_BENCHMARK:
+            return
+
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        num_rows = 400000
+        write_tcp_flows_like_csv("temp/tcp_flows.csv", num_rows)
+        line_values_format = "idx_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,string,string"
+
+        # Best of three for one process and for all CPUs
+        serial_s, data_columns_serial = time_read("temp/tcp_flows.csv", line_values_format, 3, engine="numpy")
+        parallel_s, data_columns_parallel = time_read(
+            "temp/tcp_flows.csv", line_values_format, 3, engine="numpy", num_processes=None
+        )
+        print("")
+        print("CSV reading benchmark (%d rows of tcp_flows.csv format, numpy engine):" % num_rows)
+        print("  > 1 process....... %.3f s" % serial_s)
+        print("  > %d process(es).. %.3f s (%.1fx)" % (os.cpu_count(), parallel_s, serial_s / parallel_s))
+
+        # Both must produce the same
+        for j in range(len(data_columns_serial)):
+            self.assertEqual(data_columns_serial[j].tolist(), data_columns_parallel[j].tolist())
+
+        local_shell.remove_force_recursive("temp")
@@ -124,3 +124,15 @@ class TestProperties(unittest.TestCase):
             self.fail()
         except ValueError:
             self.assertTrue(True)
+
+    def test_compressed(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.txt", "a=5\nb=\"x\"")
+        compress_file("temp/test.txt", ".gz")
+        self.assertFalse(local_shell.file_exists("temp/test.txt"))
+        config = PropertiesConfig("temp/test.txt")
+        self.assertEqual(config.get_property_or_fail("a"), "5")
+        self.assertEqual(config.get_property_or_fail("b"), "x")
+        self.assertEqual(config.get_num_properties(), 2)
+        local_shell.remove_force_recursive("temp")
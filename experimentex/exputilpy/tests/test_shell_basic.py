@@ -22,6 +22,9 @@
 
 from exputil import *
 import unittest
+import asyncio
+import time
+import os
 
 
 ENABLE_REMOTE_TEST = False
@@ -135,6 +138,87 @@ class TestBasic(unittest.TestCase):
             self.assertTrue(False)
         except ValueError:
             self.assertTrue(True)
+        try:
+            local_shell.exec("cat", sync=False, input_content="Hello world")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+    def test_input_content(self):
+        local_shell = LocalShell()
+        self.assertEqual("Hello\nworld →\n", local_shell.perfect_exec("cat", input_content="Hello\nworld →\n").output)
+        self.assertEqual("2", local_shell.valid_exec("wc -l", input_content="a\nb\n").output.strip())
+        try:
+            local_shell.perfect_exec("cat > /dev/null; exit 1", input_content="Hello")
+            self.assertTrue(False)
+        except FailedCommandError:
+            self.assertTrue(True)
+
+    def test_exec_many(self):
+        local_shell = LocalShell()
+
+        # Results are in the order of the commands, with timing
+        results = local_shell.exec_many(["sleep 0.3; echo A", "echo B", "exit 3", "abcd"], max_concurrency=2)
+        self.assertEqual(4, len(results))
+        self.assertEqual("A", results[0].output.strip())
+        self.assertEqual("B", results[1].output.strip())
+        self.assertEqual(0, results[0].return_code)
+        self.assertEqual(3, results[2].return_code)
+        self.assertFalse(results[3].return_code <= 100)
+        self.assertTrue(results[0].duration_s >= 0.3)
+        self.assertEqual("", local_shell.exec_many(["echo A"], output_redirect=OutputRedirect.SILENT)[0].output)
+        self.assertEqual([], local_shell.exec_many([]))
+
+        # Bounded concurrency
+        start = time.perf_counter()
+        local_shell.exec_many(["sleep 0.2"] * 4, max_concurrency=4)
+        self.assertTrue(time.perf_counter() - start < 0.7)
+        start = time.perf_counter()
+        local_shell.exec_many(["sleep 0.2"] * 4, max_concurrency=1)
+        self.assertTrue(time.perf_counter() - start >= 0.8)
+
+        # Fail-fast kills the others (and does not start the remaining)
+        start = time.perf_counter()
+        try:
+            local_shell.exec_many(["sleep 5", "exit 1", "sleep 5", "sleep 5"], max_concurrency=2, fail_fast=True)
+            self.assertTrue(False)
+        except FailedCommandError as e:
+            self.assertEqual(1, e.sec.return_code)
+        try:
+            local_shell.exec_many(["sleep 5", "/dev/null"], max_concurrency=2, fail_fast=True)
+            self.assertTrue(False)
+        except InvalidCommandError:
+            self.assertTrue(True)
+        self.assertTrue(time.perf_counter() - start < 4.0)
+
+        # Cancellation kills the executing commands
+        async def cancel_after(seconds):
+            task = asyncio.ensure_future(local_shell.exec_many_async(["sleep 5; echo Done > abcdef.txt"]))
+            await asyncio.sleep(seconds)
+            task.cancel()
+            try:
+                await task
+                self.assertTrue(False)
+            except asyncio.CancelledError:
+                self.assertTrue(True)
+        start = time.perf_counter()
+        asyncio.run(cancel_after(0.3))
+        self.assertTrue(time.perf_counter() - start < 4.0)
+        self.assertFalse(os.path.exists("abcdef.txt"))
+
+        # Invalid arguments
+        for kwargs in ({"max_concurrency": 0}, {"output_redirect": OutputRedirect.PIPE_VARIABLE}):
+            try:
+                local_shell.exec_many(["echo A"], **kwargs)
+                self.assertTrue(False)
+            except ValueError:
+                self.assertTrue(True)
+
+        if ENABLE_REMOTE_TEST:
+            remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST)
+            results = remote_shell.exec_many(["echo A", "exit 3"])
+            self.assertEqual("A", results[0].output.strip())
+            self.assertEqual(3, results[1].return_code)
 
     def test_remote_shell(self):
         if ENABLE_REMOTE_TEST:
@@ -168,6 +252,25 @@ class TestBasic(unittest.TestCase):
             # Remove file (clean-up)
             self.assertTrue(remote_shell.exec("rm -f abcdef.txt").return_code <= 100)
 
+    def test_remote_shell_multiplex(self):
+        remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST)
+        self.assertTrue("ControlMaster=auto" in remote_shell.remote)
+        self.assertEqual("%s@%s" % (REMOTE_USER, REMOTE_HOST), remote_shell.remote[-1])
+        remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST, multiplex=False)
+        self.assertEqual(["ssh", "%s@%s" % (REMOTE_USER, REMOTE_HOST)], remote_shell.remote)
+        self.assertFalse(remote_shell.is_connected())
+
+        if ENABLE_REMOTE_TEST:
+            remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST)
+            remote_shell.close()
+            self.assertFalse(remote_shell.is_connected())
+            self.assertEqual("Hello", remote_shell.perfect_exec("echo Hello").output.strip())
+            self.assertTrue(remote_shell.is_connected())
+            remote_shell.close()
+            self.assertFalse(remote_shell.is_connected())
+            self.assertEqual("Hello", remote_shell.perfect_exec("echo Hello").output.strip())
+            remote_shell.close()
+
     def test_remote_shell_screens(self):
         if ENABLE_REMOTE_TEST:
             remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST)
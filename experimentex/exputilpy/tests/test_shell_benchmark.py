@@ -0,0 +1,135 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import subprocess
+import time
+from unittest import mock
+from exputil import *
+from exputil.shell import Shell, ShellExecResult, local_shell_exec
+from exputil import shell
+
+
+ENABLE_REMOTE_TEST = False
+REMOTE_USER = "user"
+REMOTE_HOST = "machine"
+
+
+class SubprocessLocalShell(Shell):
+    """
+    Local shell which performs every file operation by starting a process (as before the in-process fast path).
+    """
+
+    def exec(self, command, sync=True, output_redirect=None, input_content=None) -> ShellExecResult:
+        return local_shell_exec(command, sync, output_redirect, input_content=input_content)
+
+
+# Placeholders replaced in each of the plots of the one-link-tcp TCP flow plotter (plot_tcp_flow)
+TCP_FLOW_PLOTS = [
+    ("progress", ["[OUTPUT-FILE]", "[DATA-FILE]"]),
+    ("rtt", ["[OUTPUT-FILE]", "[DATA-FILE]"]),
+    ("rto", ["[OUTPUT-FILE]", "[DATA-FILE]"]),
+    ("rate", ["[OUTPUT-FILE]", "[DATA-FILE]"]),
+    ("cwnd", ["[OUTPUT-FILE]", "[SEGMENT-SIZE-BYTE]", "[DATA-FILE]"]),
+    ("cwnd_inflated", ["[OUTPUT-FILE]", "[SEGMENT-SIZE-BYTE]", "[DATA-FILE]"]),
+    ("ssthresh", ["[MAX-Y]", "[OUTPUT-FILE]", "[SEGMENT-SIZE-BYTE]", "[DATA-FILE]"]),
+    ("inflight", ["[OUTPUT-FILE]", "[SEGMENT-SIZE-BYTE]", "[DATA-FILE]"]),
+    ("together", [
+        "[MAX-Y]", "[OUTPUT-FILE]", "[SEGMENT-SIZE-BYTE]",
+        "[DATA-FILE-CWND]", "[DATA-FILE-CWND-INFLATED]", "[DATA-FILE-SSTHRESH]"
+    ]),
+]
+
+
+def write_plt_templates(plt_dir):
+    for name, placeholders in TCP_FLOW_PLOTS:
+        with open(plt_dir + "/plot_tcp_flow_time_vs_" + name + ".plt", "w+") as f_out:
+            f_out.write("set terminal pdf\n")
+            for placeholder in placeholders:
+                f_out.write("# %s\n" % placeholder)
+
+
+def replay_plot_tcp_flow_file_operations(local_shell, plt_dir, data_out_dir, pdf_out_dir, tcp_flow_id):
+    """
+    Replay the file operations of plot_tcp_flow() of the one-link-tcp plotter (without calling gnuplot).
+    """
+    for name in ("cwnd", "progress", "rtt", "rate"):
+        if not local_shell.file_exists(plt_dir + "/plot_tcp_flow_time_vs_" + name + ".plt"):
+            raise ValueError("Missing template")
+    local_shell.make_full_dir(data_out_dir)
+    local_shell.make_full_dir(pdf_out_dir)
+    for name, placeholders in TCP_FLOW_PLOTS:
+        local_shell.copy_file(plt_dir + "/plot_tcp_flow_time_vs_" + name + ".plt", "temp/temp.plt")
+        for placeholder in placeholders:
+            local_shell.sed_replace_in_file_plain(
+                "temp/temp.plt", placeholder, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_" + name + ".csv"
+            )
+        local_shell.remove("temp/temp.plt")
+
+
+def time_and_count_processes(local_shell, num_flows):
+    with mock.patch.object(shell.subprocess, "run", wraps=subprocess.run) as subprocess_run:
+        start = time.perf_counter()
+        for tcp_flow_id in range(num_flows):
+            replay_plot_tcp_flow_file_operations(
+                local_shell, "temp/plt", "temp/data", "temp/pdf", tcp_flow_id
+            )
+        elapsed_s = time.perf_counter() - start
+    return elapsed_s, subprocess_run.call_count
+
+
+class TestShellBenchmark(unittest.TestCase):
+
+    def test_benchmark_file_operations(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp/plt")
+        write_plt_templates("temp/plt")
+        num_flows = 10
+
+        subprocess_s, subprocess_count = time_and_count_processes(SubprocessLocalShell(), num_flows)
+        native_s, native_count = time_and_count_processes(local_shell, num_flows)
+        print("")
+        print("File operations of the one-link-tcp plotter (%d TCP flows, excluding gnuplot):" % num_flows)
+        print("  > subprocess... %4d processes, %.3f s" % (subprocess_count, subprocess_s))
+        print("  > in-process... %4d processes, %.3f s (%.1fx)" % (native_count, native_s, subprocess_s / native_s))
+
+        # All operations are on plain paths, as such none start a process
+        self.assertEqual(0, native_count)
+        self.assertTrue(subprocess_count > 0)
+        local_shell.remove_recursive("temp")
+
+    def test_benchmark_remote_multiplexing(self):
+        if ENABLE_REMOTE_TEST:
+            num_commands = 20
+            print("")
+            print("Remote file_exists() latency (%d commands):" % num_commands)
+            for multiplex in (False, True):
+                remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST, multiplex=multiplex)
+                remote_shell.perfect_exec("true")  # Connection set-up (if multiplexed) is not included
+                start = time.perf_counter()
+                for i in range(num_commands):
+                    remote_shell.file_exists("does-not-exist-%d.txt" % i)
+                elapsed_s = time.perf_counter() - start
+                print("  > %s... %.1f ms per command" % (
+                    "multiplexed.." if multiplex else "new session..", elapsed_s / num_commands * 1000.0
+                ))
+                remote_shell.close()
@@ -91,6 +91,46 @@ class TestFileDir(unittest.TestCase):
         local_shell.remove_recursive("temp")
         self.assertFalse(local_shell.path_exists("temp"))
 
+    def test_native_and_shell_file_operations(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        local_shell.make_full_dir("temp/native/sub")
+        local_shell.make_full_dir("temp/shell~dir/sub")
+
+        # Plain paths are handled in-process, paths with a tilde fall back to the shell: same results
+        for directory in ("temp/native", "temp/shell~dir"):
+            local_shell.write_file(directory + "/a.txt", "Line [X] with [X] twice")
+            self.assertTrue(local_shell.file_exists(directory + "/a.txt"))
+            self.assertFalse(local_shell.path_exists(directory + "/a.txt"))
+            self.assertTrue(local_shell.path_exists(directory + "/sub"))
+            self.assertEqual("Line [X] with [X] twice\n", local_shell.read_file(directory + "/a.txt"))
+            local_shell.sed_replace_in_file_plain(directory + "/a.txt", "[X]", "a/b&c\\d")
+            self.assertEqual("Line a/b&c\\d with a/b&c\\d twice\n", local_shell.read_file(directory + "/a.txt"))
+            local_shell.copy_file(directory + "/a.txt", directory + "/sub")
+            local_shell.copy_file(directory + "/a.txt", directory + "/b.txt")
+            self.assertEqual(local_shell.read_file(directory + "/a.txt"), local_shell.read_file(directory + "/sub/a.txt"))
+            self.assertEqual(local_shell.read_file(directory + "/a.txt"), local_shell.read_file(directory + "/b.txt"))
+            self.assertEqual([directory + "/sub"], local_shell.get_direct_sub_dirs(directory))
+            self.assertEqual([], local_shell.get_direct_sub_dirs(directory + "/sub"))
+            local_shell.remove(directory + "/b.txt")
+            self.assertFalse(local_shell.file_exists(directory + "/b.txt"))
+
+            # Failures raise the same exception
+            for operation in (
+                lambda: local_shell.read_file(directory + "/does-not-exist.txt"),
+                lambda: local_shell.copy_file(directory + "/does-not-exist.txt", directory + "/c.txt"),
+                lambda: local_shell.sed_replace_in_file_plain(directory + "/does-not-exist.txt", "a", "b"),
+                lambda: local_shell.make_full_dir(directory + "/a.txt/sub"),
+                lambda: local_shell.remove(directory + "/sub"),
+            ):
+                try:
+                    operation()
+                    self.assertTrue(False)
+                except FailedCommandError:
+                    self.assertTrue(True)
+
+        local_shell.remove_recursive("temp")
+
     def test_rsync_and_copy_file(self):
         local_shell = LocalShell()
         local_shell.make_full_dir("temp")
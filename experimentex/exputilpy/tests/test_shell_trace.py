@@ -0,0 +1,89 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+from exputil.shell_trace import extract_executable
+import unittest
+import os
+
+
+class TestShellTrace(unittest.TestCase):
+
+    def test_extract_executable(self):
+        self.assertEqual("gnuplot", extract_executable("gnuplot temp.plt"))
+        self.assertEqual("waf", extract_executable("cd ../frameworks/ns-3-bs && ./waf build"))
+        self.assertEqual("waf", extract_executable("cd a; X=1 Y=\"b c\" ./waf --run=\"main\""))
+        self.assertEqual("pdfcrop", extract_executable("/usr/bin/pdfcrop a.pdf b.pdf"))
+        self.assertEqual("sed", extract_executable("sed -i'.original' 's/a;b/c/g' f; rm f.original"))
+        self.assertEqual("screen", extract_executable("screen -d -m bash -c \"a; b\""))
+        self.assertEqual("", extract_executable("cd a"))
+
+    def test_trace(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.remove_force("temp/trace.jsonl")
+
+        # Nothing is traced unless enabled
+        local_shell.exec("echo Hello")
+        self.assertFalse(os.path.exists("temp/trace.jsonl"))
+
+        enable_shell_trace("temp/trace.jsonl")
+        try:
+            self.assertEqual("Hello", local_shell.perfect_exec("echo Hello").output.strip())
+            local_shell.exec("sleep 0.1; exit 3")
+            local_shell.exec("echo Hello", output_redirect=OutputRedirect.SILENT)
+            local_shell.exec("echo Hello", sync=False).process.communicate()
+            local_shell.exec_many(["cd temp && echo ABC", "sleep 0.1"], max_concurrency=2)
+        finally:
+            disable_shell_trace()
+        local_shell.exec("echo Hello")
+
+        # Records
+        records = read_shell_trace("temp/trace.jsonl")
+        self.assertEqual(6, len(records))
+        self.assertEqual("echo Hello", records[0]["command"])
+        self.assertEqual("echo", records[0]["executable"])
+        self.assertEqual(os.getcwd(), records[0]["cwd"])
+        self.assertIsNone(records[0]["remote"])
+        self.assertEqual(0, records[0]["return_code"])
+        self.assertEqual(6, records[0]["output_size_byte"])
+        self.assertEqual("sleep", records[1]["executable"])
+        self.assertEqual(3, records[1]["return_code"])
+        self.assertTrue(records[1]["duration_s"] >= 0.1)
+        self.assertIsNone(records[2]["output_size_byte"])
+        self.assertIsNone(records[3]["duration_s"])
+        self.assertIsNone(records[3]["return_code"])
+        self.assertEqual(["echo", "sleep"], sorted(map(lambda x: x["executable"], records[4:])))
+
+        # Summary by executable
+        summaries = summarize_shell_trace("temp/trace.jsonl")
+        self.assertEqual(["sleep", "echo"], list(map(lambda x: x[0], summaries)))
+        self.assertEqual(2, summaries[0][1]["count"])
+        self.assertEqual(1, summaries[0][1]["num_failed"])
+        self.assertTrue(summaries[0][1]["total_duration_s"] >= 0.2)
+        self.assertTrue(summaries[0][1]["max_duration_s"] >= 0.1)
+        self.assertEqual(4, summaries[1][1]["count"])
+        self.assertEqual(0, summaries[1][1]["num_failed"])
+        self.assertEqual(10, summaries[1][1]["total_output_size_byte"])
+        print_shell_trace_summary("temp/trace.jsonl")
+
+        local_shell.remove_recursive("temp")
@@ -0,0 +1,113 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+import unittest
+import time
+
+
+ENABLE_REMOTE_TEST = False
+REMOTE_USER = "user"
+REMOTE_HOST = "machine"
+
+
+class TestSupervisor(unittest.TestCase):
+
+    def check_supervisor(self, shell):
+        shell.remove_force_recursive("temp")
+        supervisor = ProcessSupervisor(shell, "temp/jobs")
+        self.assertEqual({}, supervisor.statuses())
+        self.assertIsNone(supervisor.wait_any())
+
+        # Start jobs
+        self.assertTrue(supervisor.start("a", "sleep 0.5; echo \"Hello A\"; exit 3") > 0)
+        supervisor.start("b", "echo $PWD > b.txt", cwd="temp")
+        supervisor.start("c", "sleep 10")
+        supervisor.start("d", "echo 'it''s \"quoted\" $((1 + 1))'")
+        self.assertEqual(JobStatus.RUNNING, supervisor.status("c")[0])
+        self.assertEqual(4, len(supervisor.statuses()))
+
+        # Wait for the first to exit
+        name, status, return_code = supervisor.wait_any(["a", "b"])
+        self.assertEqual(("b", JobStatus.FINISHED, 0), (name, status, return_code))
+        self.assertTrue(shell.read_file("temp/b.txt").strip().endswith("/temp"))
+        self.assertEqual(("a", JobStatus.FINISHED, 3), supervisor.wait_any(["a", "b"]))
+        self.assertEqual("Hello A", supervisor.read_log("a").strip())
+        self.assertIsNone(supervisor.wait_any(["a", "b"]))
+        self.assertEqual(("d", JobStatus.FINISHED, 0), supervisor.wait_any(["d"]))
+        self.assertEqual("its \"quoted\" $((1 + 1))", supervisor.read_log("d").strip())
+
+        # Timeout
+        try:
+            supervisor.wait_all(timeout_s=0.3)
+            self.assertTrue(False)
+        except TimeoutError:
+            self.assertTrue(True)
+        self.assertEqual(1, supervisor.count_running())
+
+        # Kill
+        try:
+            supervisor.remove("c")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+        start = time.perf_counter()
+        self.assertTrue(supervisor.kill("c"))
+        self.assertEqual({"c": (JobStatus.LOST, None)}, supervisor.wait_all())
+        self.assertTrue(time.perf_counter() - start < 5.0)
+        self.assertFalse(supervisor.kill("c"))
+        self.assertEqual(0, supervisor.count_running())
+
+        # Resource limits
+        supervisor.start("e", "ulimit -n", max_num_open_files=64)
+        supervisor.start("f", "python3 -c 'bytearray(1000000000)'", memory_limit_byte=200000000)
+        supervisor.start("g", "while true; do :; done", cpu_time_limit_s=1)
+        results = supervisor.wait_all(timeout_s=30.0)
+        self.assertEqual((JobStatus.FINISHED, 0), results["e"])
+        self.assertEqual("64", supervisor.read_log("e").strip())
+        self.assertEqual(JobStatus.FINISHED, results["f"][0])
+        self.assertNotEqual(0, results["f"][1])
+        self.assertEqual(JobStatus.FINISHED, results["g"][0])
+        self.assertNotEqual(0, results["g"][1])
+
+        # Restart and remove
+        supervisor.start("a", "exit 0")
+        self.assertEqual({"a": (JobStatus.FINISHED, 0)}, supervisor.wait_all())
+        for name in ("a", "b", "c", "d", "e", "f", "g"):
+            supervisor.remove(name)
+        self.assertEqual({}, supervisor.statuses())
+
+        # Invalid name
+        try:
+            supervisor.start("a b", "exit 0")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+        shell.remove_recursive("temp")
+
+    def test_local(self):
+        self.check_supervisor(LocalShell())
+
+    def test_remote(self):
+        if ENABLE_REMOTE_TEST:
+            self.check_supervisor(RemoteShell(REMOTE_USER, REMOTE_HOST))
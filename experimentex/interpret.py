@@ -24,12 +24,15 @@ import os
 import sys
 import copy
 import shutil
+import ast
 
 from parser import parse
+from selection import select_expincludes_matching_only_patterns, parse_only_patterns_from_args
 from rootclasses.rootclasses import retrieve_root_class_names_list, get_root_class_interpreter
 
 
-def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_slate, remove_unused):
+def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_slate, remove_unused,
+              selected_instance_names=None):
 
     print("INTERPRET EXPERIMENTEX TO RUNS")
 
@@ -48,6 +51,7 @@ def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_s
     # All configurations
     run_dir_names_set = set()
     experiment_instance_name_to_run_dir_names = {}
+    experiment_instance_name_to_run_output_filenames_read = {}
 
     # Generate the configurations in a DFS fashion
     for root_class_name in retrieve_root_class_names_list():
@@ -55,6 +59,7 @@ def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_s
 
         # Statistics of the root class
         num_instances = 0
+        num_skipped_instances = 0
         num_run_dirs = 0
         num_run_dir_names_at_start = len(run_dir_names_set)
 
@@ -92,14 +97,22 @@ def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_s
                 # If it does not have children, it must be an instance,
                 # as such the run directories must be generated
 
-                # Generate all the run directories for the experiment instance
+                # Unless it is not selected
                 num_instances += 1
+                if selected_instance_names is not None and child_name not in selected_instance_names:
+                    num_skipped_instances += 1
+                    continue
+
+                # Generate all the run directories for the experiment instance
                 run_dir_names = root_class_interpreter.generate_run_dirs_for_experiment_data_structure(
                     child_name,
                     runs_path,
                     name_to_data_structure[child_name]
                 )
                 experiment_instance_name_to_run_dir_names[child_name] = run_dir_names
+                experiment_instance_name_to_run_output_filenames_read[child_name] = list(
+                    root_class_interpreter.get_run_output_filenames_read_by_last_run_dir_generation()
+                )
 
                 # Generate run.sh for each run directory
                 for run_dir_name in run_dir_names:
@@ -108,7 +121,9 @@ def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_s
                     with open(runs_path + "/" + run_dir_name + "/run.sh", "w+") as f_out:
                         f_out.write("#!/bin/bash\n")
                         f_out.write("\n")
-                        f_out.write("# " + child_name + " :: " + run_dir_name + "\n")
+                        # Only the run directory name: it is shared by all experiment instances which have
+                        # the same run, and its content is part of the input fingerprint of the run (make.py)
+                        f_out.write("# " + run_dir_name + "\n")
                         f_out.write("\n")
                         f_out.write("# Navigate to core path\n")
                         f_out.write("cd ../../.. || exit 1\n")
@@ -126,6 +141,8 @@ def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_s
 
         # Print statistics
         print("    >> # of instances......... " + str(num_instances))
+        if selected_instance_names is not None:
+            print("       ... of which skipped: " + str(num_skipped_instances))
         print("    >> # of run directories... " + str(num_run_dirs))
         print("       ... of which unique: " + str(len(run_dir_names_set) - num_run_dir_names_at_start))
 
@@ -140,27 +157,52 @@ def interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_s
                     num_removed += 1
         print("    >> Total removed... " + str(num_removed))
 
+    # If only a selection was interpreted, the mappings of the other instances are retained
+    mapping_filename = runs_path + "/experiment_instances_to_run_dir_names.txt"
+    if selected_instance_names is not None and os.path.exists(mapping_filename):
+        with open(mapping_filename, "r") as f_in:
+            previous_experiment_instance_name_to_run_dir_names = ast.literal_eval(f_in.read())
+        for instance_name, run_dir_names in previous_experiment_instance_name_to_run_dir_names.items():
+            if instance_name not in experiment_instance_name_to_run_dir_names:
+                experiment_instance_name_to_run_dir_names[instance_name] = run_dir_names
+    read_mapping_filename = runs_path + "/experiment_instances_to_run_output_filenames_read.txt"
+    if selected_instance_names is not None and os.path.exists(read_mapping_filename):
+        with open(read_mapping_filename, "r") as f_in:
+            previous_experiment_instance_name_to_run_output_filenames_read = ast.literal_eval(f_in.read())
+        for instance_name, filenames in previous_experiment_instance_name_to_run_output_filenames_read.items():
+            if instance_name not in experiment_instance_name_to_run_output_filenames_read:
+                experiment_instance_name_to_run_output_filenames_read[instance_name] = filenames
+
     # Print the mapping of experiment instance to run directory names
-    with open(runs_path + "/experiment_instances_to_run_dir_names.txt", "w+") as f_out:
+    with open(mapping_filename, "w+") as f_out:
         f_out.write(str(experiment_instance_name_to_run_dir_names))
     print("  > Wrote the experiment-instance-to-run-dir-names mapping")
 
+    # Print the mapping of experiment instance to the run outputs its interpretation read (used by make.py)
+    with open(read_mapping_filename, "w+") as f_out:
+        f_out.write(str(experiment_instance_name_to_run_output_filenames_read))
+    print("  > Wrote the experiment-instance-to-run-output-filenames-read mapping")
+
     print("")
 
 
 def print_usage():
     print("Failed: you must supply one or more TeX files as arguments")
     print("")
-    print("Usage: python3 interpret.py [--clean OR --remove-unused] [.tex file] [.tex file] ...")
+    print("Usage: python3 interpret.py [--clean OR --remove-unused] [--only <glob>] [.tex file] [.tex file] ...")
     print("")
     print("Optional arguments (mutually exclusive):")
     print("   --clean-slate      Empties the entire runs directory before commencing")
     print("   --remove-unused    Removes any run directories which were not generated by this interpret call")
     print("")
+    print("Optional argument (can be repeated, cannot be combined with --remove-unused):")
+    print("   --only <glob>      Only generates the run directories of experiment instances whose name,")
+    print("                      or any of whose expinclude filenames, matches the glob pattern")
+    print("")
 
 
 def main():
-    args = sys.argv[1:]
+    args, only_patterns = parse_only_patterns_from_args(sys.argv[1:])
 
     # Must have one or more arguments
     if len(args) < 1:
@@ -174,13 +216,28 @@ def main():
     if len(args) == 1 and (clean_slate or remove_unused):
         print_usage()
 
+    elif remove_unused and len(only_patterns) > 0:
+        print_usage()
+
     else:
         print("")
         args_start_point = 0
         if clean_slate or remove_unused:
             args_start_point = 1
-        name_to_child_names, name_to_list_identifier_with_expline, _ = parse(args[args_start_point:])
-        interpret(name_to_child_names, name_to_list_identifier_with_expline, clean_slate, remove_unused)
+        name_to_child_names, name_to_list_identifier_with_expline, name_to_list_expinclude_filename = \
+            parse(args[args_start_point:])
+        selected_instance_names = None
+        if len(only_patterns) > 0:
+            selected_instance_names = set(select_expincludes_matching_only_patterns(
+                name_to_child_names, name_to_list_expinclude_filename, only_patterns
+            ).keys())
+        interpret(
+            name_to_child_names,
+            name_to_list_identifier_with_expline,
+            clean_slate,
+            remove_unused,
+            selected_instance_names
+        )
 
 
 if __name__ == "__main__":
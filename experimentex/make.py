@@ -0,0 +1,319 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import ast
+import shutil
+import inspect
+import subprocess
+
+from parser import parse
+from interpret import interpret
+from streaming import StreamingPlotWorker
+from selection import retrieve_experiment_instance_name_to_root_class_name
+from dependencies import (
+    framework_build_outputs,
+    BuildState,
+    list_files,
+    list_local_module_files,
+    list_run_dir_files,
+    list_run_dir_framework_names,
+    calculate_framework_name_to_fingerprint,
+    calculate_root_class_plotter_fingerprint
+)
+from rootclasses.rootclasses import (
+    retrieve_root_class_names_list,
+    get_root_class_interpreter
+)
+
+path_to_core = ".."
+runs_path = "../temp/runs"
+plots_path = "../temp/plots"
+state_filename = "../temp/make-state.txt"
+
+
+def record_plot_results(state, results, instance_name_to_pending_plot_fingerprints):
+    for instance_name, error in results:
+        if error is not None:
+            raise ValueError("Plotting of experiment instance %s failed:\n%s" % (instance_name, error))
+        print("  > Plotted: " + instance_name)
+
+        # The plots of an instance are plotted in the order in which they were submitted
+        state.record("plot:" + instance_name, instance_name_to_pending_plot_fingerprints[instance_name].pop(0))
+
+
+def calculate_interpret_fingerprint(state, interpret_input_files):
+    """
+    Calculate the fingerprint of what the interpretation depends on: its input files (TeX and interpreter code),
+    and the run outputs which the last interpretation read (of which the absence is part of the fingerprint).
+
+    :param state:                   Build state
+    :param interpret_input_files:   List of the input files of the interpretation
+
+    :return: Interpret fingerprint
+    """
+    run_output_filenames_read = set()
+    read_mapping_filename = runs_path + "/experiment_instances_to_run_output_filenames_read.txt"
+    if os.path.exists(read_mapping_filename):
+        with open(read_mapping_filename, "r") as f_in:
+            for filenames in ast.literal_eval(f_in.read()).values():
+                run_output_filenames_read.update(filenames)
+    existing_filenames = list(filter(os.path.isfile, run_output_filenames_read))
+    return state.hash_files(
+        interpret_input_files + existing_filenames,
+        list(map(
+            lambda x: "missing:" + os.path.relpath(x, path_to_core),
+            sorted(run_output_filenames_read.difference(existing_filenames))
+        ))
+    )
+
+
+def execute_step_script(script_name):
+    if subprocess.call(["bash", script_name], cwd=path_to_core) != 0:
+        raise ValueError("Step script failed: %s" % script_name)
+
+
+def make(tex_filenames, name_to_child_names, name_to_list_identifier_with_expline,
+         name_to_list_expinclude_filename, dry_run):
+
+    print("MAKE (ONLY STALE NODES ARE REBUILT)")
+    state = BuildState(state_filename)
+    num_rebuilt = 0
+
+    # Step 1: build, which depends on the framework sources
+    framework_name_to_fingerprint = calculate_framework_name_to_fingerprint(state)
+    build_fingerprint = state.hash_files(
+        list_files(["step_1_build.sh"]),
+        list(map(lambda x: x + "=" + framework_name_to_fingerprint[x], sorted(framework_name_to_fingerprint)))
+    )
+    build_outputs_exist = all(map(
+        lambda x: os.path.exists(path_to_core + "/" + x),
+        [p for outputs in framework_build_outputs.values() for p in outputs]
+    ))
+    if not state.is_up_to_date("build", build_fingerprint) or not build_outputs_exist:
+        print("  > Stale: build")
+        num_rebuilt += 1
+        if not dry_run:
+            execute_step_script("step_1_build.sh")
+            state.record("build", build_fingerprint)
+
+    # Step 2: interpret, which depends on the TeX, the interpreter code and the run outputs it read
+    interpreter_files = [os.path.abspath("interpret.py"), os.path.abspath("parser.py"),
+                         os.path.abspath("selection.py")]
+    for root_class_name in retrieve_root_class_names_list():
+        interpreter_files += list_local_module_files(
+            inspect.getsourcefile(type(get_root_class_interpreter(root_class_name)))
+        )
+
+    # Experiment instances of each root class
+    instance_name_to_root_class_name = retrieve_experiment_instance_name_to_root_class_name(name_to_child_names)
+
+    # Plotter fingerprint of each root class
+    root_class_name_to_plotter_fingerprint = {}
+    for root_class_name in retrieve_root_class_names_list():
+        root_class_name_to_plotter_fingerprint[root_class_name] = calculate_root_class_plotter_fingerprint(
+            state, root_class_name, framework_name_to_fingerprint
+        )
+
+    # Steps 3 and 4: the runs and plots of each experiment instance in turn. Plotting is streamed:
+    # the expinclude files of an instance are plotted by a separate worker process as soon as
+    # its runs are finished, while the runs of the next instances continue. If the runs changed
+    # run outputs which the interpretation read (e.g., for the adaptive load refinement), steps 2-4
+    # are repeated for the experiment instances whose run directories changed as a result.
+    plot_worker = None if dry_run else StreamingPlotWorker()
+    instance_name_to_pending_plot_fingerprints = {}
+    try:
+        run_dir_name_to_fingerprint = {}
+        instance_name_to_handled_run_dir_names = {}
+        while True:
+            interpret_fingerprint = calculate_interpret_fingerprint(state, tex_filenames + interpreter_files)
+            mapping_filename = runs_path + "/experiment_instances_to_run_dir_names.txt"
+            mapping_is_complete = os.path.exists(mapping_filename)
+            if mapping_is_complete:
+                with open(mapping_filename, "r") as f_in:
+                    experiment_instance_name_to_run_dir_names = ast.literal_eval(f_in.read())
+                for run_dir_names in experiment_instance_name_to_run_dir_names.values():
+                    for run_dir_name in run_dir_names:
+                        mapping_is_complete = mapping_is_complete and os.path.isfile(
+                            runs_path + "/" + run_dir_name + "/run.sh"
+                        )
+            if not state.is_up_to_date("interpret", interpret_fingerprint) or not mapping_is_complete:
+                print("  > Stale: interpret")
+                num_rebuilt += 1
+                if dry_run:
+                    if not mapping_is_complete:
+                        print("  > Dry run cannot determine the staleness of runs, plots and PDF before interpreting")
+                        print("")
+                        return
+                else:
+                    print("")
+                    interpret(name_to_child_names, name_to_list_identifier_with_expline, False, False)
+
+                    # The interpretation only reads run outputs, as such they are the same as before it,
+                    # but which of them it read is only known after it
+                    state.record("interpret", calculate_interpret_fingerprint(state, tex_filenames + interpreter_files))
+                    with open(mapping_filename, "r") as f_in:
+                        experiment_instance_name_to_run_dir_names = ast.literal_eval(f_in.read())
+
+            for instance_name in sorted(instance_name_to_root_class_name.keys()):
+                root_class_name = instance_name_to_root_class_name[instance_name]
+                output_dir_names = get_root_class_interpreter(root_class_name).get_run_dir_output_dir_names()
+                if instance_name not in experiment_instance_name_to_run_dir_names:
+                    raise ValueError("Experiment instance %s does not have any run directories" % instance_name)
+                run_dir_names = experiment_instance_name_to_run_dir_names[instance_name]
+                if instance_name_to_handled_run_dir_names.get(instance_name) == run_dir_names:
+                    continue
+                instance_name_to_handled_run_dir_names[instance_name] = run_dir_names
+
+                # Step 3: runs, each of which depends on its input files and the builds of the frameworks it uses
+                for run_dir_name in run_dir_names:
+                    if run_dir_name in run_dir_name_to_fingerprint:
+                        continue
+                    run_dir = runs_path + "/" + run_dir_name
+                    node_id = "run:" + run_dir_name
+                    input_fingerprint = state.hash_files(
+                        list_run_dir_files(run_dir, output_dir_names, True),
+                        list(map(
+                            lambda x: x + "=" + framework_name_to_fingerprint[x],
+                            list_run_dir_framework_names(run_dir, root_class_name)
+                        ))
+                    )
+                    outputs_exist = all(map(lambda x: os.path.isdir(run_dir + "/" + x), output_dir_names))
+                    if not state.is_up_to_date(node_id, input_fingerprint) or not outputs_exist:
+                        print("  > Stale: " + node_id)
+                        num_rebuilt += 1
+                        if not dry_run:
+
+                            # A run whose inputs changed since it was last executed has its outputs removed,
+                            # such that run.sh does not consider it already finished
+                            if node_id in state.node_fingerprints:
+                                for output_dir_name in output_dir_names:
+                                    shutil.rmtree(run_dir + "/" + output_dir_name, ignore_errors=True)
+                                state.forget(node_id)
+                            if subprocess.call(["bash", "run.sh"], cwd=run_dir) != 0:
+                                raise ValueError("Run failed: %s" % run_dir_name)
+                            state.record(node_id, input_fingerprint)
+
+                    # Its plots depend on both its inputs and outputs
+                    run_dir_name_to_fingerprint[run_dir_name] = state.hash_files(
+                        list_run_dir_files(run_dir, output_dir_names, False), [input_fingerprint]
+                    )
+
+                # Step 4: plots of the instance, which depend on its runs, its plotter code and gnuplot templates
+                list_unique_expinclude_filename = list(sorted(set(name_to_list_expinclude_filename[instance_name])))
+                node_id = "plot:" + instance_name
+                plot_fingerprint = state.hash_files(
+                    [],
+                    [root_class_name_to_plotter_fingerprint[root_class_name]]
+                    + list(map(lambda x: x + "=" + run_dir_name_to_fingerprint[x], run_dir_names))
+                    + list_unique_expinclude_filename
+                )
+                expincludes_exist = all(map(
+                    lambda x: os.path.isfile(plots_path + "/" + instance_name + "/" + x),
+                    list_unique_expinclude_filename
+                ))
+                if not state.is_up_to_date(node_id, plot_fingerprint) or not expincludes_exist:
+                    print("  > Stale: " + node_id)
+                    num_rebuilt += 1
+                    if not dry_run:
+                        plot_worker.submit(
+                            root_class_name, instance_name, run_dir_names, list_unique_expinclude_filename
+                        )
+                        instance_name_to_pending_plot_fingerprints.setdefault(instance_name, []).append(
+                            plot_fingerprint
+                        )
+
+                # Record the plots which have finished in the meantime
+                if not dry_run:
+                    record_plot_results(
+                        state, plot_worker.retrieve_finished(), instance_name_to_pending_plot_fingerprints
+                    )
+
+            # A dry run cannot perform the runs which could change what the interpretation read
+            if dry_run or state.is_up_to_date(
+                    "interpret", calculate_interpret_fingerprint(state, tex_filenames + interpreter_files)
+            ):
+                break
+
+        # Wait for the last plots
+        if not dry_run:
+            record_plot_results(state, plot_worker.finish(), instance_name_to_pending_plot_fingerprints)
+            plot_worker = None
+
+    finally:
+        if plot_worker is not None:
+            plot_worker.terminate()
+
+    # Step 5: PDF, which depends on all the expinclude files and the LaTeX sources
+    pdf_fingerprint = state.hash_files(
+        list(filter(
+            lambda x: not os.path.relpath(x, path_to_core).startswith("paper-latex/out/"),
+            list_files(["paper-latex"])
+        )) + list_files(["temp/plots", "step_5_pdf.sh"])
+    )
+    if not state.is_up_to_date("pdf", pdf_fingerprint) \
+            or not os.path.exists(path_to_core + "/paper-latex/out/paper.pdf"):
+        print("  > Stale: pdf")
+        num_rebuilt += 1
+        if not dry_run:
+            execute_step_script("step_5_pdf.sh")
+            state.record("pdf", pdf_fingerprint)
+
+    # Record the file hashes which were newly computed
+    if not dry_run:
+        state.save()
+
+    print("  > Number of stale nodes%s: %d" % (" (dry run, none rebuilt)" if dry_run else " rebuilt", num_rebuilt))
+    print("")
+
+
+def print_usage():
+    print("Failed: you must supply one or more TeX files as arguments")
+    print("")
+    print("Usage: python3 make.py [--dry-run] [.tex file] [.tex file] ...")
+    print("")
+    print("Optional arguments:")
+    print("   --dry-run          Only lists the stale nodes without rebuilding them")
+    print("")
+
+
+def main():
+    args = sys.argv[1:]
+
+    # Optional argument
+    dry_run = len(args) >= 1 and args[0] == "--dry-run"
+    if dry_run:
+        args = args[1:]
+
+    # Must have one or more TeX files
+    if len(args) < 1:
+        print_usage()
+        exit(1)
+
+    print("")
+    name_to_child_names, name_to_list_identifier_with_expline, name_to_list_expinclude_filename = parse(args)
+    make(args, name_to_child_names, name_to_list_identifier_with_expline, name_to_list_expinclude_filename, dry_run)
+
+
+if __name__ == "__main__":
+    main()
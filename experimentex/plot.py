@@ -25,22 +25,191 @@ import sys
 import copy
 import ast
 import shutil
+import tempfile
+import traceback
+import exputil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from parser import parse
-from rootclasses.rootclasses import retrieve_root_class_names_list, get_root_class_plotter
+from selection import select_expincludes_matching_only_patterns, parse_only_patterns_from_args
+from dependencies import BuildState, list_run_dir_files, calculate_framework_name_to_fingerprint, \
+    calculate_root_class_plotter_fingerprint
+from rootclasses.rootclasses import retrieve_root_class_names_list, get_root_class_interpreter, get_root_class_plotter
 
 
-def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate):
+def plot_experiment_instance(root_class_name, exp_instance_name, run_dir_names, list_unique_expinclude_filename):
+    """
+    Plot the expinclude files of a single experiment instance.
 
-    print("PLOT EXPERIMENTEX EXPINCLUDE FILES")
+    :param root_class_name:                  Root class name of the experiment instance
+    :param exp_instance_name:                Experiment instance name
+    :param run_dir_names:                    List of the run directory names of the experiment instance
+    :param list_unique_expinclude_filename:  List of unique expinclude filenames to plot
+    """
 
     # Paths
-    runs_path = "../temp/runs"
     plots_path = "../temp/plots"
     path_to_core = ".."
     runs_path_from_core = "temp/runs"
     plots_path_from_core = "temp/plots"
 
+    # List of all the run directories belonging to this experiment
+    list_run_dir_paths_from_core = []
+    for run_dir_name in run_dir_names:
+        run_dir_path_from_core = runs_path_from_core + "/" + run_dir_name
+        list_run_dir_paths_from_core.append(run_dir_path_from_core)
+        if not os.path.exists(path_to_core + "/" + run_dir_path_from_core):
+            raise ValueError(
+                "Run directory named \"%s\" does not exist but is listed in the instance mapping"
+                " (Possibly some runs were removed? Running the interpreter should fix this)."
+                % run_dir_name
+            )
+    os.makedirs(plots_path + "/" + exp_instance_name, exist_ok=True)
+
+    # Call the plotter for the list of expinclude filenames to plot
+    get_root_class_plotter(root_class_name).plot_for_experiment(
+        exp_instance_name,
+        path_to_core,
+        list_run_dir_paths_from_core,
+        plots_path_from_core + "/" + exp_instance_name,
+        list_unique_expinclude_filename
+    )
+
+
+def calculate_instance_plot_fingerprint(state, plotter_fingerprint, root_class_name, run_dir_names):
+    """
+    Calculate the fingerprint of what the plots of an experiment instance depend on:
+    its plotter (code, gnuplot templates and frameworks) and all files of its run directories.
+
+    :param state:                   Plot state (of which the file hash cache is used)
+    :param plotter_fingerprint:     Fingerprint of the root class plotter
+    :param root_class_name:         Root class name of the experiment instance
+    :param run_dir_names:           List of the run directory names of the experiment instance
+
+    :return: Instance plot fingerprint
+    """
+    output_dir_names = get_root_class_interpreter(root_class_name).get_run_dir_output_dir_names()
+    run_dir_files = []
+    for run_dir_name in run_dir_names:
+        run_dir = "../temp/runs/" + run_dir_name
+        run_dir_files += list_run_dir_files(run_dir, output_dir_names, True)
+        run_dir_files += list_run_dir_files(run_dir, output_dir_names, False)
+    return state.hash_files(run_dir_files, [plotter_fingerprint] + list(run_dir_names))
+
+
+def calculate_expinclude_fingerprint(state, instance_plot_fingerprint, expinclude_filename):
+    return state.hash_files([], [instance_plot_fingerprint, expinclude_filename])
+
+
+def plot_job_in_scratch_dir(scratch_dir, root_class_name, exp_instance_name, run_dir_names,
+                            list_unique_expinclude_filename):
+    """
+    Plot (a part of) the expinclude files of a single experiment instance, with its own scratch directory
+    as temporary directory (tempfile.gettempdir() and TMPDIR), which is removed afterwards.
+
+    :param scratch_dir:                      Scratch directory of the job (must not yet exist)
+    :param root_class_name:                  Root class name of the experiment instance
+    :param exp_instance_name:                Experiment instance name
+    :param run_dir_names:                    List of the run directory names of the experiment instance
+    :param list_unique_expinclude_filename:  List of unique expinclude filenames to plot
+    """
+    scratch_dir = os.path.abspath(scratch_dir)
+    os.makedirs(scratch_dir)
+    previous_tmpdir = os.environ.get("TMPDIR")
+    os.environ["TMPDIR"] = scratch_dir
+    tempfile.tempdir = scratch_dir
+    try:
+        plot_experiment_instance(root_class_name, exp_instance_name, run_dir_names, list_unique_expinclude_filename)
+    finally:
+        tempfile.tempdir = None
+        if previous_tmpdir is None:
+            del os.environ["TMPDIR"]
+        else:
+            os.environ["TMPDIR"] = previous_tmpdir
+        shutil.rmtree(scratch_dir)
+
+
+def plot_job_in_worker(*job):
+    """
+    Plot a job in a worker process. Plotter errors are returned as traceback, as they cannot all be pickled.
+
+    :param job:     (Scratch directory, root class name, instance name, run dir names, unique expinclude filenames)
+
+    :return: Error traceback, or None if it succeeded
+    """
+    try:
+        plot_job_in_scratch_dir(*job)
+        return None
+    except Exception:
+        return traceback.format_exc()
+
+
+def plot_jobs(plot_jobs_list, num_workers, on_job_finished):
+    """
+    Plot the jobs. The jobs of reentrant root class plotters are executed concurrently by a pool of
+    worker processes, after which the jobs of the other root class plotters are executed one by one.
+
+    :param plot_jobs_list:  List of (root class name, instance name, run dir names, unique expinclude filenames)
+    :param num_workers:     Number of worker processes (if 1, all jobs are executed one by one in this process)
+    :param on_job_finished: Function called (in this process) with each job after it successfully finished
+    """
+
+    # Each job has its own scratch directory
+    scratch_path = "../temp/plots-scratch"
+    if os.path.exists(scratch_path):
+        shutil.rmtree(scratch_path)
+    jobs_with_scratch_dir = []
+    for job_idx, job in enumerate(plot_jobs_list):
+        jobs_with_scratch_dir.append((scratch_path + "/job-" + str(job_idx),) + job)
+
+    try:
+
+        # The jobs of reentrant plotters are executed concurrently
+        sequential_jobs = jobs_with_scratch_dir
+        if num_workers > 1:
+            concurrent_jobs = list(filter(lambda x: get_root_class_plotter(x[1]).is_reentrant(), jobs_with_scratch_dir))
+            sequential_jobs = list(filter(lambda x: x not in concurrent_jobs, jobs_with_scratch_dir))
+            if len(concurrent_jobs) > 0:
+                print("  > Plotting %d jobs concurrently using %d worker processes" % (
+                    len(concurrent_jobs), num_workers
+                ))
+                with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                    future_to_job = {}
+                    for job in concurrent_jobs:
+                        future_to_job[executor.submit(plot_job_in_worker, *job)] = job
+                    for future in as_completed(future_to_job.keys()):
+                        error_traceback = future.result()
+                        if error_traceback is not None:
+                            for other_future in future_to_job.keys():
+                                other_future.cancel()
+                            raise ValueError("Plot job of instance %s failed:\n%s" % (
+                                future_to_job[future][2], error_traceback
+                            ))
+                        on_job_finished(future_to_job[future][1:])
+
+        # The others are executed one by one
+        if len(sequential_jobs) > 0:
+            print("  > Plotting %d jobs one by one" % len(sequential_jobs))
+            for job in sequential_jobs:
+                plot_job_in_scratch_dir(*job)
+                on_job_finished(job[1:])
+
+    finally:
+
+        # Remove the scratch directory (of which the job directories have already been removed)
+        if os.path.exists(scratch_path):
+            shutil.rmtree(scratch_path)
+
+
+def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate, only_patterns=(), num_workers=1):
+
+    print("PLOT EXPERIMENTEX EXPINCLUDE FILES")
+
+    # Paths
+    runs_path = "../temp/runs"
+    plots_path = "../temp/plots"
+    plot_state_filename = "../temp/plot-state.txt"
+
     # Empty the plots directory before starting if asked to
     if clean_slate:
         print("  > Starting with clean slate by removing existing plots directory")
@@ -62,17 +231,32 @@ def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate):
         experiment_instance_name_to_run_dir_names = ast.literal_eval(f_in.read())
     print("  > Read the experiment-instance-to-run-dir-names mapping")
 
-    # Generate the configurations in a DFS fashion
+    # Select which expinclude files of which experiment instances are to be plotted
+    instance_name_to_selected_expinclude_filenames = select_expincludes_matching_only_patterns(
+        name_to_child_names, name_to_list_expinclude_filename, only_patterns
+    )
+
+    # Fingerprints of the inputs of the expinclude files when they were last plotted
+    state = BuildState(plot_state_filename)
+    framework_name_to_fingerprint = calculate_framework_name_to_fingerprint(state)
+
+    # Collect the plot jobs of the instances in a DFS fashion
+    plot_jobs_list = []
+    root_class_name_to_plotter_fingerprint = {}
     for root_class_name in retrieve_root_class_names_list():
-        print("  > Plotting instances of root class " + root_class_name)
+        print("  > Plot jobs of instances of root class " + root_class_name)
+        plotter = get_root_class_plotter(root_class_name)
+        plotter_fingerprint = calculate_root_class_plotter_fingerprint(
+            state, root_class_name, framework_name_to_fingerprint
+        )
+        root_class_name_to_plotter_fingerprint[root_class_name] = plotter_fingerprint
 
         # Statistics of the root class
         num_instances = 0
+        num_skipped_instances = 0
         num_expincludes = 0
         num_actual_plots = 0
-
-        # Retrieve the plotter
-        root_class_plotter = get_root_class_plotter(root_class_name)
+        num_up_to_date = 0
 
         # Add all children of the root class at the start
         to_visit = list(copy.deepcopy(name_to_child_names[root_class_name]))
@@ -83,7 +267,10 @@ def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate):
                 # If it does not have children, it must be an instance, as such plots can be made
                 num_instances += 1
 
-                if child_name not in experiment_instance_name_to_run_dir_names:
+                if child_name not in instance_name_to_selected_expinclude_filenames:
+                    num_skipped_instances += 1
+
+                elif child_name not in experiment_instance_name_to_run_dir_names:
                     print(
                         "WARNING: Experiment instance %s does not have any run directories.\n"
                         "         Did you make any changes in the experiments since the last interpretation?\n"
@@ -93,30 +280,46 @@ def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate):
 
                 else:
 
-                    # List of all the run directories belonging to this experiment
-                    list_run_dir_paths_from_core = []
-                    for run_dir_name in experiment_instance_name_to_run_dir_names[child_name]:
-                        run_dir_path_from_core = runs_path_from_core + "/" + run_dir_name
-                        list_run_dir_paths_from_core.append(run_dir_path_from_core)
-                        if not os.path.exists(path_to_core + "/" + run_dir_path_from_core):
-                            raise ValueError(
-                                "Run directory named \"%s\" does not exist but is listed in the instance mapping"
-                                " (Possibly some runs were removed? Running the interpreter should fix this)."
-                                % run_dir_name
-                            )
-                    os.makedirs(plots_path + "/" + child_name, exist_ok=True)
-
-                    # Call the plotter for the list of expinclude filenames to plot
-                    list_unique_expinclude_filename = list(sorted(set(name_to_list_expinclude_filename[child_name])))
-                    num_expincludes += len(name_to_list_expinclude_filename[child_name])
+                    list_unique_expinclude_filename = instance_name_to_selected_expinclude_filenames[child_name]
+                    num_expincludes += len(list(filter(
+                        lambda x: x in list_unique_expinclude_filename,
+                        name_to_list_expinclude_filename[child_name]
+                    )))
                     num_actual_plots += len(list_unique_expinclude_filename)
-                    root_class_plotter.plot_for_experiment(
-                        child_name,
-                        path_to_core,
-                        list_run_dir_paths_from_core,
-                        plots_path_from_core + "/" + child_name,
-                        list_unique_expinclude_filename
+
+                    # Expinclude files which exist and whose inputs have not changed are not plotted again
+                    instance_plot_fingerprint = calculate_instance_plot_fingerprint(
+                        state, plotter_fingerprint, root_class_name,
+                        experiment_instance_name_to_run_dir_names[child_name]
                     )
+                    list_stale_expinclude_filename = []
+                    for expinclude_filename in list_unique_expinclude_filename:
+                        expinclude_fingerprint = calculate_expinclude_fingerprint(
+                            state, instance_plot_fingerprint, expinclude_filename
+                        )
+                        if os.path.isfile(plots_path + "/" + child_name + "/" + expinclude_filename) \
+                                and state.is_up_to_date("expinclude:" + child_name + "/" + expinclude_filename,
+                                                        expinclude_fingerprint):
+                            num_up_to_date += 1
+                        else:
+                            list_stale_expinclude_filename.append(expinclude_filename)
+
+                    # The plotter is called for the list of expinclude filenames to plot (or for each of them)
+                    if plotter.is_reentrant() and plotter.can_split_expinclude_filenames():
+                        for expinclude_filename in list_stale_expinclude_filename:
+                            plot_jobs_list.append((
+                                root_class_name,
+                                child_name,
+                                experiment_instance_name_to_run_dir_names[child_name],
+                                [expinclude_filename]
+                            ))
+                    elif len(list_stale_expinclude_filename) > 0:
+                        plot_jobs_list.append((
+                            root_class_name,
+                            child_name,
+                            experiment_instance_name_to_run_dir_names[child_name],
+                            list_stale_expinclude_filename
+                        ))
 
             else:
                 # If it has children, we go over those
@@ -125,8 +328,33 @@ def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate):
 
         # Print statistics
         print("    >> # of instances............ " + str(num_instances))
+        if len(only_patterns) > 0:
+            print("       ... of which skipped..... " + str(num_skipped_instances))
         print("    >> # of expincludes.......... " + str(num_expincludes))
         print("    >> # of unique expincludes... " + str(num_actual_plots))
+        print("       ... of which up-to-date.. " + str(num_up_to_date))
+
+    # Plot all the jobs, recording the fingerprints of the expinclude files of each job once it has finished
+    # (which are calculated again, as plotters can add files to run directories, e.g. merged logs)
+    def record_expinclude_fingerprints(job):
+        job_root_class_name, job_instance_name, job_run_dir_names, job_expinclude_filenames = job
+        job_instance_plot_fingerprint = calculate_instance_plot_fingerprint(
+            state,
+            root_class_name_to_plotter_fingerprint[job_root_class_name],
+            job_root_class_name,
+            job_run_dir_names
+        )
+        for job_expinclude_filename in job_expinclude_filenames:
+            state.record(
+                "expinclude:" + job_instance_name + "/" + job_expinclude_filename,
+                calculate_expinclude_fingerprint(state, job_instance_plot_fingerprint, job_expinclude_filename),
+                save=False
+            )
+        state.save()
+    plot_jobs(plot_jobs_list, num_workers, record_expinclude_fingerprints)
+
+    # Record the file hashes which were newly computed
+    state.save()
 
     print("")
 
@@ -134,35 +362,43 @@ def plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate):
 def print_usage():
     print("Failed: you must supply one or more TeX files as arguments")
     print("")
-    print("Usage: python3 plot.py [--clean-slate] [.tex file] [.tex file] ...")
+    print("Usage: python3 plot.py [--clean-slate] [--workers <n>] [--only <glob>] [.tex file] [.tex file] ...")
     print("")
     print("Optional arguments:")
-    print("   --clean-slate      Empties the entire plots directory before commencing")
+    print("   --clean-slate      Empties the entire plots directory before commencing (as such, everything is")
+    print("                      plotted again: otherwise expinclude files are skipped if they exist and their")
+    print("                      runs, plotter code, gnuplot templates and frameworks did not change since)")
+    print("   --workers <n>      Number of worker processes plotting concurrently (default: number of CPUs)")
+    print("   --only <glob>      Only plots the expinclude files whose filename (or <instance>/<filename>),")
+    print("                      or whose experiment instance name, matches the glob pattern (can be repeated)")
     print("")
 
 
 def main():
-    args = sys.argv[1:]
-
-    # Must have one or more arguments
+    args, only_patterns = parse_only_patterns_from_args(sys.argv[1:])
+
+    # Optional arguments
+    clean_slate = False
+    num_workers = os.cpu_count() or 1
+    while len(args) > 0 and args[0].startswith("--"):
+        if args[0] == "--clean-slate":
+            clean_slate = True
+            args = args[1:]
+        elif args[0] == "--workers" and len(args) >= 2:
+            num_workers = exputil.parse_positive_int(args[1])
+            args = args[2:]
+        else:
+            print_usage()
+            exit(1)
+
+    # Must have one or more TeX files as arguments
     if len(args) < 1:
         print_usage()
         exit(1)
 
-    # Optional argument
-    clean_slate = (args[0] == "--clean-slate")
-
-    # Cannot be only the optional argument
-    if clean_slate and len(args) == 1:
-        print_usage()
-
-    else:
-        print("")
-        args_start_point = 0
-        if clean_slate:
-            args_start_point = 1
-        name_to_child_names, _, name_to_list_expinclude_filename = parse(args[args_start_point:])
-        plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate)
+    print("")
+    name_to_child_names, _, name_to_list_expinclude_filename = parse(args)
+    plot(name_to_child_names, name_to_list_expinclude_filename, clean_slate, only_patterns, num_workers)
 
 
 if __name__ == "__main__":
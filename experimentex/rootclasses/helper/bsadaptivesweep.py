@@ -0,0 +1,128 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import exputil
+import numpy as np
+import math
+
+
+def calculate_mean_fct_ns_of_flow_size(tcp_flows_filenames, flow_size_byte, warm_up_ns, measurement_end_ns):
+    """
+    Calculate the mean flow completion time of the finished flows of a flow size which
+    started in the measurement period of a basic-sim run.
+
+    :param tcp_flows_filenames: List of the TCP flows log files of the run (either tcp_flows.csv, or the
+                                system_<id>_tcp_flows.csv of each system of a distributed run)
+    :param flow_size_byte:      Flow size (byte) of the flows to take into account
+    :param warm_up_ns:          Time (ns) at which the measurement period starts
+    :param measurement_end_ns:  Time (ns) at which the measurement period ends
+
+    :return: Mean FCT (ns), or None if no such flow finished
+    """
+    list_fct_ns = []
+    for tcp_flows_filename in tcp_flows_filenames:
+
+        # The flow identifiers of the log of a single system are not consecutive, as such they are read as int
+        tcp_flows_columns = exputil.read_csv_direct_in_columns(
+            tcp_flows_filename,
+            "int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,string,string",
+            engine="numpy",
+            row_filter_predicates=[
+                (4, "range", (warm_up_ns, measurement_end_ns)), (3, "==", flow_size_byte), (8, "==", "YES")
+            ],
+            column_indices=[6]
+        )
+        list_fct_ns.append(np.array(tcp_flows_columns[0], dtype=float))
+    fct_ns = np.concatenate(list_fct_ns) if len(list_fct_ns) > 0 else np.array([], dtype=float)
+    if len(fct_ns) == 0:
+        return None
+    return float(np.mean(fct_ns))
+
+
+def calculate_measurement_end_ns(run_data_structure):
+    """
+    Calculate the end of the measurement period (i.e., the start of the cool-down) of a load-ls run.
+
+    :param run_data_structure:  Single-valued load-ls run data structure
+
+    :return: Time (ns) at which the measurement period ends
+    """
+    expected_flows_per_s = run_data_structure["load_with_lambda_flow_arrival_rate"][1][1]
+    total_expected_num_flows = run_data_structure["total_expected_num_flows"][1]
+    return run_data_structure["warm_up_ns"][1] + int(math.ceil(
+        float(total_expected_num_flows) / float(expected_flows_per_s) * 1000000000
+    ))
+
+
+def select_refinement_loads(list_load, load_to_list_value, num_loads):
+    """
+    Select the loads to insert in between the current load points of a sweep. Each interval between
+    two consecutive loads is scored by how much it would gain from an extra load point:
+
+        score_i = (curvature_i / max curvature + variance_i / max variance) * width_i / max width
+
+    ... with curvature_i the largest absolute change in slope of the mean value curve at either end
+    of the interval (zero at the ends of the sweep), and variance_i the mean coefficient of variation
+    of the values between runs at both ends. The midpoint of the highest scoring intervals
+    (of at least 2 load percentage points wide, and a non-zero score) is inserted.
+
+    :param list_load:           Sorted list of the current loads (integer percentages)
+    :param load_to_list_value:  Mapping of each load to the list of its value in each run
+    :param num_loads:           Maximum number of loads to insert
+
+    :return: List of loads to insert (at most num_loads), highest scoring first
+    """
+    if len(list_load) < 2:
+        return []
+    loads = np.array(list_load, dtype=float)
+    means = np.array([np.mean(load_to_list_value[load]) for load in list_load], dtype=float)
+    cvs = np.array([
+        np.std(load_to_list_value[load]) / abs(np.mean(load_to_list_value[load]))
+        if np.mean(load_to_list_value[load]) != 0 else 0.0
+        for load in list_load
+    ], dtype=float)
+    widths = np.diff(loads)
+
+    # Curvature at each load point, which is zero at the ends of the sweep
+    slopes = np.diff(means) / widths
+    point_curvature = np.zeros(len(list_load))
+    point_curvature[1:-1] = np.abs(np.diff(slopes))
+    interval_curvature = np.maximum(point_curvature[:-1], point_curvature[1:])
+
+    # Between-run variance at both ends of each interval
+    interval_variance = (cvs[:-1] + cvs[1:]) / 2.0
+
+    # Each of the criteria is normalized to at most 1
+    scores = np.zeros(len(widths))
+    for criterion in (interval_curvature, interval_variance):
+        if np.max(criterion) > 0:
+            scores += criterion / np.max(criterion)
+    scores *= widths / np.max(widths)
+
+    # Highest scoring intervals which can still be split
+    list_new_load = []
+    for i in np.argsort(-scores, kind="stable"):
+        if len(list_new_load) >= num_loads or scores[i] <= 0:
+            break
+        if list_load[i + 1] - list_load[i] >= 2:
+            list_new_load.append((list_load[i] + list_load[i + 1]) // 2)
+    return list_new_load
@@ -0,0 +1,151 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+
+
+def calculate_leaf_group_node_system_id_assignment(num_leafs, num_spines, num_servers_per_leaf, systems_count):
+    """
+    Partition a leaf-spine topology into leaf groups for a distributed (MPI) run.
+
+    Each leaf is put together with all its servers into the same system, such that only the
+    leaf-spine links cross system boundaries. The leafs are divided into contiguous blocks of
+    (nearly) equal size, one block per system. The spines are assigned round-robin.
+
+    Node identifiers follow the leaf-spine convention of the load-ls root class:
+    leafs are 0, ..., num_leafs - 1, spines are num_leafs, ..., num_leafs + num_spines - 1,
+    and the servers of leaf l are num_leafs + num_spines + l * num_servers_per_leaf + (0, 1, ...).
+
+    :param num_leafs:               Number of leafs (ToRs)
+    :param num_spines:              Number of spines
+    :param num_servers_per_leaf:    Number of servers underneath each leaf
+    :param systems_count:           Number of systems (MPI processes) to partition over
+
+    :return: List of system ids, where entry i is the system id node i is assigned to
+    """
+    if systems_count < 1:
+        raise ValueError("Systems count must be at least 1")
+    if systems_count > num_leafs:
+        raise ValueError(
+            "Systems count (%d) cannot exceed the number of leafs (%d) when partitioning per leaf group"
+            % (systems_count, num_leafs)
+        )
+
+    # Leafs
+    assignment = []
+    for leaf in range(num_leafs):
+        assignment.append(leaf * systems_count // num_leafs)
+
+    # Spines
+    for spine in range(num_spines):
+        assignment.append(spine % systems_count)
+
+    # Servers are always in the same system as their leaf
+    for leaf in range(num_leafs):
+        for _ in range(num_servers_per_leaf):
+            assignment.append(assignment[leaf])
+
+    return assignment
+
+
+def is_basic_sim_distributed_run_finished(logs_ns3_dir, systems_count):
+    """
+    Check whether every system of a distributed run has written that it finished.
+
+    :param logs_ns3_dir:    Logs directory of the run (e.g., "temp/runs/<run-dir-name>/logs_ns3")
+    :param systems_count:   Number of systems the run was distributed over
+
+    :return: True iff all system_<id>_finished.txt files exist and contain "Yes"
+    """
+    for system_id in range(systems_count):
+        finished_filename = logs_ns3_dir + "/system_%d_finished.txt" % system_id
+        if not os.path.exists(finished_filename):
+            return False
+        with open(finished_filename, "r") as f_in:
+            if f_in.read().strip() != "Yes":
+                return False
+    return True
+
+
+def write_lines_atomically(filename, lines):
+    """
+    Write lines to a file by writing them to a temporary file (unique to the process) first,
+    and then replacing the file with it.
+
+    :param filename:    Filename
+    :param lines:       Lines (including their line endings)
+    """
+    tmp_filename = filename + ".%d.tmp" % os.getpid()
+    with open(tmp_filename, "w+") as f_out:
+        f_out.writelines(lines)
+    os.replace(tmp_filename, filename)
+
+
+def merge_basic_sim_distributed_logs(logs_ns3_dir, systems_count):
+    """
+    Merge the per-system log files of a distributed basic-sim run into the log files
+    a single-process run would have produced, such that all plot data generation can
+    remain oblivious of whether the run was distributed:
+
+    - system_<id>_tcp_flows.csv -> tcp_flows.csv (ordered by TCP flow id)
+    - system_<id>_link_net_device_utilization.csv -> link_net_device_utilization.csv
+    - system_<id>_finished.txt -> finished.txt
+
+    The finished.txt is written last, so its presence indicates that the merge completed.
+    If it is already present, nothing is done. Each file is replaced atomically, such that
+    concurrent merges of the same run (by plotters of different experiment instances) are safe.
+
+    :param logs_ns3_dir:    Logs directory of the run (e.g., "temp/runs/<run-dir-name>/logs_ns3")
+    :param systems_count:   Number of systems the run was distributed over
+    """
+
+    # Already merged
+    if os.path.exists(logs_ns3_dir + "/finished.txt"):
+        return
+
+    # Every system must have finished
+    if not is_basic_sim_distributed_run_finished(logs_ns3_dir, systems_count):
+        raise ValueError("Not all %d systems have finished in: %s" % (systems_count, logs_ns3_dir))
+
+    # TCP flows: each flow is logged by exactly the one system which has its source node,
+    # so ordering by flow identifier again yields a valid idx_int first column
+    tcp_flows_lines = []
+    for system_id in range(systems_count):
+        with open(logs_ns3_dir + "/system_%d_tcp_flows.csv" % system_id, "r") as f_in:
+            for line in f_in:
+                if len(line.strip()) > 0:
+                    tcp_flows_lines.append(line)
+    tcp_flows_lines.sort(key=lambda x: int(x.split(",", 1)[0]))
+    write_lines_atomically(logs_ns3_dir + "/tcp_flows.csv", tcp_flows_lines)
+
+    # Utilization: each directed link is tracked by the system which has its sending node
+    utilization_lines = []
+    for system_id in range(systems_count):
+        with open(logs_ns3_dir + "/system_%d_link_net_device_utilization.csv" % system_id, "r") as f_in:
+            for line in f_in:
+                if len(line.strip()) > 0:
+                    utilization_lines.append(line)
+    utilization_lines.sort(key=lambda x: tuple(map(int, x.split(",")[0:3])))
+    write_lines_atomically(logs_ns3_dir + "/link_net_device_utilization.csv", utilization_lines)
+
+    # Finally mark it as finished
+    write_lines_atomically(logs_ns3_dir + "/finished.txt", ["Yes"])
@@ -55,22 +55,22 @@ def gen_basic_sim_tcp_flows_plot_data(experiment_plot_dir, data_path, list_run_d
             cool_down_ns = run_data_structure["cool_down_ns"][1]
             duration_ns += warm_up_ns + cool_down_ns
 
-        # Create rate file
+        # All flows are read at once (such that their total is known without reading the file again),
+        # of which only the flows which started within the measurement interval (after the warm-up,
+        # before the cool-down) are kept
         tcp_flows_csv_columns = exputil.read_csv_direct_in_columns(
             logs_ns3_dir + "/tcp_flows.csv",
-            "idx_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,string,string"
+            "idx_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,string,string",
+            engine="numpy",
+            column_indices=[0, 3, 4, 6, 8]
         )
         total_num_flows = len(tcp_flows_csv_columns[0])
-        # flow_id_list = tcp_flows_csv_columns[0]
-        # from_node_id_list = tcp_flows_csv_columns[1]
-        # to_node_id_list = tcp_flows_csv_columns[2]
-        size_byte_list = tcp_flows_csv_columns[3]
-        start_time_ns_list = tcp_flows_csv_columns[4]
-        # end_time_ns_list = tcp_flows_csv_columns[5]
-        duration_ns_list = tcp_flows_csv_columns[6]
-        # amount_sent_byte_list = tcp_flows_csv_columns[7]
-        finished_list = tcp_flows_csv_columns[8]
-        # metadata_list = tcp_flows_csv_columns[9]
+        start_time_ns_list = tcp_flows_csv_columns[2]
+        in_interval = (start_time_ns_list >= warm_up_ns) & (start_time_ns_list < duration_ns - cool_down_ns)
+        flow_id_list = tcp_flows_csv_columns[0][in_interval]
+        size_byte_list = tcp_flows_csv_columns[1][in_interval]
+        duration_ns_list = tcp_flows_csv_columns[3][in_interval]
+        finished_list = tcp_flows_csv_columns[4][in_interval]
 
         # Process flows and put them into their respective groups
         interval_num_flows = 0
@@ -80,34 +80,33 @@ def gen_basic_sim_tcp_flows_plot_data(experiment_plot_dir, data_path, list_run_d
         for g in range(len(flow_groups_name_and_size)):
             interval_per_group_num_flows.append(0)
             interval_per_group_completed_flows.append([])
-        for i in range(total_num_flows):
-            if warm_up_ns <= start_time_ns_list[i] < duration_ns - cool_down_ns:
-
-                # Whether the TCP flow is finished
-                is_completed = finished_list[i] == "YES"
-
-                # Flow size group it belongs to
-                chosen_g = -1
-                for g in range(len(flow_groups_name_and_size)):
-                    if size_byte_list[i] == flow_groups_name_and_size[g][1]:
-                        chosen_g = g
-                        break
-                if chosen_g == -1:
-                    raise ValueError("Flow does not belong to any group: should not happen")
-
-                # Update total amount of flows per group, whether they are finished or not
-                interval_per_group_num_flows[chosen_g] += 1
-                interval_num_flows += 1
-
-                # Only if completed are they taken into account for the statistics
-                if is_completed:
-                    info_tuple = (
-                        i,  # TCP flow identifier
-                        duration_ns_list[i],  # Duration in ns
-                        float(size_byte_list[i]) / float(duration_ns_list[i]) * 8000.0  # Rate in Mbit/s
-                    )
-                    interval_completed_flows.append(info_tuple)
-                    interval_per_group_completed_flows[chosen_g].append(info_tuple)
+        for i in range(len(flow_id_list)):
+
+            # Whether the TCP flow is finished
+            is_completed = finished_list[i] == "YES"
+
+            # Flow size group it belongs to
+            chosen_g = -1
+            for g in range(len(flow_groups_name_and_size)):
+                if size_byte_list[i] == flow_groups_name_and_size[g][1]:
+                    chosen_g = g
+                    break
+            if chosen_g == -1:
+                raise ValueError("Flow does not belong to any group: should not happen")
+
+            # Update total amount of flows per group, whether they are finished or not
+            interval_per_group_num_flows[chosen_g] += 1
+            interval_num_flows += 1
+
+            # Only if completed are they taken into account for the statistics
+            if is_completed:
+                info_tuple = (
+                    flow_id_list[i],  # TCP flow identifier
+                    duration_ns_list[i],  # Duration in ns
+                    float(size_byte_list[i]) / float(duration_ns_list[i]) * 8000.0  # Rate in Mbit/s
+                )
+                interval_completed_flows.append(info_tuple)
+                interval_per_group_completed_flows[chosen_g].append(info_tuple)
 
         # Print information for checking
         print("Collected flows:")
@@ -268,7 +267,9 @@ def gen_basic_sim_utilization_plot_data(experiment_plot_dir, data_path, list_run
             # Read in utilization file
             utilization_csv_columns = exputil.read_csv_direct_in_columns(
                 logs_ns3_dir + "/link_net_device_utilization.csv",
-                "pos_int,pos_int,pos_int,pos_int,pos_int"
+                "pos_int,pos_int,pos_int,pos_int,pos_int",
+                engine="numpy",
+                row_filter_predicates=[(2, ">=", warm_up_ns), (3, "<=", duration_ns - cool_down_ns)]
             )
             total_num_utilization_entries = len(utilization_csv_columns[0])
             from_node_id_list = utilization_csv_columns[0]
@@ -279,14 +280,13 @@ def gen_basic_sim_utilization_plot_data(experiment_plot_dir, data_path, list_run
 
             link_pair_to_utilization = {}
             for i in range(total_num_utilization_entries):
-                if interval_start_incl_ns_list[i] >= warm_up_ns and interval_end_incl_ns_list[i] <= duration_ns - cool_down_ns:
-                    link_pair = (from_node_id_list[i], to_node_id_list[i])
-                    if link_pair not in link_pair_to_utilization:
-                        link_pair_to_utilization[link_pair] = (0, 0)
-                    link_pair_to_utilization[link_pair] = (
-                        link_pair_to_utilization[link_pair][0] + interval_end_incl_ns_list[i] - interval_start_incl_ns_list[i],
-                        link_pair_to_utilization[link_pair][1] + busy_time_ns_list[i]
-                    )
+                link_pair = (from_node_id_list[i], to_node_id_list[i])
+                if link_pair not in link_pair_to_utilization:
+                    link_pair_to_utilization[link_pair] = (0, 0)
+                link_pair_to_utilization[link_pair] = (
+                    link_pair_to_utilization[link_pair][0] + interval_end_incl_ns_list[i] - interval_start_incl_ns_list[i],
+                    link_pair_to_utilization[link_pair][1] + busy_time_ns_list[i]
+                )
 
             # The two groups
             links_server_leaf_average_utilization = []
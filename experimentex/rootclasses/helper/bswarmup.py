@@ -0,0 +1,173 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import exputil
+import numpy as np
+import ast
+import math
+
+
+def calculate_mser_truncation_index(series, batch_size=5):
+    """
+    Calculate the warm-up truncation point of a series using the MSER-m steady-state detector
+    (Marginal Standard Error Rule, applied to the means of consecutive batches of size m; MSER-5 for m = 5).
+    For each candidate number of truncated batches d (at most half of the batches), it calculates:
+
+        MSER(d) = 1 / (k - d)^2 * sum_{j=d}^{k-1} (Y_j - mean(Y_d, ..., Y_{k-1}))^2
+
+    ... with Y_j the k batch means, and selects the d which minimizes it.
+
+    :param series:      Sequence of observations (in order of time)
+    :param batch_size:  Batch size m
+
+    :return: Number of observations to truncate from the start of the series
+    """
+    num_batches = len(series) // batch_size
+    if num_batches < 2:
+        raise ValueError(
+            "Series of %d observations is too short for MSER with batch size %d" % (len(series), batch_size)
+        )
+    batch_means = np.asarray(series[:num_batches * batch_size], dtype=float).reshape(num_batches, batch_size).mean(1)
+
+    # Suffix sums to calculate the sum of squared errors of each truncation in bulk
+    suffix_sum = np.cumsum(batch_means[::-1])[::-1]
+    suffix_sum_squares = np.cumsum((batch_means ** 2)[::-1])[::-1]
+    remaining = np.arange(num_batches, 0, -1, dtype=float)
+    sum_squared_errors = np.maximum(suffix_sum_squares - suffix_sum ** 2 / remaining, 0.0)
+    mser = sum_squared_errors / remaining ** 2
+
+    # Only truncation of at most half the batches is considered
+    return int(np.argmin(mser[:num_batches // 2 + 1])) * batch_size
+
+
+def read_csv_files_in_concatenated_columns(csv_filenames, line_values_format, row_filter_predicates, column_indices):
+    """
+    Read the columns of several CSV files (e.g., the logs of each system of a distributed run) as one.
+
+    :param csv_filenames:           List of CSV filenames
+    :param line_values_format:      Line format (see exputil.read_csv_direct_in_columns)
+    :param row_filter_predicates:   Predicates which a row must all satisfy to be kept
+    :param column_indices:          Indices of the columns to return
+
+    :return: List of the concatenated (NumPy) columns
+    """
+    list_columns = list(map(
+        lambda x: exputil.read_csv_direct_in_columns(
+            x, line_values_format, engine="numpy",
+            row_filter_predicates=row_filter_predicates, column_indices=column_indices
+        ),
+        csv_filenames
+    ))
+    return list(map(lambda j: np.concatenate(list(map(lambda x: x[j], list_columns))), range(len(column_indices))))
+
+
+def calculate_mser_warm_up_ns(logs_ns3_dir, measurement_end_ns, batch_size=5, distributed_systems_count=None):
+    """
+    Calculate the MSER warm-up truncation point of a basic-sim run based on two series:
+    (a) The mean link utilization across all links over time (link_net_device_utilization.csv)
+    (b) The flow completion time of the finished flows in order of their start time (tcp_flows.csv)
+    Only what starts before the end of the measurement period (i.e., before the cool-down) is taken into account.
+
+    :param logs_ns3_dir:                basic-sim logs_ns3 directory
+    :param measurement_end_ns:          Time (ns) at which the measurement period ends
+    :param batch_size:                  Batch size m of MSER-m
+    :param distributed_systems_count:   Number of systems of a distributed run, of which the logs of each
+                                        system (system_<id>_*.csv) are read (None if it is not distributed)
+
+    :return: (warm-up (ns) according to the utilization series, warm-up (ns) according to the FCT series)
+    """
+    if distributed_systems_count is None:
+        utilization_filenames = [logs_ns3_dir + "/link_net_device_utilization.csv"]
+        tcp_flows_filenames = [logs_ns3_dir + "/tcp_flows.csv"]
+    else:
+        utilization_filenames = list(map(
+            lambda x: logs_ns3_dir + "/system_%d_link_net_device_utilization.csv" % x,
+            range(distributed_systems_count)
+        ))
+        tcp_flows_filenames = list(map(
+            lambda x: logs_ns3_dir + "/system_%d_tcp_flows.csv" % x, range(distributed_systems_count)
+        ))
+
+    # Mean utilization across all links for each interval
+    utilization_columns = read_csv_files_in_concatenated_columns(
+        utilization_filenames,
+        "pos_int,pos_int,pos_int,pos_int,pos_int",
+        [(2, "<", measurement_end_ns)],
+        [2, 3, 4]
+    )
+    interval_start_ns = np.array(utilization_columns[0], dtype=np.int64)
+    interval_end_ns = np.array(utilization_columns[1], dtype=np.int64)
+    busy_time_ns = np.array(utilization_columns[2], dtype=float)
+    list_interval_start_ns, interval_idx = np.unique(interval_start_ns, return_inverse=True)
+    utilization_series = (
+        np.bincount(interval_idx, weights=busy_time_ns / (interval_end_ns - interval_start_ns))
+        / np.bincount(interval_idx)
+    )
+    utilization_truncation_index = calculate_mser_truncation_index(utilization_series, batch_size)
+    utilization_warm_up_ns = int(list_interval_start_ns[utilization_truncation_index])
+
+    # FCT of the finished flows in order of start time (the flow identifiers of the log
+    # of a single system are not consecutive, as such they are read as int)
+    tcp_flows_columns = read_csv_files_in_concatenated_columns(
+        tcp_flows_filenames,
+        "int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,pos_int,string,string",
+        [(4, "<", measurement_end_ns), (8, "==", "YES")],
+        [4, 6]
+    )
+    start_time_ns = np.array(tcp_flows_columns[0], dtype=np.int64)
+    fct_ns = np.array(tcp_flows_columns[1], dtype=float)
+    order = np.argsort(start_time_ns, kind="stable")
+    fct_truncation_index = calculate_mser_truncation_index(fct_ns[order], batch_size)
+    fct_warm_up_ns = int(start_time_ns[order][fct_truncation_index])
+
+    return utilization_warm_up_ns, fct_warm_up_ns
+
+
+def calculate_mser_warm_up_ns_per_load(list_run_dir, batch_size=5):
+    """
+    Calculate for each target load the minimal warm-up (ns) such that, for all its runs, both
+    the utilization and FCT series are past their MSER truncation point.
+
+    :param list_run_dir:  List of finished load-ls run directories (of which the logs of distributed runs
+                          are read per system, such that they do not have to be merged beforehand)
+    :param batch_size:    Batch size m of MSER-m
+
+    :return: Mapping of target load to the recommended warm-up (ns)
+    """
+    target_load_to_warm_up_ns = {}
+    for run_dir in list_run_dir:
+        with open(run_dir + "/data-structure.txt", "r") as f_in:
+            run_data_structure = ast.literal_eval(f_in.read())
+        target_load = run_data_structure["load_with_lambda_flow_arrival_rate"][1][0]
+        expected_flows_per_s = run_data_structure["load_with_lambda_flow_arrival_rate"][1][1]
+        total_expected_num_flows = run_data_structure["total_expected_num_flows"][1]
+        measurement_end_ns = run_data_structure["warm_up_ns"][1] + int(math.ceil(
+            float(total_expected_num_flows) / float(expected_flows_per_s) * 1000000000
+        ))
+        warm_up_ns = max(calculate_mser_warm_up_ns(
+            run_dir + "/logs_ns3",
+            measurement_end_ns,
+            batch_size,
+            run_data_structure.get("distributed_systems_count", (False, None))[1]
+        ))
+        target_load_to_warm_up_ns[target_load] = max(target_load_to_warm_up_ns.get(target_load, 0), warm_up_ns)
+    return target_load_to_warm_up_ns
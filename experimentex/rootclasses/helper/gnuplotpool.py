@@ -0,0 +1,230 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import time
+import uuid
+import atexit
+import threading
+import subprocess
+import exputil
+from concurrent.futures import ThreadPoolExecutor
+from exputil.shell import ShellExecResult
+from exputil.shell_trace import record_shell_trace
+
+
+class GnuplotWorker:
+    """
+    Long-lived gnuplot process which executes scripts fed to it over a pipe, such that
+    the startup of gnuplot (and the initialization of its terminals) is only paid once.
+
+    Between scripts the session and its errors are reset, and the output file is closed after each script.
+    Completion is detected by a unique marker which is printed after the script. As gnuplot reads the
+    script from its standard input, it does not exit on an error but continues with the next command:
+    an error is instead detected by a second marker (with GPVAL_ERRNO and GPVAL_ERRMSG) which is printed
+    before the completion marker if an error occurred. Should gnuplot still exit, it is restarted for
+    the next script.
+    """
+
+    def __init__(self):
+        self.process = None
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            ["gnuplot"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,  # Errors and warnings are read together with the marker
+            universal_newlines=True,
+            bufsize=1
+        )
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def execute(self, script, cwd):
+        """
+        Execute a gnuplot script.
+
+        :param script:  Gnuplot script
+        :param cwd:     Working directory of the script (relative paths in it are relative to it)
+
+        :return: Output (of print statements, warnings) of the script
+        """
+        if not self.is_alive():
+            self._start()
+
+        # The script is executed in a fresh session in its working directory (single quotes are
+        # escaped in a single-quoted gnuplot string by doubling them), after which its output is closed
+        marker = "GNUPLOT-WORKER-DONE-" + uuid.uuid4().hex
+        error_marker = "GNUPLOT-WORKER-ERROR-" + uuid.uuid4().hex
+        try:
+            self.process.stdin.write(
+                "reset session\n"
+                "reset errors\n"
+                "cd '%s'\n"
+                "%s\n"
+                "unset output\n"
+                "set print \"-\"\n"
+                "if (GPVAL_ERRNO != 0) { print sprintf(\"%s %%d %%s\", GPVAL_ERRNO, GPVAL_ERRMSG) }\n"
+                "print \"%s\"\n" % (cwd.replace("'", "''"), script, error_marker, marker)
+            )
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            pass  # It exited while the script was being written, which is handled below
+
+        # Read till the marker, or till it exited
+        output_lines = []
+        error = None
+        while True:
+            line = self.process.stdout.readline()
+            if line == "":
+                return_code = self.process.wait()
+                self.process = None
+                raise exputil.FailedCommandError(
+                    "Gnuplot script failed (return code %d): %s" % (return_code, "".join(output_lines)),
+                    ShellExecResult(return_code, "".join(output_lines), None)
+                )
+            if line.startswith(error_marker + " "):
+                error = line.strip()[len(error_marker) + 1:].split(" ", 1)
+            elif line.strip() == marker:
+                break
+            else:
+                output_lines.append(line)
+
+        # Errors do not stop the script, as such they are only reported once it has completed
+        if error is not None:
+            raise exputil.FailedCommandError(
+                "Gnuplot script failed (GPVAL_ERRNO %s: %s): %s" % (
+                    error[0], error[1] if len(error) > 1 else "", "".join(output_lines)
+                ),
+                ShellExecResult(int(error[0]), "".join(output_lines), None)
+            )
+        return "".join(output_lines)
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.process.wait()
+            self.process = None
+
+
+class GnuplotWorkerPool:
+    """
+    Pool of gnuplot workers. Workers are only started when there is no idle worker,
+    such that synchronous use only ever starts a single gnuplot process.
+    """
+
+    def __init__(self, max_num_workers=None):
+        """
+        :param max_num_workers:     Maximum number of gnuplot processes (None: number of CPUs)
+        """
+        self.max_num_workers = max_num_workers if max_num_workers is not None else (os.cpu_count() or 1)
+        self.idle_workers = []
+        self.num_workers = 0
+        self.condition = threading.Condition()
+        self.executor = None
+
+    def _acquire_worker(self):
+        with self.condition:
+            while len(self.idle_workers) == 0 and self.num_workers >= self.max_num_workers:
+                self.condition.wait()
+            if len(self.idle_workers) > 0:
+                return self.idle_workers.pop()
+            self.num_workers += 1
+            return GnuplotWorker()
+
+    def _release_worker(self, worker):
+        with self.condition:
+            self.idle_workers.append(worker)
+            self.condition.notify()
+
+    def execute(self, script, cwd=None):
+        """
+        Execute a gnuplot script on an idle worker (blocks till it has finished).
+
+        :param script:  Gnuplot script
+        :param cwd:     Working directory of the script (None: current working directory)
+
+        :return: Output of the script
+        """
+        cwd = os.getcwd() if cwd is None else cwd
+        worker = self._acquire_worker()
+        start = time.perf_counter()
+        try:
+            output = worker.execute(script, cwd)
+        except exputil.FailedCommandError as e:
+            record_shell_trace("gnuplot", time.perf_counter() - start, e.sec.return_code, e.sec.output)
+            raise
+        finally:
+            self._release_worker(worker)
+        record_shell_trace("gnuplot", time.perf_counter() - start, 0, output)
+        return output
+
+    def submit(self, script, cwd=None):
+        """
+        Submit a gnuplot script for execution on the next idle worker.
+
+        :param script:  Gnuplot script
+        :param cwd:     Working directory of the script (None: current working directory)
+
+        :return: Future of the output of the script
+        """
+        with self.condition:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_num_workers)
+        return self.executor.submit(self.execute, script, os.getcwd() if cwd is None else cwd)
+
+    def close(self):
+        """
+        Wait for all submitted scripts to finish, and stop all workers.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        with self.condition:
+            for worker in self.idle_workers:
+                worker.close()
+            self.idle_workers = []
+            self.num_workers = 0
+
+
+# Pool of the current process (a forked child process starts its own workers)
+_pool = None
+_pool_pid = None
+
+
+def get_gnuplot_worker_pool():
+    """
+    Retrieve the gnuplot worker pool of the current process, which is closed when it exits.
+
+    :return: Gnuplot worker pool
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = GnuplotWorkerPool()
+        _pool_pid = os.getpid()
+        atexit.register(_pool.close)
+    return _pool
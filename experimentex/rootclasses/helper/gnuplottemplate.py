@@ -0,0 +1,86 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import re
+from .gnuplotpool import get_gnuplot_worker_pool
+
+
+# Placeholders in a gnuplot template are upper-case names in square brackets (e.g., [OUTPUT-FILE]),
+# which do not clash with gnuplot ranges (e.g., [0:100] or [lower:upper])
+PLACEHOLDER_REGEX = re.compile(r"\[[A-Z][A-Z0-9\-]*\]")
+
+# Template filename (absolute path) to its content, such that each template is only read once per process
+_template_cache = {}
+
+
+def load_gnuplot_template(template_filename):
+    """
+    Load a gnuplot template (cached).
+
+    :param template_filename:   Gnuplot template filename (e.g., in rootclasses/gnuplot)
+
+    :return: Template content
+    """
+    abs_template_filename = os.path.abspath(template_filename)
+    if abs_template_filename not in _template_cache:
+        with open(abs_template_filename, "r") as f_in:
+            _template_cache[abs_template_filename] = f_in.read()
+    return _template_cache[abs_template_filename]
+
+
+def render_gnuplot_template(template_filename, placeholder_to_value):
+    """
+    Render a gnuplot template by substituting its placeholders. Each placeholder in the template must be
+    given a value, and each given placeholder must be in the template.
+
+    :param template_filename:       Gnuplot template filename
+    :param placeholder_to_value:    Mapping of placeholder (e.g., "[OUTPUT-FILE]") to its value (converted to string)
+
+    :return: Gnuplot script
+    """
+    template = load_gnuplot_template(template_filename)
+    template_placeholders = set(PLACEHOLDER_REGEX.findall(template))
+    missing = template_placeholders - set(placeholder_to_value.keys())
+    if len(missing) > 0:
+        raise ValueError("Gnuplot template %s has placeholders without value: %s" % (
+            template_filename, ", ".join(sorted(missing))
+        ))
+    unknown = set(placeholder_to_value.keys()) - template_placeholders
+    if len(unknown) > 0:
+        raise ValueError("Gnuplot template %s does not have placeholders: %s" % (
+            template_filename, ", ".join(sorted(unknown))
+        ))
+
+    # Substitution is done in a single pass, as such values are never substituted themselves
+    return PLACEHOLDER_REGEX.sub(lambda match: str(placeholder_to_value[match.group(0)]), template)
+
+
+def plot_gnuplot_template(template_filename, placeholder_to_value):
+    """
+    Render a gnuplot template and execute it on a (long-lived) gnuplot worker of the pool.
+
+    :param template_filename:       Gnuplot template filename
+    :param placeholder_to_value:    Mapping of placeholder (e.g., "[OUTPUT-FILE]") to its value (converted to string)
+    """
+    script = render_gnuplot_template(template_filename, placeholder_to_value)
+    get_gnuplot_worker_pool().execute(script)
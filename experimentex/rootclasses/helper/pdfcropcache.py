@@ -0,0 +1,66 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import re
+import shlex
+import shutil
+import exputil
+from hashlib import sha256
+
+
+# Entries of a PDF which differ each time the same figure is plotted, and as such are not part of its content hash
+PDF_VARIABLE_ENTRY_REGEX = re.compile(rb"/(CreationDate|ModDate) *\([^)]*\)|/ID *\[[^\]]*\]")
+
+
+def calculate_pdf_content_hash(pdf_filename):
+    """
+    Calculate the hash of the content of a PDF, disregarding its creation and modification date and identifier.
+
+    :param pdf_filename:    PDF filename
+
+    :return: Content hash (hex)
+    """
+    with open(pdf_filename, "rb") as f_in:
+        return sha256(PDF_VARIABLE_ENTRY_REGEX.sub(b"", f_in.read())).hexdigest()
+
+
+def crop_pdf(path_to_core, pdf_filename):
+    """
+    Crop a PDF (in-place) to make it have less whitespace around it. The cropped PDF is cached by the
+    content hash of the original in temp/pdfcrop-cache, such that pdfcrop (which starts a TeX engine and
+    Ghostscript) is only executed for a PDF whose content was not cropped before.
+
+    :param path_to_core:    Path to the core (e.g., "..")
+    :param pdf_filename:    PDF filename
+    """
+    cache_dir = path_to_core + "/temp/pdfcrop-cache"
+    os.makedirs(cache_dir, exist_ok=True)
+    cached_filename = cache_dir + "/" + calculate_pdf_content_hash(pdf_filename) + ".pdf"
+
+    # Crop it using pdfcrop if it is not yet in the cache (which is added to atomically, as plotters can be concurrent)
+    if not os.path.isfile(cached_filename):
+        tmp_filename = cache_dir + "/tmp-%d.pdf" % os.getpid()
+        exputil.LocalShell().perfect_exec("pdfcrop " + shlex.quote(pdf_filename) + " " + shlex.quote(tmp_filename))
+        os.replace(tmp_filename, cached_filename)
+
+    shutil.copyfile(cached_filename, pdf_filename)
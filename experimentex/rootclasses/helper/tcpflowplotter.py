@@ -21,16 +21,20 @@
 # SOFTWARE.
 
 import math
+import shutil
 import numpy as np
 import exputil
 
+from .gnuplottemplate import plot_gnuplot_template
+
 
 def generate_tcp_flow_rate_csv(logs_ns3_dir, data_out_dir, tcp_flow_id, interval_ns):
 
     # Read in CSV of the progress
     progress_csv_columns = exputil.read_csv_direct_in_columns(
         logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_progress.csv",
-        "pos_int,pos_int,pos_int"
+        "pos_int,pos_int,pos_int",
+        engine="numpy"
     )
     num_entries = len(progress_csv_columns[0])
     tcp_flow_id_list = progress_csv_columns[0]
@@ -90,6 +94,40 @@ def generate_tcp_flow_rate_csv(logs_ns3_dir, data_out_dir, tcp_flow_id, interval
     print("Produced: " + data_filename)
 
 
+def copy_log_to_data_out_dir(logs_ns3_dir, data_out_dir, log_filename):
+    """
+    Copy a TCP flow log into the data output directory as plain file (also if the log itself
+    is compressed, as gnuplot cannot read compressed data files).
+
+    :param logs_ns3_dir:    basic-sim logs_ns3 directory
+    :param data_out_dir:    Data output directory
+    :param log_filename:    Log filename (e.g., tcp_flow_0_rtt.csv)
+
+    :return: Copied data filename
+    """
+    with exputil.open_possibly_compressed(logs_ns3_dir + "/" + log_filename) as f_in:
+        with open(data_out_dir + "/" + log_filename, "w+") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    return data_out_dir + "/" + log_filename
+
+
+def max_csv_column_value(csv_filename, column_idx):
+    """
+    Maximum value of a column of a "pos_int,pos_int,pos_int" TCP flow log, read batch-by-batch
+    such that long logs are never entirely in memory.
+
+    :param csv_filename:    TCP flow log CSV filename
+    :param column_idx:      Column index
+
+    :return: Maximum value (0 if the log is empty)
+    """
+    max_value = 0
+    for columns in exputil.iterate_csv_in_column_batches(csv_filename, "pos_int,pos_int,pos_int", engine="numpy"):
+        if len(columns[column_idx]) > 0:
+            max_value = max(max_value, int(np.max(columns[column_idx])))
+    return max_value
+
+
 def plot_tcp_flow(logs_ns3_dir, plt_dir, data_out_dir, pdf_out_dir, tcp_flow_id, interval_ns, segment_size_byte):
     local_shell = exputil.LocalShell()
 
@@ -113,143 +151,158 @@ def plot_tcp_flow(logs_ns3_dir, plt_dir, data_out_dir, pdf_out_dir, tcp_flow_id,
     data_filename = data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_rate_in_intervals.csv"
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_rate_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_rate.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. progress
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_progress.csv"
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_progress.csv")
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_progress.csv"
+    )
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_progress_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_progress.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. rtt
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_rtt.csv"
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_rtt.csv")
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_rtt.csv"
+    )
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_rtt_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_rtt.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. rto
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_rto.csv"
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_rto.csv")
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_rto.csv"
+    )
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_rto_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_rto.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. cwnd
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv"
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv")
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv"
+    )
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_cwnd_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_cwnd.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[SEGMENT-SIZE-BYTE]", str(float(segment_size_byte)))
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[SEGMENT-SIZE-BYTE]": str(float(segment_size_byte)),
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. cwnd_inflated
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv"
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv")
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv"
+    )
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_cwnd_inflated_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_cwnd_inflated.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[SEGMENT-SIZE-BYTE]", str(float(segment_size_byte)))
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[SEGMENT-SIZE-BYTE]": str(float(segment_size_byte)),
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. ssthresh
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_ssthresh.csv"
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_ssthresh.csv"
+    )
 
     # Retrieve the highest ssthresh which is not a max. integer
-    ssthresh_values = exputil.read_csv_direct_in_columns(data_filename, "pos_int,pos_int,pos_int")[2]
     max_ssthresh = 0
-    for ssthresh in ssthresh_values:
-        if ssthresh > max_ssthresh and ssthresh != 4294967295:
-            max_ssthresh = ssthresh
+    for ssthresh_columns in exputil.iterate_csv_in_column_batches(
+            data_filename, "pos_int,pos_int,pos_int", engine="numpy"
+    ):
+        ssthresh_values = ssthresh_columns[2][ssthresh_columns[2] != 4294967295]
+        if len(ssthresh_values) > 0:
+            max_ssthresh = max(max_ssthresh, int(np.max(ssthresh_values)))
     if max_ssthresh == 0:  # If it never got out of initial slow-start, we just set it to 1 for the plot
         max_ssthresh = 1.0
 
     # Execute ssthresh plotting
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_ssthresh.csv")
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_ssthresh_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_ssthresh.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain(
-        "temp.plt",
-        "[MAX-Y]",
-        str(math.ceil(max_ssthresh / float(segment_size_byte)))
-    )
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[SEGMENT-SIZE-BYTE]", str(float(segment_size_byte)))
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[MAX-Y]": str(math.ceil(max_ssthresh / float(segment_size_byte))),
+            "[OUTPUT-FILE]": pdf_filename,
+            "[SEGMENT-SIZE-BYTE]": str(float(segment_size_byte)),
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. inflight
-    data_filename = logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_inflight.csv"
-    local_shell.copy_file(data_filename, data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_inflight.csv")
+    data_filename = copy_log_to_data_out_dir(
+        logs_ns3_dir, data_out_dir, "tcp_flow_" + str(tcp_flow_id) + "_inflight.csv"
+    )
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_inflight_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_inflight.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[SEGMENT-SIZE-BYTE]", str(float(segment_size_byte)))
-    local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-    local_shell.perfect_exec("gnuplot temp.plt")
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[OUTPUT-FILE]": pdf_filename,
+            "[SEGMENT-SIZE-BYTE]": str(float(segment_size_byte)),
+            "[DATA-FILE]": data_filename,
+        }
+    )
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
 
     # Plot time vs. together (cwnd, cwnd_inflated, ssthresh, inflight)
-    cwnd_values = exputil.read_csv_direct_in_columns(
-        logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv", "pos_int,pos_int,pos_int")[2]
-    cwnd_inflated_values = exputil.read_csv_direct_in_columns(
-        logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv", "pos_int,pos_int,pos_int")[2]
+    max_cwnd = max_csv_column_value(data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv", 2)
+    max_cwnd_inflated = max_csv_column_value(data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv", 2)
     pdf_filename = pdf_out_dir + "/plot_tcp_flow_time_vs_together_" + str(tcp_flow_id) + ".pdf"
     plt_filename = plt_dir + "/" + "plot_tcp_flow_time_vs_together.plt"
-    local_shell.copy_file(plt_filename, "temp.plt")
-    local_shell.sed_replace_in_file_plain("temp.plt", "[MAX-Y]", str(
-        max(
-            math.ceil(max_ssthresh / float(segment_size_byte)),
-            math.ceil(np.max(cwnd_values) / float(segment_size_byte)),
-            math.ceil(np.max(cwnd_inflated_values) / float(segment_size_byte))
-        )
-    ))
-    local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-    local_shell.sed_replace_in_file_plain("temp.plt", "[SEGMENT-SIZE-BYTE]", str(float(segment_size_byte)))
-    local_shell.sed_replace_in_file_plain(
-        "temp.plt", "[DATA-FILE-CWND]", logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv"
-    )
-    local_shell.sed_replace_in_file_plain(
-        "temp.plt", "[DATA-FILE-CWND-INFLATED]", logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv"
+    max_y = max(
+        math.ceil(max_ssthresh / float(segment_size_byte)),
+        math.ceil(max_cwnd / float(segment_size_byte)),
+        math.ceil(max_cwnd_inflated / float(segment_size_byte))
     )
-    local_shell.sed_replace_in_file_plain(
-        "temp.plt", "[DATA-FILE-SSTHRESH]", logs_ns3_dir + "/tcp_flow_" + str(tcp_flow_id) + "_ssthresh.csv"
+    plot_gnuplot_template(
+        plt_filename,
+        {
+            "[MAX-Y]": str(max_y),
+            "[OUTPUT-FILE]": pdf_filename,
+            "[SEGMENT-SIZE-BYTE]": str(float(segment_size_byte)),
+            "[DATA-FILE-CWND]": data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd.csv",
+            "[DATA-FILE-CWND-INFLATED]": data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_cwnd_inflated.csv",
+            "[DATA-FILE-SSTHRESH]": data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_ssthresh.csv",
+            "[DATA-FILE-INFLIGHT]": data_out_dir + "/tcp_flow_" + str(tcp_flow_id) + "_inflight.csv",
+        }
     )
-    local_shell.perfect_exec("gnuplot temp.plt")
     print("Produced plot: " + pdf_filename)
-    local_shell.remove("temp.plt")
@@ -28,6 +28,7 @@ import math
 import random
 import copy
 import ast
+import numpy as np
 
 
 # Import the abstract class for interpreter
@@ -71,6 +72,23 @@ from .helper.bsgenplotdata import (
     gen_basic_sim_utilization_plot_data
 )
 
+from .helper.bswarmup import calculate_mser_warm_up_ns_per_load
+
+from .helper.bsadaptivesweep import (
+    calculate_mean_fct_ns_of_flow_size,
+    calculate_measurement_end_ns,
+    select_refinement_loads
+)
+
+from .helper.bsdistributed import (
+    calculate_leaf_group_node_system_id_assignment,
+    is_basic_sim_distributed_run_finished,
+    merge_basic_sim_distributed_logs
+)
+
+from .helper.gnuplottemplate import plot_gnuplot_template
+from .helper.pdfcropcache import crop_pdf
+
 
 def draw_n_times_from_to_all_to_all(n, servers, seed):
 
@@ -122,6 +140,109 @@ def draw_poisson_inter_arrival_gap_start_times_ns(duration_ns, lambda_mean_arriv
     return start_times_ns
 
 
+def draw_tcp_flow_schedule_numpy_v1(
+        duration_ns,
+        lambda_mean_arrival_rate_flows_per_s,
+        servers,
+        small_flow_size_byte,
+        large_flow_size_byte,
+        small_flow_probability,
+        seed
+):
+    """
+    Draw the TCP flow schedule in bulk using the NumPy random generator (flow schedule RNG mode "numpy-v1").
+    It follows the same distributions as the per-flow Python random draws, but a different random stream:
+    - Start times: Poisson process (exponential inter-arrival gaps) until the duration is reached
+    - (From, to): uniformly at random from all servers, with the destination drawn from the other servers
+    - Flow size: small with the small flow probability, else large
+
+    Version 1 is defined as: PCG64 bit generators from the seed's SeedSequence spawned into three child
+    streams (start times, from-to, flow sizes). It must never be changed; use a new version instead.
+
+    :param duration_ns:                           Duration (ns) within which flows start
+    :param lambda_mean_arrival_rate_flows_per_s:  Lambda mean arrival rate (flows/s)
+    :param servers:                               List of server node identifiers (no duplicates, at least two)
+    :param small_flow_size_byte:                  Small flow size (byte)
+    :param large_flow_size_byte:                  Large flow size (byte)
+    :param small_flow_probability:                Probability of a flow being small
+    :param seed:                                  Seed (non-negative integer of arbitrary size)
+
+    :return: (start times (ns), from, to, flow size (byte)) each as int64 NumPy array
+    """
+
+    # No duplicates in the servers array
+    if len(set(servers)) != len(servers):
+        raise ValueError("There are duplicate entries in the servers array: " + str(servers))
+    if len(servers) < 2:
+        raise ValueError("Cannot have less than two servers")
+    servers = np.array(servers, dtype=np.int64)
+
+    # Independent streams
+    rng_start_times, rng_from_to, rng_flow_size = map(
+        lambda x: np.random.Generator(np.random.PCG64(x)),
+        np.random.SeedSequence(seed).spawn(3)
+    )
+
+    # Start times (ns): draw gaps in batches (sized beyond the expected count) until the duration is exceeded
+    mean_gap_ns = 1e9 / lambda_mean_arrival_rate_flows_per_s
+    expected_num_flows = duration_ns / mean_gap_ns
+    batch_size = int(expected_num_flows + 6.0 * math.sqrt(expected_num_flows)) + 16
+    arrivals_ns = np.cumsum(rng_start_times.exponential(mean_gap_ns, batch_size))
+    while arrivals_ns[-1] < duration_ns:
+        arrivals_ns = np.concatenate((
+            arrivals_ns, arrivals_ns[-1] + np.cumsum(rng_start_times.exponential(mean_gap_ns, batch_size))
+        ))
+    start_times_ns = np.rint(arrivals_ns).astype(np.int64)
+    start_times_ns = start_times_ns[:np.searchsorted(start_times_ns, duration_ns, side="left")]
+    num_flows = len(start_times_ns)
+
+    # (From, to): the destination is drawn from the other servers (no self-loops)
+    src = rng_from_to.integers(0, len(servers), num_flows)
+    dst = rng_from_to.integers(0, len(servers) - 1, num_flows)
+    dst += (dst >= src)
+
+    # Flow sizes in byte
+    flow_size_byte = np.where(
+        rng_flow_size.random(num_flows) <= small_flow_probability,
+        small_flow_size_byte,
+        large_flow_size_byte
+    ).astype(np.int64)
+
+    return start_times_ns, servers[src], servers[dst], flow_size_byte
+
+
+def write_tcp_flow_schedule(filename, list_from, list_to, list_flow_size_byte, list_start_time_ns, list_priority,
+                            num_flows_per_chunk=100000):
+    """
+    Write the TCP flow schedule with a bulk formatting of its lines in chunks, such that the memory
+    used by the formatting remains bounded for schedules of many flows.
+
+    :param filename:             Output filename (tcp_flow_schedule.csv)
+    :param list_from:            From node identifier of each flow
+    :param list_to:              To node identifier of each flow
+    :param list_flow_size_byte:  Size (byte) of each flow
+    :param list_start_time_ns:   Start time (ns) of each flow
+    :param list_priority:        Priority (additional parameter) of each flow
+    :param num_flows_per_chunk:  Number of flows (lines) which are formatted at once
+    """
+    num_flows = len(list_start_time_ns)
+    columns = [
+        np.arange(num_flows, dtype=np.int64),
+        np.asarray(list_from, dtype=np.int64),
+        np.asarray(list_to, dtype=np.int64),
+        np.asarray(list_flow_size_byte, dtype=np.int64),
+        np.asarray(list_start_time_ns, dtype=np.int64),
+        np.asarray(list_priority, dtype=str)
+    ]
+    with open(filename, "w+") as f_out:
+        for chunk_start in range(0, num_flows, num_flows_per_chunk):
+            chunk_end = min(chunk_start + num_flows_per_chunk, num_flows)
+            values = np.empty((chunk_end - chunk_start, 6), dtype=object)
+            for j in range(6):
+                values[:, j] = columns[j][chunk_start:chunk_end].tolist()
+            f_out.write(("%d,%d,%d,%d,%d,%s,\n" * (chunk_end - chunk_start)) % tuple(values.ravel()))
+
+
 def get_mean_statistic(
         exp_instance_name,
         filename_plot,
@@ -196,11 +317,45 @@ def calculate_all_to_all_max_load_from_data_structure(data_structure):
     return max_load_megabit_per_s
 
 
+def calculate_lambda_flow_arrival_rate_per_load_percentage_from_data_structure(data_structure):
+    expected_mean_flow_size_byte = calculate_mean_flow_size_byte_from_data_structure(data_structure)
+    max_load_megabit_per_s = calculate_all_to_all_max_load_from_data_structure(data_structure)
+    max_load_flows_per_s = max_load_megabit_per_s / (expected_mean_flow_size_byte / 125000.0)
+    return round(1.0 / 100.0 * max_load_flows_per_s, 4)
+
+
+# Data structure keys which define the traffic (i.e., flow schedule) of a run
+TRAFFIC_DEFINING_DATA_STRUCTURE_KEYS = {
+    "total_expected_num_flows",
+    "num_leafs",
+    "num_spines",
+    "num_servers_per_leaf",
+    "load_with_lambda_flow_arrival_rate",
+    "small_flow_size_byte",
+    "large_flow_size_byte",
+    "small_flow_probability",
+    "warm_up_ns",
+    "cool_down_ns",
+    "run_number",
+    "flow_schedule_rng_mode",
+    "common_random_numbers",
+}
+
+
 class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
 
     def __init__(self):
         self.root_class_name = "load-ls"
 
+        # Distributed runs need to be launched differently in their run.sh
+        self.run_dir_name_to_distributed_systems_count = {}
+
+        # Flow-level preview runs are not run by ns-3
+        self.flow_level_preview_run_dir_names = set()
+
+        # Run outputs read by the adaptive load refinement of the last run directory generation
+        self.run_output_filenames_read = []
+
     def get_root_class_name(self):
         return self.root_class_name
 
@@ -244,6 +399,17 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
             "tcp_connection_timeout_ns": (False, None),  # Integer
             "tcp_delayed_ack_timeout_ns": (False, None),  # Integer
             "tcp_persist_timeout_ns": (False, None),  # Integer
+
+            # Optional settings are deliberately not part of the empty data structure: they are only
+            # added once an expline sets them, such that the hash of the run data structure (and
+            # thus the run directory name) of experiments which do not use them remains unchanged.
+            # - "distributed_systems_count": Integer >= 2 (number of MPI systems)
+            # - "flow_schedule_rng_mode": String "numpy-v1" (if absent, per-flow Python random draws are used)
+            # - "common_random_numbers": Boolean True (flow schedule seed only based on traffic-defining settings)
+            # - "adaptive_load_refinement": Tuple (maximum number of extra loads (integer),
+            #                               extra loads per round (integer), flow size group ("small" or "large"))
+            #                               (never part of the run data structures)
+            # - "flow_level_preview": Boolean True (run by the flow-level max-min fair simulator instead of ns-3)
         }
 
     def interpret_expline_into_experiment_data_structure(self, exp_name, expline_identifier, expline, data_structure):
@@ -432,9 +598,8 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
                     "Can only set load when Bernoulli flow size distribution, spines, leafs, "
                     "servers/leaf and link net-device data rate are set"
                 )
-            expected_mean_flow_size_byte = calculate_mean_flow_size_byte_from_data_structure(data_structure)
-            max_load_megabit_per_s = calculate_all_to_all_max_load_from_data_structure(data_structure)
-            max_load_flows_per_s = max_load_megabit_per_s / (expected_mean_flow_size_byte / 125000.0)
+            lambda_step_per_load_percentage = \
+                calculate_lambda_flow_arrival_rate_per_load_percentage_from_data_structure(data_structure)
 
             load_from = parse_texish_int_percentage(exp_name, expline_identifier, expline, subgroups[0])
             load_to = parse_texish_int_percentage(exp_name, expline_identifier, expline, subgroups[1])
@@ -461,11 +626,10 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
                     exp_name, expline_identifier, expline, "Load with lambda flow arrival rate is already set"
                 )
 
-            if load_step / 100.0 * max_load_flows_per_s <= 0.01:
+            if load_step * lambda_step_per_load_percentage <= 0.01:
                 raise InterpretExplineError(
                     exp_name, expline_identifier, expline, "Proposed step is too small."
                 )
-            lambda_step_per_load_percentage = round(1.0 / 100.0 * max_load_flows_per_s, 4)
             list_load_with_lambda_flow_arrival_rate = []
             for load in range(load_from, load_to + load_step, load_step):
                 list_load_with_lambda_flow_arrival_rate.append((
@@ -547,10 +711,125 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
 
             return data_structure
 
+        # Example:
+        # The flow schedule is drawn in bulk using the NumPy random generator (version 1).
+        result = re.match(
+            expand_regex_to_be_tolerant_to_whitespace(
+                r'[Tt]he flow schedule is drawn in bulk using the NumPy random generator \(version (.*)\)\.?'
+            ),
+            flatten_brace_group_to_str(expline)
+        )
+        if result is not None:
+            subgroups = result.groups()
+
+            version = exputil.parse_positive_int(subgroups[0])
+            if version != 1:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Only version 1 of the NumPy flow schedule generation exists"
+                )
+            if "flow_schedule_rng_mode" in data_structure:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Flow schedule random generation mode is already set"
+                )
+            data_structure["flow_schedule_rng_mode"] = (True, "numpy-v%d" % version)
+
+            return data_structure
+
+        # Example:
+        # The flow schedule seed is based only on the traffic-defining settings (common random numbers).
+        result = re.match(
+            expand_regex_to_be_tolerant_to_whitespace(
+                r'[Tt]he flow schedule seed is based only on the traffic-defining settings '
+                r'\(common random numbers\)\.?'
+            ),
+            flatten_brace_group_to_str(expline)
+        )
+        if result is not None:
+            if "common_random_numbers" in data_structure:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Common random numbers is already set"
+                )
+            data_structure["common_random_numbers"] = (True, True)
+
+            return data_structure
+
+        # Example:
+        # The simulation is distributed over 4 MPI systems by partitioning the topology per leaf group.
+        result = re.match(
+            expand_regex_to_be_tolerant_to_whitespace(
+                r'[Tt]he simulation is distributed over (.*) MPI systems by partitioning the topology per leaf group\.?'
+            ),
+            flatten_brace_group_to_str(expline)
+        )
+        if result is not None:
+            subgroups = result.groups()
+
+            distributed_systems_count = exputil.parse_positive_int(subgroups[0])
+            if distributed_systems_count < 2:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Number of MPI systems must be at least 2"
+                )
+            if "distributed_systems_count" in data_structure:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Number of MPI systems is already set"
+                )
+            data_structure["distributed_systems_count"] = (True, distributed_systems_count)
+
+            return data_structure
+
+        # Example:
+        # The load points are refined adaptively by inserting at most 8 extra load points, 2 per round,
+        # where the mean FCT of the small flows has the highest curvature or between-run variance.
+        result = re.match(
+            expand_regex_to_be_tolerant_to_whitespace(
+                r'[Tt]he load points are refined adaptively by inserting at most (.*) extra load points, '
+                r'(.*) per round, where the mean FCT of the (small|large) flows has the highest curvature '
+                r'or between-run variance\.?'
+            ),
+            flatten_brace_group_to_str(expline)
+        )
+        if result is not None:
+            subgroups = result.groups()
+
+            max_num_extra_loads = exputil.parse_positive_int(subgroups[0])
+            num_extra_loads_per_round = exputil.parse_positive_int(subgroups[1])
+            if max_num_extra_loads < 1 or num_extra_loads_per_round < 1:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Number of extra load points must be at least 1"
+                )
+            if "adaptive_load_refinement" in data_structure:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Adaptive load refinement is already set"
+                )
+            data_structure["adaptive_load_refinement"] = (
+                True,
+                (max_num_extra_loads, num_extra_loads_per_round, subgroups[2])
+            )
+
+            return data_structure
+
+        # Example:
+        # The runs are previewed using a flow-level simulation with max-min fair rates instead of ns-3.
+        result = re.match(
+            expand_regex_to_be_tolerant_to_whitespace(
+                r'[Tt]he runs are previewed using a flow-level simulation with max-min fair rates instead of ns-3\.?'
+            ),
+            flatten_brace_group_to_str(expline)
+        )
+        if result is not None:
+            if "flow_level_preview" in data_structure:
+                raise InterpretExplineError(
+                    exp_name, expline_identifier, expline, "Flow-level preview is already set"
+                )
+            data_structure["flow_level_preview"] = (True, True)
+
+            return data_structure
+
         # If nothing matched, then it failed
         raise InterpretExplineError(exp_name, expline_identifier, expline, "Did not match any pattern.")
 
     def generate_run_dirs_for_experiment_data_structure(self, exp_instance_name, runs_path, data_structure):
+        self.run_output_filenames_read = []
 
         # Check validity of data structure
         if not data_structure["total_expected_num_flows"][0]:
@@ -621,6 +900,21 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
             raise RunDirGenerationError(exp_instance_name, "Delayed ACK timeout is not set")
         if not data_structure["tcp_persist_timeout_ns"][0]:
             raise RunDirGenerationError(exp_instance_name, "Persist timeout is not set")
+        if "distributed_systems_count" in data_structure:
+            if data_structure["distributed_systems_count"][1] > data_structure["num_leafs"][1]:
+                raise RunDirGenerationError(
+                    exp_instance_name,
+                    "Number of MPI systems (%d) cannot exceed the number of leafs (%d)" % (
+                        data_structure["distributed_systems_count"][1],
+                        data_structure["num_leafs"][1]
+                    )
+                )
+
+        if "flow_level_preview" in data_structure and "distributed_systems_count" in data_structure:
+            raise RunDirGenerationError(exp_instance_name, "A flow-level preview cannot be distributed")
+        if "adaptive_load_refinement" in data_structure:
+            if not isinstance(data_structure["load_with_lambda_flow_arrival_rate"][1], list):
+                raise RunDirGenerationError(exp_instance_name, "Adaptive load refinement requires a varied load")
 
         # Flow arrival rates
         list_load_with_lambda_flow_arrival_rate = []
@@ -629,6 +923,12 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
         else:
             list_load_with_lambda_flow_arrival_rate.append(data_structure["load_with_lambda_flow_arrival_rate"][1])
 
+        # Insert extra load points where the already finished runs show it is most needed
+        if "adaptive_load_refinement" in data_structure:
+            list_load_with_lambda_flow_arrival_rate = self.refine_list_load_with_lambda_flow_arrival_rate(
+                runs_path, data_structure, list_load_with_lambda_flow_arrival_rate
+            )
+
         # Number of runs
         run_numbers = []
         if isinstance(data_structure["run_number"][1], list):
@@ -644,18 +944,13 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
             small_flow_priorities.append(data_structure["small_flow_priority"][1])
 
         # Generate all single-valued run data structures
-        all_run_data_structures = []
-        for load_with_lambda_flow_arrival_rate in list_load_with_lambda_flow_arrival_rate:
-            for run_number in run_numbers:
-                for small_flow_priority in small_flow_priorities:
-                    new_data_structure = copy.deepcopy(data_structure)
-                    new_data_structure["load_with_lambda_flow_arrival_rate"] = True, load_with_lambda_flow_arrival_rate
-                    new_data_structure["run_number"] = True, run_number
-                    new_data_structure["small_flow_priority"] = True, small_flow_priority
-                    all_run_data_structures.append(new_data_structure)
+        all_run_data_structures = self.generate_all_run_data_structures(
+            data_structure, list_load_with_lambda_flow_arrival_rate, run_numbers, small_flow_priorities
+        )
 
         # Finally, create a run directory for each data structure
         list_run_dir_names = []
+        flow_schedule_seed_to_flow_schedule = {}
         for run_data_structure in all_run_data_structures:
 
             # Calculate the hash of the data structure
@@ -663,12 +958,36 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
             run_hash = run_sha256.hexdigest()
             run_master_seed = int.from_bytes(run_sha256.digest(), 'big')
 
+            # A flow-level preview replays the flow schedule of the ns-3 run it previews
+            seed_run_data_structure = run_data_structure
+            if "flow_level_preview" in run_data_structure:
+                seed_run_data_structure = copy.deepcopy(run_data_structure)
+                del seed_run_data_structure["flow_level_preview"]
+
+            # With common random numbers, the flow schedule seed is only based on the traffic-defining settings
+            if seed_run_data_structure.get("common_random_numbers", (False, False))[1]:
+                flow_schedule_seed = int.from_bytes(sha256(repr(sorted(filter(
+                    lambda x: x[0] in TRAFFIC_DEFINING_DATA_STRUCTURE_KEYS,
+                    seed_run_data_structure.items()
+                ))).encode('utf-8')).digest(), 'big')
+            else:
+                flow_schedule_seed = int.from_bytes(
+                    sha256(repr(sorted(seed_run_data_structure.items())).encode('utf-8')).digest(), 'big'
+                )
+
             # Create the run directory
             run_dir_name = self.root_class_name + "-" + str(run_hash)
             list_run_dir_names.append(run_dir_name)
             run_dir_path = runs_path + "/" + run_dir_name
             os.makedirs(run_dir_path, exist_ok=True)
 
+            # Remember how it must be launched
+            if "distributed_systems_count" in run_data_structure:
+                self.run_dir_name_to_distributed_systems_count[run_dir_name] = \
+                    run_data_structure["distributed_systems_count"][1]
+            if "flow_level_preview" in run_data_structure:
+                self.flow_level_preview_run_dir_names.add(run_dir_name)
+
             # Open the data-structure.txt file if it exists, and compare to make sure we don't
             # have a weird duplicate SHA-256 hash (unlikely, but could happen if the hashing
             # of the run data structure was done incorrectly)
@@ -696,6 +1015,11 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
                 with open(run_dir_path + "/master-seed.txt", "w+") as f_out:
                     f_out.write("SHA-256 digest: " + str(run_hash) + "\n")
                     f_out.write("Master seed (SHA-256 digest as integer): " + str(run_master_seed) + "\n")
+                    if flow_schedule_seed != run_master_seed:
+                        f_out.write(
+                            "Flow schedule seed (SHA-256 digest of its defining settings as integer): "
+                            + str(flow_schedule_seed) + "\n"
+                        )
 
                 # Calculate duration
 
@@ -748,6 +1072,21 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
                     f_config.write("tcp_delayed_ack_timeout_ns=%d\n" % data_structure["tcp_delayed_ack_timeout_ns"][1])
                     f_config.write("tcp_persist_timeout_ns=%d\n" % data_structure["tcp_persist_timeout_ns"][1])
 
+                    # Distributed over multiple MPI systems, each having a group of leafs with their servers
+                    if "distributed_systems_count" in run_data_structure:
+                        distributed_systems_count = run_data_structure["distributed_systems_count"][1]
+                        f_config.write("enable_distributed=true\n")
+                        f_config.write("distributed_simulator_implementation_type=nullmsg\n")
+                        f_config.write("distributed_systems_count=%d\n" % distributed_systems_count)
+                        f_config.write("distributed_node_system_id_assignment=list(%s)\n" % (
+                            ','.join(str(x) for x in calculate_leaf_group_node_system_id_assignment(
+                                run_data_structure["num_leafs"][1],
+                                run_data_structure["num_spines"][1],
+                                run_data_structure["num_servers_per_leaf"][1],
+                                distributed_systems_count
+                            ))
+                        ))
+
                 # The point-to-point topology
                 with open(run_dir_path + "/ptop_topology.properties", "w+") as f_topology:
 
@@ -804,56 +1143,74 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
                                      % run_data_structure["link_interface_traffic_control_qdisc"][1])
 
                 # TCP flow schedule
-
-                # Core values
-                expected_flows_per_s = lambda_arrival_rate
-                random.seed(run_master_seed)
-                seed_start_times = random.randint(0, 100000000)
-                seed_from_to = random.randint(0, 100000000)
-                seed_flow_size = random.randint(0, 100000000)
-
-                # Start times (ns)
-                list_start_time_ns = draw_poisson_inter_arrival_gap_start_times_ns(
-                    duration_ns, expected_flows_per_s, seed_start_times
-                )
-                num_starts = len(list_start_time_ns)
-
-                # (From, to) tuples
-                list_from_to = draw_n_times_from_to_all_to_all(
-                    num_starts,
-                    list(range(num_leafs + num_spines, num_leafs + num_spines + num_leafs * num_servers_per_leaf)),
-                    seed_from_to
-                )
-
-                # Flow sizes in byte
-                list_flow_size_byte = []
-                random.seed(seed_flow_size)
+                servers = list(range(num_leafs + num_spines, num_leafs + num_spines + num_leafs * num_servers_per_leaf))
                 small_flow_size_byte = run_data_structure["small_flow_size_byte"][1]
                 large_flow_size_byte = run_data_structure["large_flow_size_byte"][1]
                 small_flow_probability = run_data_structure["small_flow_probability"][1]
                 small_flow_priority = run_data_structure["small_flow_priority"][1]
-                for i in range(len(list_start_time_ns)):
-                    uniform_val = random.random()  # in [0, 1)
-                    if uniform_val <= small_flow_probability:
-                        list_flow_size_byte.append(small_flow_size_byte)
-                    else:
-                        list_flow_size_byte.append(large_flow_size_byte)
+                if flow_schedule_seed in flow_schedule_seed_to_flow_schedule:
+
+                    # Common random numbers: identical to that of a run which only differs in non-traffic settings
+                    list_start_time_ns, list_from, list_to, list_flow_size_byte = \
+                        flow_schedule_seed_to_flow_schedule[flow_schedule_seed]
+
+                elif run_data_structure.get("flow_schedule_rng_mode", (False, None))[1] == "numpy-v1":
+
+                    # Drawn in bulk
+                    list_start_time_ns, list_from, list_to, list_flow_size_byte = draw_tcp_flow_schedule_numpy_v1(
+                        duration_ns,
+                        lambda_arrival_rate,
+                        servers,
+                        small_flow_size_byte,
+                        large_flow_size_byte,
+                        small_flow_probability,
+                        flow_schedule_seed
+                    )
 
-                # Finally, write the schedule
-                with open(run_dir_path + "/tcp_flow_schedule.csv", "w+") as f_tcp_flow_schedule:
+                else:
+
+                    # Core values
+                    expected_flows_per_s = lambda_arrival_rate
+                    random.seed(flow_schedule_seed)
+                    seed_start_times = random.randint(0, 100000000)
+                    seed_from_to = random.randint(0, 100000000)
+                    seed_flow_size = random.randint(0, 100000000)
+
+                    # Start times (ns)
+                    list_start_time_ns = draw_poisson_inter_arrival_gap_start_times_ns(
+                        duration_ns, expected_flows_per_s, seed_start_times
+                    )
+                    num_starts = len(list_start_time_ns)
+
+                    # (From, to) tuples
+                    list_from_to = draw_n_times_from_to_all_to_all(num_starts, servers, seed_from_to)
+                    list_from = list(map(lambda x: x[0], list_from_to))
+                    list_to = list(map(lambda x: x[1], list_from_to))
+
+                    # Flow sizes in byte
+                    list_flow_size_byte = []
+                    random.seed(seed_flow_size)
                     for i in range(len(list_start_time_ns)):
-                        if list_flow_size_byte[i] == small_flow_size_byte:
-                            priority = small_flow_priority
+                        uniform_val = random.random()  # in [0, 1)
+                        if uniform_val <= small_flow_probability:
+                            list_flow_size_byte.append(small_flow_size_byte)
                         else:
-                            priority = "low"
-                        f_tcp_flow_schedule.write("%d,%d,%d,%d,%d,%s,\n" % (
-                            i,
-                            list_from_to[i][0],
-                            list_from_to[i][1],
-                            list_flow_size_byte[i],
-                            list_start_time_ns[i],
-                            priority
-                        ))
+                            list_flow_size_byte.append(large_flow_size_byte)
+
+                # Keep it such that runs with common random numbers can reuse it
+                if run_data_structure.get("common_random_numbers", (False, False))[1]:
+                    flow_schedule_seed_to_flow_schedule[flow_schedule_seed] = \
+                        list_start_time_ns, list_from, list_to, list_flow_size_byte
+
+                # Finally, write the schedule
+                write_tcp_flow_schedule(
+                    run_dir_path + "/tcp_flow_schedule.csv",
+                    list_from,
+                    list_to,
+                    list_flow_size_byte,
+                    list_start_time_ns,
+                    np.where(np.asarray(list_flow_size_byte) == small_flow_size_byte, small_flow_priority, "low")
+                )
 
                 # Write that it is ready to be run
                 with open(run_dir_path + "/input-ready.txt", "w+") as f_out:
@@ -863,25 +1220,180 @@ class LoadLeafSpineRootClassInterpreter(RootClassInterpreter):
         return list_run_dir_names
 
     def generate_run_sh_body_for_run_dir(self, relative_runs_path_from_core_path, run_dir_name):
+
+        # Distributed runs have a finished file for each system
+        if run_dir_name in self.run_dir_name_to_distributed_systems_count:
+            distributed_systems_count = self.run_dir_name_to_distributed_systems_count[run_dir_name]
+            finished_filenames = []
+            for system_id in range(distributed_systems_count):
+                finished_filenames.append("system_%d_finished.txt" % system_id)
+        else:
+            distributed_systems_count = 1
+            finished_filenames = ["finished.txt"]
+
         run_sh_body = ""
         run_sh_body += "\n"
         run_sh_body += "# If the run has already been run before, it can be skipped\n"
-        run_sh_body += "if [ -f \"%s/%s/logs_ns3/finished.txt\" ] && " \
-                       "[ $(< \"%s/%s/logs_ns3/finished.txt\") == \"Yes\" ] ; then\n" \
-                       % (
-                           relative_runs_path_from_core_path, run_dir_name,
-                           relative_runs_path_from_core_path, run_dir_name
-                       )
+        run_sh_body += "if " + " && ".join(map(
+            lambda x: "[ -f \"%s/%s/logs_ns3/%s\" ] && [ $(< \"%s/%s/logs_ns3/%s\") == \"Yes\" ]" % (
+                relative_runs_path_from_core_path, run_dir_name, x,
+                relative_runs_path_from_core_path, run_dir_name, x
+            ),
+            finished_filenames
+        )) + " ; then\n"
         run_sh_body += "    exit 0\n"
         run_sh_body += "fi\n"
         run_sh_body += "\n"
         run_sh_body += "# Perform the run\n"
+        if run_dir_name in self.flow_level_preview_run_dir_names:
+            run_sh_body += "cd frameworks/mmfa || exit 1\n"
+            run_sh_body += "python3 flow_level_sim.py ../../%s/%s ../../%s/%s/logs_ns3 || exit 1\n" % (
+                relative_runs_path_from_core_path, run_dir_name,
+                relative_runs_path_from_core_path, run_dir_name
+            )
+            return run_sh_body
         run_sh_body += "cd frameworks/ns-3-bs/ns-3 || exit 1\n"
-        run_sh_body += "./waf --run=\"main-full-pfifo-protocol --run_dir='../../../%s/%s'\" || exit 1\n" % (
-            relative_runs_path_from_core_path, run_dir_name
-        )
+        if distributed_systems_count == 1:
+            run_sh_body += "./waf --run=\"main-full-pfifo-protocol --run_dir='../../../%s/%s'\" || exit 1\n" % (
+                relative_runs_path_from_core_path, run_dir_name
+            )
+        else:
+            run_sh_body += "./waf --run=\"main-full-pfifo-protocol --run_dir='../../../%s/%s'\" " \
+                           "--command-template=\"mpirun -np %d %%s\" || exit 1\n" % (
+                               relative_runs_path_from_core_path, run_dir_name, distributed_systems_count
+                           )
         return run_sh_body
 
+    def get_run_output_filenames_read_by_last_run_dir_generation(self):
+        return self.run_output_filenames_read
+
+    def get_run_dir_output_dir_names(self):
+        return ["logs_ns3"]
+
+    def generate_all_run_data_structures(
+            self,
+            data_structure,
+            list_load_with_lambda_flow_arrival_rate,
+            run_numbers,
+            small_flow_priorities
+    ):
+        all_run_data_structures = []
+        for load_with_lambda_flow_arrival_rate in list_load_with_lambda_flow_arrival_rate:
+            for run_number in run_numbers:
+                for small_flow_priority in small_flow_priorities:
+                    new_data_structure = copy.deepcopy(data_structure)
+                    new_data_structure["load_with_lambda_flow_arrival_rate"] = True, load_with_lambda_flow_arrival_rate
+                    new_data_structure["run_number"] = True, run_number
+                    new_data_structure["small_flow_priority"] = True, small_flow_priority
+
+                    # The refinement only decides which loads are run, as such the runs at the
+                    # coarse loads are the same as without it
+                    new_data_structure.pop("adaptive_load_refinement", None)
+
+                    all_run_data_structures.append(new_data_structure)
+        return all_run_data_structures
+
+    def refine_list_load_with_lambda_flow_arrival_rate(
+            self,
+            runs_path,
+            data_structure,
+            list_load_with_lambda_flow_arrival_rate
+    ):
+        """
+        Refine the (coarse) list of loads in rounds. In each round, if all the runs of the current loads
+        have finished, extra loads are inserted where the mean FCT curve has the highest curvature or
+        between-run variance. As runs are only performed after interpretation, each interpretation
+        adds (at most) one round of loads whose runs have not yet finished. The run outputs it read
+        are recorded, such that the build driver (make.py) interprets again once they have changed.
+
+        :param runs_path:                                   Path to the runs directory
+        :param data_structure:                              Experiment data structure
+        :param list_load_with_lambda_flow_arrival_rate:     Coarse list of (load, lambda) tuples
+
+        :return: Refined sorted list of (load, lambda) tuples
+        """
+        max_num_extra_loads, num_extra_loads_per_round, flow_size_group = \
+            data_structure["adaptive_load_refinement"][1]
+        flow_size_byte = data_structure[flow_size_group + "_flow_size_byte"][1]
+        lambda_step_per_load_percentage = \
+            calculate_lambda_flow_arrival_rate_per_load_percentage_from_data_structure(data_structure)
+        run_numbers = data_structure["run_number"][1]
+        if not isinstance(run_numbers, list):
+            run_numbers = [run_numbers]
+        small_flow_priorities = data_structure["small_flow_priority"][1]
+        if not isinstance(small_flow_priorities, list):
+            small_flow_priorities = [small_flow_priorities]
+
+        refined_list = sorted(list_load_with_lambda_flow_arrival_rate)
+        num_extra_loads = 0
+        while num_extra_loads < max_num_extra_loads:
+
+            # Mean FCT of each finished run, separately for each flow priority setting
+            small_flow_priority_to_load_to_list_value = {}
+            for run_data_structure in self.generate_all_run_data_structures(
+                data_structure, refined_list, run_numbers, small_flow_priorities
+            ):
+                run_hash = sha256(repr(sorted(run_data_structure.items())).encode('utf-8')).hexdigest()
+                logs_ns3_dir = runs_path + "/" + self.root_class_name + "-" + str(run_hash) + "/logs_ns3"
+
+                # The logs of a distributed run are read per system, as the interpretation must not
+                # write into the run outputs (they are only merged by the plotter)
+                if "distributed_systems_count" in run_data_structure:
+                    distributed_systems_count = run_data_structure["distributed_systems_count"][1]
+                    self.run_output_filenames_read.extend(map(
+                        lambda x: logs_ns3_dir + "/system_%d_finished.txt" % x, range(distributed_systems_count)
+                    ))
+                    if not is_basic_sim_distributed_run_finished(logs_ns3_dir, distributed_systems_count):
+                        return refined_list
+                    tcp_flows_filenames = list(map(
+                        lambda x: logs_ns3_dir + "/system_%d_tcp_flows.csv" % x, range(distributed_systems_count)
+                    ))
+                else:
+                    self.run_output_filenames_read.append(logs_ns3_dir + "/finished.txt")
+                    if not os.path.exists(logs_ns3_dir + "/finished.txt"):
+                        return refined_list
+                    with open(logs_ns3_dir + "/finished.txt", "r") as f_in:
+                        if f_in.read().strip() != "Yes":
+                            return refined_list
+                    tcp_flows_filenames = [logs_ns3_dir + "/tcp_flows.csv"]
+                self.run_output_filenames_read.extend(tcp_flows_filenames)
+                mean_fct_ns = calculate_mean_fct_ns_of_flow_size(
+                    tcp_flows_filenames,
+                    flow_size_byte,
+                    run_data_structure["warm_up_ns"][1],
+                    calculate_measurement_end_ns(run_data_structure)
+                )
+                if mean_fct_ns is not None:
+                    small_flow_priority_to_load_to_list_value.setdefault(
+                        run_data_structure["small_flow_priority"][1], {}
+                    ).setdefault(run_data_structure["load_with_lambda_flow_arrival_rate"][1][0], []).append(
+                        mean_fct_ns
+                    )
+
+            # The selected loads of the flow priority settings are taken in turn, highest scoring first
+            num_loads_this_round = min(num_extra_loads_per_round, max_num_extra_loads - num_extra_loads)
+            list_list_selected_load = []
+            for small_flow_priority in sorted(small_flow_priority_to_load_to_list_value.keys()):
+                load_to_list_value = small_flow_priority_to_load_to_list_value[small_flow_priority]
+                list_list_selected_load.append(select_refinement_loads(
+                    sorted(load_to_list_value.keys()), load_to_list_value, num_loads_this_round
+                ))
+            list_new_load = []
+            for i in range(max(map(len, list_list_selected_load), default=0)):
+                for list_selected_load in list_list_selected_load:
+                    if i < len(list_selected_load) and list_selected_load[i] not in list_new_load:
+                        list_new_load.append(list_selected_load[i])
+            list_new_load = list_new_load[:num_loads_this_round]
+            if len(list_new_load) == 0:
+                return refined_list
+
+            for load in list_new_load:
+                refined_list.append((load, round(load * lambda_step_per_load_percentage, 4)))
+            refined_list = sorted(refined_list)
+            num_extra_loads += len(list_new_load)
+
+        return refined_list
+
 
 class LoadLeafSpineRootClassPlotter(RootClassPlotter):
 
@@ -891,6 +1403,9 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
     def get_root_class_name(self):
         return self.root_class_name
 
+    def is_reentrant(self):
+        return True
+
     def plot_for_experiment(
             self,
             exp_instance_name,
@@ -903,6 +1418,16 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
         # Check that all run directories are finished
         for run_dir_path_from_core in list_run_dir_paths_from_core:
             run_dir = path_to_core + "/" + run_dir_path_from_core
+
+            # Distributed runs first have their per-system logs merged
+            with open(run_dir + "/data-structure.txt", "r") as f_in:
+                run_data_structure = ast.literal_eval(f_in.read())
+            if "distributed_systems_count" in run_data_structure:
+                distributed_systems_count = run_data_structure["distributed_systems_count"][1]
+                if not is_basic_sim_distributed_run_finished(run_dir + "/logs_ns3", distributed_systems_count):
+                    raise InvalidRunDirError(exp_instance_name, run_dir, "Not all MPI systems have finished")
+                merge_basic_sim_distributed_logs(run_dir + "/logs_ns3", distributed_systems_count)
+
             if not os.path.exists(run_dir + "/logs_ns3/finished.txt"):
                 raise InvalidRunDirError(exp_instance_name, run_dir, "Run has not been run")
             with open(run_dir + "/logs_ns3/finished.txt", "r") as f_in:
@@ -968,7 +1493,11 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                 continue
 
             elif filename_plot == "lambda-step.txt":
-                gap = list_load_with_lambda_flow_arrival_rates[1][1] - list_load_with_lambda_flow_arrival_rates[0][1]
+                # Smallest step, as the loads are not uniformly spaced if they were refined adaptively
+                gap = min(map(
+                    lambda x: x[1][1] - x[0][1],
+                    zip(list_load_with_lambda_flow_arrival_rates[:-1], list_load_with_lambda_flow_arrival_rates[1:])
+                ))
                 with open(path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot, "w+") as f_out:
                     f_out.write("%.0f" % gap)
                 continue
@@ -978,6 +1507,14 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     f_out.write("%.1f" % (cool_down_ns / 1000000000.0))
                 continue
 
+            elif filename_plot == "mser5-warm-up-s.txt":
+                target_load_to_warm_up_ns = calculate_mser_warm_up_ns_per_load(
+                    list_run_dirs_equal + list_run_dirs_prioritized
+                )
+                with open(path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot, "w+") as f_out:
+                    f_out.write("%.1f" % (max(target_load_to_warm_up_ns.values()) / 1000000000.0))
+                continue
+
             elif filename_plot == "mean-flow-size.txt":
                 flow_size_str = "%g~KB" % (expected_mean_flow_size_byte / 1000.0)
                 if expected_mean_flow_size_byte > 1000000:
@@ -1351,7 +1888,6 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     metric_y_label = "Average FCT (ms)"
 
                 # Perform the plot
-                local_shell = exputil.LocalShell()
                 pdf_filename = "%s/%s/%s" % (
                     path_to_core,
                     experiment_plots_path_from_core,
@@ -1367,25 +1903,24 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     experiment_plots_path_from_core,
                     "data-prioritized/%s_fct_ns_%s.csv" % (flow_size_group, metric)
                 )
-                local_shell.copy_file(
+                plot_gnuplot_template(
                     "%s/experimentex/rootclasses/gnuplot/plot-target-load-vs-fct-metric.plt" % path_to_core,
-                    "temp.plt"
+                    {
+                        "[METRIC]": metric_y_label,
+                        "[TITLE]": title,
+                        "[OUTPUT-FILE]": pdf_filename,
+                        "[DATA-FILE1]": data_filename1,
+                        "[DATA-FILE2]": data_filename2,
+                        "[COLOR-LINE1]": color_line1,
+                        "[COLOR-LINE2]": color_line2,
+                        "[TITLE-LINE1]": title_line1,
+                        "[TITLE-LINE2]": title_line2,
+                        "[KEY-POSITION]": key_position,
+                    }
                 )
-                local_shell.sed_replace_in_file_plain("temp.plt", "[METRIC]", metric_y_label)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE]", title)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE1]", data_filename1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE2]", data_filename2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE1]", color_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE2]", color_line2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE1]", title_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE2]", title_line2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[KEY-POSITION]", key_position)
-                local_shell.perfect_exec("gnuplot temp.plt")
-                local_shell.remove("temp.plt")
 
                 # Crop the final pdf to make it have less whitespace around it
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
@@ -1407,7 +1942,6 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                 metric_y_label = "Fraction completed"
 
                 # Perform the plot
-                local_shell = exputil.LocalShell()
                 pdf_filename = "%s/%s/%s" % (
                     path_to_core,
                     experiment_plots_path_from_core,
@@ -1423,24 +1957,23 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     experiment_plots_path_from_core,
                     "data-prioritized/%s_%s.csv" % (flow_size_group, metric)
                 )
-                local_shell.copy_file(
+                plot_gnuplot_template(
                     "%s/experimentex/rootclasses/gnuplot/plot-target-load-vs-completion-metric.plt" % path_to_core,
-                    "temp.plt"
+                    {
+                        "[METRIC]": metric_y_label,
+                        "[TITLE]": title,
+                        "[OUTPUT-FILE]": pdf_filename,
+                        "[DATA-FILE1]": data_filename1,
+                        "[DATA-FILE2]": data_filename2,
+                        "[COLOR-LINE1]": color_line1,
+                        "[COLOR-LINE2]": color_line2,
+                        "[TITLE-LINE1]": title_line1,
+                        "[TITLE-LINE2]": title_line2,
+                    }
                 )
-                local_shell.sed_replace_in_file_plain("temp.plt", "[METRIC]", metric_y_label)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE]", title)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE1]", data_filename1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE2]", data_filename2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE1]", color_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE2]", color_line2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE1]", title_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE2]", title_line2)
-                local_shell.perfect_exec("gnuplot temp.plt")
-                local_shell.remove("temp.plt")
 
                 # Crop the final pdf to make it have less whitespace around it
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
@@ -1470,7 +2003,6 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     metric_y_label = "0.1th %-tile rate (Mbit/s)"
 
                 # Perform the plot
-                local_shell = exputil.LocalShell()
                 pdf_filename = "%s/%s/%s" % (path_to_core, experiment_plots_path_from_core, filename_plot)
                 data_filename1 = "%s/%s/%s" % (
                     path_to_core,
@@ -1482,25 +2014,24 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     experiment_plots_path_from_core,
                     "data-prioritized/%s_avg_throughput_megabit_per_s_%s.csv" % (flow_size_group, metric)
                 )
-                local_shell.copy_file(
+                plot_gnuplot_template(
                     "%s/experimentex/rootclasses/gnuplot/plot-target-load-vs-throughput-metric.plt" % path_to_core,
-                    "temp.plt"
+                    {
+                        "[METRIC]": metric_y_label,
+                        "[TITLE]": title,
+                        "[OUTPUT-FILE]": pdf_filename,
+                        "[DATA-FILE1]": data_filename1,
+                        "[DATA-FILE2]": data_filename2,
+                        "[COLOR-LINE1]": color_line1,
+                        "[COLOR-LINE2]": color_line2,
+                        "[TITLE-LINE1]": title_line1,
+                        "[TITLE-LINE2]": title_line2,
+                        "[KEY-POSITION]": key_position,
+                    }
                 )
-                local_shell.sed_replace_in_file_plain("temp.plt", "[METRIC]", metric_y_label)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE]", title)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE1]", data_filename1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE2]", data_filename2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE1]", color_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE2]", color_line2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE1]", title_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE2]", title_line2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[KEY-POSITION]", key_position)
-                local_shell.perfect_exec("gnuplot temp.plt")
-                local_shell.remove("temp.plt")
 
                 # Crop the final pdf to make it have less whitespace around it
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
@@ -1516,7 +2047,6 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                 metric = subgroups[1]
 
                 # Perform the plot
-                local_shell = exputil.LocalShell()
                 pdf_filename = "%s/%s/%s" % (path_to_core, experiment_plots_path_from_core, filename_plot)
                 data_filename1 = "%s/%s/%s" % (
                     path_to_core,
@@ -1528,23 +2058,22 @@ class LoadLeafSpineRootClassPlotter(RootClassPlotter):
                     experiment_plots_path_from_core,
                     "data-prioritized/%s_link_utilization_fraction_%s.csv" % (group, metric)
                 )
-                local_shell.copy_file(
+                plot_gnuplot_template(
                     "%s/experimentex/rootclasses/gnuplot/plot-target-load-vs-utilization-fraction-metric.plt"
                     % path_to_core,
-                    "temp.plt"
+                    {
+                        "[OUTPUT-FILE]": pdf_filename,
+                        "[DATA-FILE1]": data_filename1,
+                        "[DATA-FILE2]": data_filename2,
+                        "[COLOR-LINE1]": color_line1,
+                        "[COLOR-LINE2]": color_line2,
+                        "[TITLE-LINE1]": title_line1,
+                        "[TITLE-LINE2]": title_line2,
+                    }
                 )
-                local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE1]", data_filename1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE2]", data_filename2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE1]", color_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[COLOR-LINE2]", color_line2)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE1]", title_line1)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[TITLE-LINE2]", title_line2)
-                local_shell.perfect_exec("gnuplot temp.plt")
-                local_shell.remove("temp.plt")
 
                 # Crop the final pdf to make it have less whitespace around it
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
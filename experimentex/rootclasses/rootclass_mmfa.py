@@ -47,6 +47,10 @@ from .rootclassutility import (
     expand_regex_to_be_tolerant_to_whitespace
 )
 
+# Gnuplot templates
+from .helper.gnuplottemplate import plot_gnuplot_template
+from .helper.pdfcropcache import crop_pdf
+
 
 def parse_number_readable(s):
     if s == "none":
@@ -355,6 +359,9 @@ class MmfaRootClassInterpreter(RootClassInterpreter):
         )
         return run_sh_body
 
+    def get_run_dir_output_dir_names(self):
+        return ["output"]
+
 
 class MmfaRootClassPlotter(RootClassPlotter):
 
@@ -364,6 +371,9 @@ class MmfaRootClassPlotter(RootClassPlotter):
     def get_root_class_name(self):
         return self.root_class_name
 
+    def is_reentrant(self):
+        return True
+
     def plot_for_experiment(
             self,
             exp_instance_name,
@@ -417,7 +427,9 @@ class MmfaRootClassPlotter(RootClassPlotter):
                     search_for = "1-2"
                 elif src_node_id == 0 and dst_node_id == 2:
                     search_for = "0-1-2"
-                with open("%s/%s/output/flow-allocation.txt" % (path_to_core, run_dir), "r") as f_in:
+                with exputil.open_possibly_compressed(
+                        "%s/%s/output/flow-allocation.txt" % (path_to_core, run_dir)
+                ) as f_in:
                     for line in f_in:
                         spl = line.split(",")
                         if spl[1] == search_for:
@@ -459,7 +471,9 @@ class MmfaRootClassPlotter(RootClassPlotter):
                     elif flow_allocation_from_id == 0 and flow_allocation_to_id == 2:
                         search_for = "0-1-2"
                     flow_allocation = -1
-                    with open(path_to_core + "/" + run_dir + "/output/flow-allocation.txt", "r") as f_in:
+                    with exputil.open_possibly_compressed(
+                            path_to_core + "/" + run_dir + "/output/flow-allocation.txt"
+                    ) as f_in:
                         for line in f_in:
                             spl = line.split(",")
                             if spl[1] == search_for:
@@ -483,35 +497,25 @@ class MmfaRootClassPlotter(RootClassPlotter):
                         f_out.write("%.6f,%.6f\n" % (num_flows, flow_allocation))
 
                 # Finally, we actually want to use gnuplot to accomplish the plotting
-                local_shell = exputil.LocalShell()
                 pdf_filename = "%s/%s/%s" % (path_to_core, experiment_plots_path_from_core, filename_plot)
-                local_shell.copy_file(
+                plot_gnuplot_template(
                     "%s/experimentex/rootclasses/gnuplot/num-flows-vs-flow-allocation.plt" % path_to_core,
-                    "temp.plt"
-                )
-                local_shell.sed_replace_in_file_plain(
-                    "temp.plt",
-                    "[X-LABEL]",
-                    "Number of flows %s → %s" % (
-                        convert_node_id_to_letter(num_flows_from_id),
-                        convert_node_id_to_letter(num_flows_to_id)
-                    )
-                )
-                local_shell.sed_replace_in_file_plain(
-                    "temp.plt",
-                    "[Y-LABEL]",
-                    "Alloc. each flow %s → %s" % (
-                        convert_node_id_to_letter(flow_allocation_from_id),
-                        convert_node_id_to_letter(flow_allocation_to_id)
-                    )
+                    {
+                        "[X-LABEL]": "Number of flows %s → %s" % (
+                            convert_node_id_to_letter(num_flows_from_id),
+                            convert_node_id_to_letter(num_flows_to_id)
+                        ),
+                        "[Y-LABEL]": "Alloc. each flow %s → %s" % (
+                            convert_node_id_to_letter(flow_allocation_from_id),
+                            convert_node_id_to_letter(flow_allocation_to_id)
+                        ),
+                        "[OUTPUT-FILE]": pdf_filename,
+                        "[DATA-FILE]": data_filename,
+                    }
                 )
-                local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE]", data_filename)
-                local_shell.perfect_exec("gnuplot temp.plt")
-                local_shell.remove("temp.plt")
 
                 # Crop the final pdf to make it have less whitespace around it
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
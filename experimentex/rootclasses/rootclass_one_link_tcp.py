@@ -65,6 +65,8 @@ from .helper.tcpflowplotter import (
     plot_tcp_flow
 )
 
+from .helper.pdfcropcache import crop_pdf
+
 
 class OneLinkTcpRootClassInterpreter(RootClassInterpreter):
 
@@ -320,6 +322,9 @@ class OneLinkTcpRootClassInterpreter(RootClassInterpreter):
         )
         return run_sh_body
 
+    def get_run_dir_output_dir_names(self):
+        return ["logs_ns3"]
+
 
 def calculate_bdp_pkt(ptop_topology_filename, segment_size_byte):
     properties = PropertiesConfig(ptop_topology_filename)
@@ -354,6 +359,9 @@ class OneLinkTcpRootClassPlotter(RootClassPlotter):
     def get_root_class_name(self):
         return self.root_class_name
 
+    def is_reentrant(self):
+        return True
+
     def plot_for_experiment(
             self,
             exp_instance_name,
@@ -388,9 +396,6 @@ class OneLinkTcpRootClassPlotter(RootClassPlotter):
             run_data_structure["tcp_segment_size_byte"][1]
         )
 
-        # Useful for many operations
-        local_shell = exputil.LocalShell()
-
         # Generate the plots
         for filename_plot in list_expinclude_filenames:
 
@@ -399,19 +404,19 @@ class OneLinkTcpRootClassPlotter(RootClassPlotter):
 
                 # Crop the final pdf to make it have less whitespace around it
                 pdf_filename = path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
             elif filename_plot == "plot_tcp_flow_time_vs_rate_0.pdf":
 
                 # Crop the final pdf to make it have less whitespace around it
                 pdf_filename = path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
             elif filename_plot == "plot_tcp_flow_time_vs_rtt_0.pdf":
 
                 # Crop the final pdf to make it have less whitespace around it
                 pdf_filename = path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
             elif filename_plot == "bdp-pkt.txt":
                 bdp_pkt = calculate_bdp_pkt(
@@ -451,19 +456,31 @@ class OneLinkTcpRootClassPlotter(RootClassPlotter):
                     f_out.write("%d packet%s" % (total_pkt, "" if total_pkt == 1 else "s"))
 
             elif filename_plot == "average-rate-Mbps.txt":
-                with open(path_to_core + "/" + run_dir_path_from_core + "/logs_ns3/tcp_flows.csv", "r") as f_in:
+                with exputil.open_possibly_compressed(
+                        path_to_core + "/" + run_dir_path_from_core + "/logs_ns3/tcp_flows.csv"
+                ) as f_in:
                     in_split = f_in.read().split(",")
                     rate_megabit_per_s = float(in_split[7]) / float(in_split[6]) * 8000.0
                 with open(path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot, "w+") as f_out:
                     f_out.write("%.2f" % rate_megabit_per_s)
 
             elif filename_plot == "average-rtt-ms.txt":
-                entries = []
-                with open(path_to_core + "/" + run_dir_path_from_core + "/logs_ns3/tcp_flow_0_rtt.csv", "r") as f_in:
-                    for line in f_in:
-                        entries.append(float(line.split(",")[2]))
+                # The RTT log can be long, as such the average is folded in batch-by-batch
+                sum_rtt_ns = 0.0
+                num_entries = 0
+                for rtt_columns in exputil.iterate_csv_in_column_batches(
+                        path_to_core + "/" + run_dir_path_from_core + "/logs_ns3/tcp_flow_0_rtt.csv",
+                        "pos_int,pos_int,pos_float",
+                        engine="numpy"
+                ):
+                    sum_rtt_ns += float(np.sum(rtt_columns[2]))
+                    num_entries += len(rtt_columns[2])
+                if num_entries == 0:
+                    raise PlotExpincludeError(
+                        exp_instance_name, filename_plot, "RTT log of TCP flow 0 does not have any entries"
+                    )
                 with open(path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot, "w+") as f_out:
-                    f_out.write("%.2f" % (np.average(entries) / 1000000.0))
+                    f_out.write("%.2f" % (sum_rtt_ns / num_entries / 1000000.0))
 
             else:
                 raise PlotExpincludeError(exp_instance_name, filename_plot, "Unknown plot filename")
@@ -34,6 +34,10 @@ from .rootclassplotter import (
     PlotExpincludeError
 )
 
+# Gnuplot templates
+from .helper.gnuplottemplate import plot_gnuplot_template
+from .helper.pdfcropcache import crop_pdf
+
 
 class TopListsRootClassInterpreter(RootClassInterpreter):
 
@@ -65,6 +69,12 @@ class TopListsRootClassPlotter(RootClassPlotter):
     def get_root_class_name(self):
         return self.root_class_name
 
+    def is_reentrant(self):
+        return True
+
+    def can_split_expinclude_filenames(self):
+        return True
+
     def plot_for_experiment(
             self,
             exp_instance_name,
@@ -89,7 +99,7 @@ class TopListsRootClassPlotter(RootClassPlotter):
 
                 # Crop the final pdf to make it have less whitespace around it
                 pdf_filename = path_to_core + "/" + experiment_plots_path_from_core + "/" + filename_plot
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
@@ -121,30 +131,24 @@ class TopListsRootClassPlotter(RootClassPlotter):
                 data_filename_umbrella_joint = data_dir + "/umbrella_joint_rank_against_" + statistic + ".csv"
 
                 # Gnuplot
-                local_shell = exputil.LocalShell()
                 pdf_filename = (
                         path_to_core + "/" + experiment_plots_path_from_core
                         + "/" + filename_plot
                 )
-                local_shell.copy_file(
+                plot_gnuplot_template(
                     path_to_core + "/experimentex/rootclasses/gnuplot/plot-rank-against-daily-change-statistic.plt",
-                    "temp.plt"
-                )
-                local_shell.sed_replace_in_file_plain("temp.plt", "[STATISTIC-Y-LABEL]", statistic_y_label)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[OUTPUT-FILE]", pdf_filename)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE-ALEXA-OLD]", data_filename_alexa_old)
-                local_shell.sed_replace_in_file_plain("temp.plt", "[DATA-FILE-ALEXA-NEW]", data_filename_alexa_new)
-                local_shell.sed_replace_in_file_plain(
-                    "temp.plt", "[DATA-FILE-MAJESTIC-JOINT]", data_filename_majestic_joint
-                )
-                local_shell.sed_replace_in_file_plain(
-                    "temp.plt", "[DATA-FILE-UMBRELLA-JOINT]", data_filename_umbrella_joint
+                    {
+                        "[STATISTIC-Y-LABEL]": statistic_y_label,
+                        "[OUTPUT-FILE]": pdf_filename,
+                        "[DATA-FILE-ALEXA-OLD]": data_filename_alexa_old,
+                        "[DATA-FILE-ALEXA-NEW]": data_filename_alexa_new,
+                        "[DATA-FILE-MAJESTIC-JOINT]": data_filename_majestic_joint,
+                        "[DATA-FILE-UMBRELLA-JOINT]": data_filename_umbrella_joint,
+                    }
                 )
-                local_shell.perfect_exec("gnuplot temp.plt")
-                local_shell.remove("temp.plt")
 
                 # Crop the final pdf to make it have less whitespace around it
-                local_shell.perfect_exec("pdfcrop " + pdf_filename + " " + pdf_filename)
+                crop_pdf(path_to_core, pdf_filename)
 
                 continue
 
@@ -176,7 +180,8 @@ class TopListsRootClassPlotter(RootClassPlotter):
                 columns = exputil.read_csv_direct_in_columns(
                     "%s/frameworks/top-lists/data/%s_rank_against_%s.csv"
                     % (path_to_core, top_list_id_name, statistic),
-                    "pos_int,pos_float"
+                    "pos_int,pos_float",
+                    storage="array"
                 )
                 rank_list = columns[0]
                 metric_value_list = columns[1]
@@ -110,3 +110,27 @@ class RootClassInterpreter(ABC):
         :return: run.sh body
         """
         pass
+
+    def get_run_output_filenames_read_by_last_run_dir_generation(self):
+        """
+        Run output files which the last call of generate_run_dirs_for_experiment_data_structure() read
+        (or checked the existence of), e.g., to decide which runs to generate based on the results of
+        earlier runs. If any of them is created, changed or removed, the build driver interprets again.
+        It is optional to override this: by default there are none, which means the run directories
+        only depend on the experiment data structure.
+
+        :return: List of filenames (e.g., [ "../temp/runs/<run-dir-name>/logs_ns3/finished.txt" ])
+        """
+        return []
+
+    def get_run_dir_output_dir_names(self):
+        """
+        Names of the directories within a run directory which are produced by executing its run.sh.
+        Everything else in the run directory is considered input generated by the interpreter.
+        If the inputs of an already executed run change, the build driver removes these directories
+        such that the run is executed again. It is optional to override this: by default there are
+        none, which means a run is never executed again after it has finished once.
+
+        :return: List of directory names (e.g., [ "logs_ns3" ])
+        """
+        return []
@@ -87,3 +87,24 @@ class RootClassPlotter(ABC):
 
         """
         pass
+
+    def is_reentrant(self):
+        """
+        Whether plot_for_experiment can be called concurrently (each in a separate process) for different
+        experiment instances. This requires that it only writes in the experiment plots directory, in
+        the scratch directory (tempfile.gettempdir(), which is separate for each call), or atomically
+        elsewhere (e.g., experiment instances can share run directories).
+
+        :return: True iff it is reentrant (default: False, as such its calls are made one after the other)
+        """
+        return False
+
+    def can_split_expinclude_filenames(self):
+        """
+        Whether the expinclude files of a single experiment instance can be plotted by separate (concurrent)
+        calls of plot_for_experiment, which is worthwhile if there is no common work done for all of them.
+        Only applies if it is reentrant.
+
+        :return: True iff each expinclude file can be plotted by a separate call (default: False)
+        """
+        return False
@@ -0,0 +1,235 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import ast
+import subprocess
+
+from parser import parse
+from selection import (
+    select_expincludes_matching_only_patterns,
+    parse_only_patterns_from_args,
+    retrieve_experiment_instance_name_to_root_class_name
+)
+from streaming import StreamingPlotWorker
+
+
+def read_experiment_instance_name_to_run_dir_names(runs_path):
+
+    # Make sure that the experiment instances mapping to run directory names exist
+    instance_run_dir_names_mapping_filename = runs_path + "/experiment_instances_to_run_dir_names.txt"
+    if not os.path.exists(instance_run_dir_names_mapping_filename):
+        raise ValueError(
+            "Instance-to-run-dir-names mapping file does not exist: %s\n"
+            "Did you run the interpreter beforehand?" % instance_run_dir_names_mapping_filename
+        )
+    with open(instance_run_dir_names_mapping_filename, "r") as f_in:
+        return ast.literal_eval(f_in.read())
+
+
+def retrieve_run_dir_names_to_run(runs_path, selected_instance_names):
+    """
+    Retrieve the names of the run directories which must be run, grouped by experiment instance
+    (in sorted order of instance name) such that instances finish as early as possible.
+
+    :param runs_path: Path to the runs directory
+    :param selected_instance_names: Set of selected experiment instance names (None means all run directories)
+
+    :return: List of run directory names
+    """
+
+    # All run directories
+    if selected_instance_names is None and not os.path.exists(
+            runs_path + "/experiment_instances_to_run_dir_names.txt"
+    ):
+        return list(sorted(filter(lambda x: os.path.isdir(runs_path + "/" + x), os.listdir(runs_path))))
+    experiment_instance_name_to_run_dir_names = read_experiment_instance_name_to_run_dir_names(runs_path)
+
+    # The run directories the selected instances need (each only once)
+    run_dir_names = []
+    for instance_name in sorted(
+            experiment_instance_name_to_run_dir_names.keys() if selected_instance_names is None
+            else selected_instance_names
+    ):
+        if instance_name not in experiment_instance_name_to_run_dir_names:
+            raise ValueError(
+                "Experiment instance %s does not have any run directories.\n"
+                "Did you run the interpreter beforehand?" % instance_name
+            )
+        for run_dir_name in experiment_instance_name_to_run_dir_names[instance_name]:
+            if run_dir_name not in run_dir_names:
+                run_dir_names.append(run_dir_name)
+
+    # Without selection, also any other run directory
+    if selected_instance_names is None:
+        for run_dir_name in sorted(os.listdir(runs_path)):
+            if os.path.isdir(runs_path + "/" + run_dir_name) and run_dir_name not in run_dir_names:
+                run_dir_names.append(run_dir_name)
+
+    return run_dir_names
+
+
+def raise_if_plot_failed(results):
+    for instance_name, error in results:
+        if error is not None:
+            raise ValueError("Plotting of experiment instance %s failed:\n%s" % (instance_name, error))
+        print("Plotted: " + instance_name)
+
+
+def run(selected_instance_names=None, instance_name_to_plot_job=None):
+    """
+    Execute the runs.
+
+    :param selected_instance_names:    Set of selected experiment instance names (None means all run directories)
+    :param instance_name_to_plot_job:  If not None, the plots of each experiment instance in this mapping are
+                                       made as soon as its runs are finished while other runs continue.
+                                       Maps instance name to (root class name, unique expinclude filenames).
+    """
+
+    print("EXECUTE RUNS")
+
+    # Runs directory
+    runs_path = "../temp/runs"
+
+    # Determine which run directories to run
+    run_dir_names = retrieve_run_dir_names_to_run(runs_path, selected_instance_names)
+    print("  > Number of run directories to run: " + str(len(run_dir_names)))
+
+    # Streaming plots: keep track of the runs each instance is still waiting on
+    plot_worker = None
+    instance_name_to_remaining_run_dir_names = {}
+    instance_name_to_run_dir_names = {}
+    if instance_name_to_plot_job is not None:
+        experiment_instance_name_to_run_dir_names = read_experiment_instance_name_to_run_dir_names(runs_path)
+        for instance_name in instance_name_to_plot_job.keys():
+            if instance_name not in experiment_instance_name_to_run_dir_names:
+                raise ValueError(
+                    "Experiment instance %s does not have any run directories.\n"
+                    "Did you run the interpreter beforehand?" % instance_name
+                )
+            instance_name_to_run_dir_names[instance_name] = experiment_instance_name_to_run_dir_names[instance_name]
+            instance_name_to_remaining_run_dir_names[instance_name] = set(
+                experiment_instance_name_to_run_dir_names[instance_name]
+            )
+        print("  > Plotting each experiment instance as soon as its runs are finished")
+        plot_worker = StreamingPlotWorker()
+
+    try:
+
+        # Execute each run.sh, which exits immediately if it has already been run before
+        for i in range(len(run_dir_names) + 1):
+
+            # Submit the plotting of any instance which no longer waits on any run
+            if plot_worker is not None:
+                for instance_name in sorted(instance_name_to_remaining_run_dir_names.keys()):
+                    if len(instance_name_to_remaining_run_dir_names[instance_name]) == 0:
+                        del instance_name_to_remaining_run_dir_names[instance_name]
+                        root_class_name, list_unique_expinclude_filename = instance_name_to_plot_job[instance_name]
+                        plot_worker.submit(
+                            root_class_name,
+                            instance_name,
+                            instance_name_to_run_dir_names[instance_name],
+                            list_unique_expinclude_filename
+                        )
+                raise_if_plot_failed(plot_worker.retrieve_finished())
+
+            # Perform the next run
+            if i == len(run_dir_names):
+                break
+            run_dir_name = run_dir_names[i]
+            run_dir = runs_path + "/" + run_dir_name
+            if not os.path.isfile(run_dir + "/run.sh"):
+                raise ValueError("Directory in temp/runs does not have a run.sh: %s" % run_dir_name)
+            print("Running: " + run_dir_name)
+            if subprocess.call(["bash", "run.sh"], cwd=run_dir) != 0:
+                raise ValueError("Run failed: %s" % run_dir_name)
+            for remaining_run_dir_names in instance_name_to_remaining_run_dir_names.values():
+                remaining_run_dir_names.discard(run_dir_name)
+
+        # Wait for the last plots
+        if plot_worker is not None:
+            raise_if_plot_failed(plot_worker.finish())
+            plot_worker = None
+
+    finally:
+        if plot_worker is not None:
+            plot_worker.terminate()
+
+    print("")
+
+
+def print_usage():
+    print("Failed: if --only or --stream-plots is given, you must supply one or more TeX files as arguments")
+    print("")
+    print("Usage: python3 run.py [--stream-plots] [--only <glob>] [.tex file] [.tex file] ...")
+    print("")
+    print("Optional arguments:")
+    print("   --stream-plots     Plots the expinclude files of each experiment instance as soon as all its runs")
+    print("                      are finished, while the other runs continue")
+    print("   --only <glob>      Only executes the run directories needed by the experiment instances whose name,")
+    print("                      or any of whose expinclude filenames, matches the glob pattern (can be repeated)")
+    print("")
+
+
+def main():
+    args, only_patterns = parse_only_patterns_from_args(sys.argv[1:])
+
+    # Optional argument
+    stream_plots = len(args) >= 1 and args[0] == "--stream-plots"
+    if stream_plots:
+        args = args[1:]
+
+    # Without a selection or streaming all run directories are run
+    if len(only_patterns) == 0 and not stream_plots:
+        run()
+
+    # A selection or streaming requires the TeX files
+    elif len(args) < 1:
+        print_usage()
+        exit(1)
+
+    else:
+        print("")
+        name_to_child_names, _, name_to_list_expinclude_filename = parse(args)
+        instance_name_to_selected_expinclude_filenames = select_expincludes_matching_only_patterns(
+            name_to_child_names, name_to_list_expinclude_filename, only_patterns
+        )
+        instance_name_to_plot_job = None
+        if stream_plots:
+            instance_name_to_root_class_name = retrieve_experiment_instance_name_to_root_class_name(
+                name_to_child_names
+            )
+            instance_name_to_plot_job = {}
+            for instance_name, list_unique_expinclude_filename in instance_name_to_selected_expinclude_filenames.items():
+                instance_name_to_plot_job[instance_name] = (
+                    instance_name_to_root_class_name[instance_name],
+                    list_unique_expinclude_filename
+                )
+        run(
+            None if len(only_patterns) == 0 else set(instance_name_to_selected_expinclude_filenames.keys()),
+            instance_name_to_plot_job
+        )
+
+
+if __name__ == "__main__":
+    main()
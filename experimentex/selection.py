@@ -0,0 +1,123 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import fnmatch
+
+from rootclasses.rootclasses import retrieve_root_class_names_list
+
+
+def retrieve_experiment_instance_name_to_root_class_name(name_to_child_names):
+    """
+    Retrieve the root class of each experiment instance. The experiment instances are
+    all descendants of the root classes which do not have any children themselves.
+
+    :param name_to_child_names: Mapping of name to list of child names (as produced by the parser)
+
+    :return: Mapping of experiment instance name to root class name
+    """
+    experiment_instance_name_to_root_class_name = {}
+    for root_class_name in retrieve_root_class_names_list():
+        to_visit = list(name_to_child_names[root_class_name])
+        while len(to_visit) != 0:
+            child_name = to_visit.pop(0)
+            if len(name_to_child_names[child_name]) == 0:
+                experiment_instance_name_to_root_class_name[child_name] = root_class_name
+            else:
+                for v in name_to_child_names[child_name]:
+                    to_visit.insert(0, v)
+    return experiment_instance_name_to_root_class_name
+
+
+def retrieve_experiment_instance_names(name_to_child_names):
+    """
+    Retrieve the names of all experiment instances.
+
+    :param name_to_child_names: Mapping of name to list of child names (as produced by the parser)
+
+    :return: List of experiment instance names
+    """
+    return list(retrieve_experiment_instance_name_to_root_class_name(name_to_child_names).keys())
+
+
+def select_expincludes_matching_only_patterns(name_to_child_names, name_to_list_expinclude_filename, only_patterns):
+    """
+    Select the experiment instances and their expinclude filenames which match
+    any of the --only glob patterns. A pattern matches an experiment instance
+    name (which selects all its expinclude filenames), an expinclude filename,
+    or the combination <instance name>/<expinclude filename>.
+
+    :param name_to_child_names: Mapping of name to list of child names (as produced by the parser)
+    :param name_to_list_expinclude_filename: Mapping of name to list of expinclude filenames (as produced by the parser)
+    :param only_patterns: List of glob patterns (if empty, everything is selected)
+
+    :return: Mapping of each selected experiment instance name to its sorted list of unique selected
+             expinclude filenames
+    """
+    selected = {}
+    for instance_name in retrieve_experiment_instance_names(name_to_child_names):
+        list_unique_expinclude_filename = list(sorted(set(name_to_list_expinclude_filename[instance_name])))
+
+        # No patterns means everything
+        if len(only_patterns) == 0:
+            selected[instance_name] = list_unique_expinclude_filename
+            continue
+
+        # Matching the instance name selects the entire instance
+        if any(fnmatch.fnmatchcase(instance_name, p) for p in only_patterns):
+            selected[instance_name] = list_unique_expinclude_filename
+            continue
+
+        # Otherwise only the expinclude files which match
+        matching_expinclude_filenames = []
+        for expinclude_filename in list_unique_expinclude_filename:
+            for p in only_patterns:
+                if fnmatch.fnmatchcase(expinclude_filename, p) \
+                        or fnmatch.fnmatchcase(instance_name + "/" + expinclude_filename, p):
+                    matching_expinclude_filenames.append(expinclude_filename)
+                    break
+        if len(matching_expinclude_filenames) > 0:
+            selected[instance_name] = matching_expinclude_filenames
+
+    return selected
+
+
+def parse_only_patterns_from_args(args):
+    """
+    Remove all "--only <glob>" pairs from the arguments.
+
+    :param args: List of command-line arguments
+
+    :return: (list of remaining arguments, list of glob patterns)
+    """
+    remaining_args = []
+    only_patterns = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--only":
+            if i + 1 >= len(args):
+                raise ValueError("Argument --only must be followed by a glob pattern")
+            only_patterns.append(args[i + 1])
+            i += 2
+        else:
+            remaining_args.append(args[i])
+            i += 1
+    return remaining_args, only_patterns
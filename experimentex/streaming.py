@@ -0,0 +1,109 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import multiprocessing
+import queue
+import traceback
+
+from plot import plot_experiment_instance
+
+
+def plot_worker_main(job_queue, result_queue):
+    """
+    Main loop of the plot worker process: plot each submitted experiment instance until the sentinel (None).
+
+    :param job_queue:     Queue of (root class name, instance name, run dir names, unique expinclude filenames)
+    :param result_queue:  Queue to which (instance name, error traceback or None) is put after each job
+    """
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        root_class_name, exp_instance_name, run_dir_names, list_unique_expinclude_filename = job
+        try:
+            plot_experiment_instance(root_class_name, exp_instance_name, run_dir_names, list_unique_expinclude_filename)
+            result_queue.put((exp_instance_name, None))
+        except Exception:
+            result_queue.put((exp_instance_name, traceback.format_exc()))
+
+
+class StreamingPlotWorker:
+    """
+    A single separate process which plots the expinclude files of experiment instances as they are submitted,
+    such that an experiment instance can be plotted as soon as all its runs are finished while the other runs
+    continue. A single process is used, as the cores are still occupied by the runs (plot.py instead uses a pool
+    of worker processes for the plotters which are reentrant).
+    """
+
+    def __init__(self):
+        self.job_queue = multiprocessing.Queue()
+        self.result_queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=plot_worker_main, args=(self.job_queue, self.result_queue))
+        self.process.start()
+        self.num_pending = 0
+
+    def submit(self, root_class_name, exp_instance_name, run_dir_names, list_unique_expinclude_filename):
+        self.job_queue.put((root_class_name, exp_instance_name, run_dir_names, list_unique_expinclude_filename))
+        self.num_pending += 1
+
+    def _retrieve_result(self, block):
+        while True:
+            try:
+                result = self.result_queue.get(block=block, timeout=1.0 if block else None)
+                self.num_pending -= 1
+                return result
+            except queue.Empty:
+                if not block:
+                    return None
+                if not self.process.is_alive():
+                    raise ValueError("Plot worker process exited unexpectedly (exit code: %s)" % self.process.exitcode)
+
+    def retrieve_finished(self):
+        """
+        Retrieve the results of the jobs which have finished so far, without waiting.
+
+        :return: List of (instance name, error traceback or None)
+        """
+        results = []
+        while self.num_pending > 0:
+            result = self._retrieve_result(False)
+            if result is None:
+                break
+            results.append(result)
+        return results
+
+    def finish(self):
+        """
+        Wait for all submitted jobs to finish, and stop the worker process.
+
+        :return: List of (instance name, error traceback or None) of the jobs which had not yet been retrieved
+        """
+        results = []
+        while self.num_pending > 0:
+            results.append(self._retrieve_result(True))
+        self.job_queue.put(None)
+        self.process.join()
+        return results
+
+    def terminate(self):
+        self.process.terminate()
+        self.process.join()
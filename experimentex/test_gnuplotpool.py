@@ -0,0 +1,53 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import shutil
+import tempfile
+
+import exputil
+from rootclasses.helper.gnuplotpool import GnuplotWorkerPool
+
+
+@unittest.skipUnless(shutil.which("gnuplot") is not None, "gnuplot is not installed")
+class TestGnuplotPool(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pool = GnuplotWorkerPool(max_num_workers=1)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_output(self):
+        self.assertEqual(self.pool.execute("print 1 + 2", self.temp_dir).strip(), "3")
+
+    def test_error_raises(self):
+        with self.assertRaises(exputil.FailedCommandError):
+            self.pool.execute("plot nonexistent_function(x)", self.temp_dir)
+
+        # The worker continues with the next script, of which the error state has been reset
+        self.assertEqual(self.pool.execute("print 4 + 5", self.temp_dir).strip(), "9")
+        with self.assertRaises(exputil.FailedCommandError):
+            self.pool.execute("set terminal nonexistent_terminal", self.temp_dir)
+        self.assertEqual(self.pool.execute("print 6 + 7", self.temp_dir).strip(), "13")
@@ -0,0 +1,145 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import os
+import ast
+import shutil
+import tempfile
+
+from parser import parse
+from interpret import interpret
+from dependencies import BuildState
+from make import calculate_interpret_fingerprint
+
+ADAPTIVE_TEX = r"""
+\expinstance{load-ls-adaptive}{load-ls}
+\expline{load-ls-adaptive}{There are 2 spines and 3 leaves.}
+\expline{load-ls-adaptive}{Each leaf (ToR) has 3 servers underneath.}
+\expline{load-ls-adaptive}{Every link has the following properties: the channel has a delay of 20~$\mu s$, and its
+network devices have a data rate of 100~Mbit/s, 0.001\% random packet loss, and a FIFO queue of 5 packets.}
+\expline{load-ls-adaptive}{We set pfifo\_fast as the queueing discipline with a maximum total queue size of 200 packets.}
+\expline{load-ls-adaptive}{We set TCP Cubic as the congestion control protocol.}
+\expline[init-cwnd-pkt]{load-ls-adaptive}{10}
+\expline[segment-size]{load-ls-adaptive}{1380~byte}
+\expline[opt-timestamp]{load-ls-adaptive}{enabled}
+\expline[opt-sack]{load-ls-adaptive}{enabled}
+\expline[opt-win-scaling]{load-ls-adaptive}{enabled}
+\expline[no-delay]{load-ls-adaptive}{enabled}
+\expline[opt-pacing]{load-ls-adaptive}{disabled}
+\expline{load-ls-adaptive}{delayed acknowledgements are disabled}
+\expline[max-seg-lifetime]{load-ls-adaptive}{1~s}
+\expline[min-rto]{load-ls-adaptive}{200~ms}
+\expline[initial-rtt-estimate]{load-ls-adaptive}{400~ms}
+\expline[connection-timeout]{load-ls-adaptive}{400~ms}
+\expline[persist-timeout]{load-ls-adaptive}{800~ms}
+\expline{load-ls-adaptive}{The send and receive buffer size are set to 1~GB}
+\expline{load-ls-adaptive}{The flow size is randomly chosen to be either small (50~KB) with 90\% probability,
+or large (4~MB) with 10\% probability.}
+\expline{load-ls-adaptive}{We vary the target load from 10\% till 50\% in increments of 20\%.}
+\expline{load-ls-adaptive}{Only the flows which start in the measurement period are included in the result: the
+flows which started in the warm-up period of the first 1~seconds and the cool-down period of the last 1~seconds are
+not taken into account.}
+\expline{load-ls-adaptive}{The experiment is configured such that in expectation 50 flows start in the
+measurement period.}
+\expline{load-ls-adaptive}{Each load point is run for 2 times, with a reproducible initial random seed based on the
+(SHA-256) hash of its unique run configuration.}
+\expline{load-ls-adaptive}{The load points are refined adaptively by inserting at most 2 extra load points, 1 per
+round, where the mean FCT of the small flows has the highest curvature or between-run variance.}
+"""
+
+
+def fake_finished_runs(runs_path, run_dir_names):
+    """
+    Write the outputs of a finished run for each run directory which does not yet have them,
+    with as flow completion time of each flow a convex function of the load.
+    """
+    for run_dir_name in run_dir_names:
+        run_dir = runs_path + "/" + run_dir_name
+        if os.path.exists(run_dir + "/logs_ns3"):
+            continue
+        with open(run_dir + "/data-structure.txt", "r") as f_in:
+            load = ast.literal_eval(f_in.read())["load_with_lambda_flow_arrival_rate"][1][0]
+        fct_ns = 1000000 + 1000 * load * load
+        os.makedirs(run_dir + "/logs_ns3")
+        with open(run_dir + "/tcp_flow_schedule.csv", "r") as f_in, \
+                open(run_dir + "/logs_ns3/tcp_flows.csv", "w+") as f_out:
+            for line in f_in:
+                spl = line.strip().split(",")
+                start_time_ns = int(spl[4])
+                f_out.write("%s,%s,%s,%s,%d,%d,%d,%s,YES,\n" % (
+                    spl[0], spl[1], spl[2], spl[3], start_time_ns, start_time_ns + fct_ns, fct_ns, spl[3]
+                ))
+        with open(run_dir + "/logs_ns3/finished.txt", "w+") as f_out:
+            f_out.write("Yes")
+
+
+class TestMake(unittest.TestCase):
+
+    def setUp(self):
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(self.temp_dir + "/experimentex")
+        os.chdir(self.temp_dir + "/experimentex")
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def read_run_dir_names(self, runs_path):
+        with open(runs_path + "/experiment_instances_to_run_dir_names.txt", "r") as f_in:
+            return ast.literal_eval(f_in.read())["load-ls-adaptive"]
+
+    def test_interpret_refines_loads_in_rounds(self):
+        with open("../adaptive.tex", "w+") as f_out:
+            f_out.write(ADAPTIVE_TEX)
+        name_to_child_names, name_to_list_identifier_with_expline, _ = parse(["../adaptive.tex"])
+        state = BuildState("../temp/make-state.txt")
+        runs_path = "../temp/runs"
+
+        # Each round the runs of the current loads finish, after which the interpretation is stale
+        # and inserts the next load
+        for expected_num_loads in [3, 4]:
+            interpret(name_to_child_names, name_to_list_identifier_with_expline, False, False)
+            fingerprint = calculate_interpret_fingerprint(state, ["../adaptive.tex"])
+            run_dir_names = self.read_run_dir_names(runs_path)
+            self.assertEqual(len(run_dir_names), expected_num_loads * 4)  # 2 runs and 2 priorities per load
+            fake_finished_runs(runs_path, run_dir_names)
+            self.assertNotEqual(fingerprint, calculate_interpret_fingerprint(state, ["../adaptive.tex"]))
+
+        # Once the maximum of 2 extra loads is reached, the runs of the last load are not read
+        interpret(name_to_child_names, name_to_list_identifier_with_expline, False, False)
+        fingerprint = calculate_interpret_fingerprint(state, ["../adaptive.tex"])
+        run_dir_names = self.read_run_dir_names(runs_path)
+        self.assertEqual(len(run_dir_names), 5 * 4)
+        fake_finished_runs(runs_path, run_dir_names)
+        self.assertEqual(fingerprint, calculate_interpret_fingerprint(state, ["../adaptive.tex"]))
+        interpret(name_to_child_names, name_to_list_identifier_with_expline, False, False)
+        self.assertEqual(run_dir_names, self.read_run_dir_names(runs_path))
+
+        # The interpretation did not write into the run outputs
+        for run_dir_name in os.listdir(runs_path):
+            if os.path.isdir(runs_path + "/" + run_dir_name):
+                self.assertEqual(
+                    sorted(os.listdir(runs_path + "/" + run_dir_name + "/logs_ns3")),
+                    ["finished.txt", "tcp_flows.csv"]
+                )
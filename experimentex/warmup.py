@@ -0,0 +1,135 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import ast
+
+from parser import parse
+from selection import (
+    select_expincludes_matching_only_patterns,
+    parse_only_patterns_from_args,
+    retrieve_experiment_instance_name_to_root_class_name
+)
+from rootclasses.helper.bswarmup import calculate_mser_warm_up_ns_per_load
+from rootclasses.helper.bsdistributed import is_basic_sim_distributed_run_finished
+
+
+def recommend_warm_up(selected_instance_names, instance_name_to_root_class_name, batch_size):
+
+    print("RECOMMEND LOAD-LS WARM-UP (MSER-%d)" % batch_size)
+
+    # Runs directory
+    runs_path = "../temp/runs"
+
+    # Read the run directory names for each instance
+    instance_run_dir_names_mapping_filename = runs_path + "/experiment_instances_to_run_dir_names.txt"
+    if not os.path.exists(instance_run_dir_names_mapping_filename):
+        raise ValueError(
+            "Instance-to-run-dir-names mapping file does not exist: %s\n"
+            "Did you run the interpreter beforehand?" % instance_run_dir_names_mapping_filename
+        )
+    with open(instance_run_dir_names_mapping_filename, "r") as f_in:
+        experiment_instance_name_to_run_dir_names = ast.literal_eval(f_in.read())
+
+    for instance_name in sorted(selected_instance_names):
+        if instance_name_to_root_class_name[instance_name] != "load-ls":
+            continue
+        print("  > Experiment instance " + instance_name)
+
+        # Only the finished runs serve as pilot runs
+        list_run_dir = []
+        configured_warm_up_ns = None
+        for run_dir_name in experiment_instance_name_to_run_dir_names.get(instance_name, []):
+            run_dir = runs_path + "/" + run_dir_name
+            with open(run_dir + "/data-structure.txt", "r") as f_in:
+                run_data_structure = ast.literal_eval(f_in.read())
+            configured_warm_up_ns = run_data_structure["warm_up_ns"][1]
+            if "distributed_systems_count" in run_data_structure:
+                if is_basic_sim_distributed_run_finished(
+                        run_dir + "/logs_ns3", run_data_structure["distributed_systems_count"][1]
+                ):
+                    list_run_dir.append(run_dir)
+            elif os.path.exists(run_dir + "/logs_ns3/finished.txt"):
+                with open(run_dir + "/logs_ns3/finished.txt", "r") as f_in:
+                    if f_in.read().strip() == "Yes":
+                        list_run_dir.append(run_dir)
+        if len(list_run_dir) == 0:
+            print("    >> No finished (pilot) runs yet")
+            continue
+
+        # Recommendation per target load
+        target_load_to_warm_up_ns = calculate_mser_warm_up_ns_per_load(list_run_dir, batch_size)
+        print("    >> Pilot runs................ " + str(len(list_run_dir)))
+        for target_load in sorted(target_load_to_warm_up_ns.keys()):
+            print("    >> Warm-up at %3s%% load...... %.3f s" % (
+                str(target_load), target_load_to_warm_up_ns[target_load] / 1000000000.0
+            ))
+        recommended_warm_up_ns = max(target_load_to_warm_up_ns.values())
+        print("    >> Recommended warm-up....... %.3f s (configured: %.3f s)" % (
+            recommended_warm_up_ns / 1000000000.0, configured_warm_up_ns / 1000000000.0
+        ))
+
+    print("")
+
+
+def print_usage():
+    print("Failed: you must supply one or more TeX files as arguments")
+    print("")
+    print("Usage: python3 warmup.py [--batch-size <m>] [--only <glob>] [.tex file] [.tex file] ...")
+    print("")
+    print("Recommends for each load-ls experiment instance the minimal warm-up period, by applying")
+    print("the MSER-m steady-state detector to the link utilization and FCT series of its finished runs.")
+    print("")
+    print("Optional arguments:")
+    print("   --batch-size <m>   Batch size m of MSER-m (default: 5)")
+    print("   --only <glob>      Only for the experiment instances whose name matches the glob pattern")
+    print("")
+
+
+def main():
+    args, only_patterns = parse_only_patterns_from_args(sys.argv[1:])
+
+    # Optional argument
+    batch_size = 5
+    if len(args) >= 2 and args[0] == "--batch-size":
+        batch_size = int(args[1])
+        args = args[2:]
+
+    # Must have one or more arguments
+    if len(args) < 1:
+        print_usage()
+        exit(1)
+
+    print("")
+    name_to_child_names, _, name_to_list_expinclude_filename = parse(args)
+    recommend_warm_up(
+        select_expincludes_matching_only_patterns(
+            name_to_child_names, name_to_list_expinclude_filename, only_patterns
+        ).keys(),
+        retrieve_experiment_instance_name_to_root_class_name(name_to_child_names),
+        batch_size
+    )
+
+
+if __name__ == "__main__":
+    main()
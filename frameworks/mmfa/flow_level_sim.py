@@ -0,0 +1,334 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import sys
+import math
+import exputil
+import networkx
+import os
+from solve_mmfa import solve_mmfa
+
+
+def read_ptop_topology(filename_ptop_topology):
+    """
+    Read the basic-sim point-to-point topology, of which every undirected edge
+    is a link in both directions with the same data rate.
+
+    :param filename_ptop_topology: Filename of the topology (e.g., ptop_topology.properties)
+
+    :return: NetworkX directional Graph (DiGraph) with capacity (Mbit/s) on each edge
+    """
+    ptop_config = exputil.PropertiesConfig(filename_ptop_topology)
+    num_nodes = exputil.parse_positive_int(ptop_config.get_property_or_fail("num_nodes"))
+    num_undirected_edges = exputil.parse_positive_int(ptop_config.get_property_or_fail("num_undirected_edges"))
+    data_rate_megabit_per_s = exputil.parse_positive_float(
+        ptop_config.get_property_or_fail("link_net_device_data_rate_megabit_per_s")
+    )
+
+    # undirected_edges=set(a-b,c-d,...)
+    undirected_edges_str = ptop_config.get_property_or_fail("undirected_edges")
+    if not undirected_edges_str.startswith("set(") or not undirected_edges_str.endswith(")"):
+        raise ValueError("Undirected edges must be a set(...): " + undirected_edges_str)
+    undirected_edges = []
+    for edge_str in undirected_edges_str[4:-1].split(","):
+        spl = edge_str.split("-")
+        if len(spl) != 2:
+            raise ValueError("Invalid undirected edge (incorrect 2-split): " + edge_str)
+        a = exputil.parse_positive_int(spl[0])
+        b = exputil.parse_positive_int(spl[1])
+        if a >= num_nodes or b >= num_nodes:
+            raise ValueError("Invalid node id in edge: " + edge_str)
+        if a == b:
+            raise ValueError("Self loops are not allowed: " + str(a))
+        undirected_edges.append((a, b))
+    if num_undirected_edges != len(undirected_edges):
+        raise ValueError(
+            "Number of undirected edges declared (%d) does not equal amount defined (%d)" %
+            (
+                num_undirected_edges,
+                len(undirected_edges)
+            )
+        )
+
+    # Create the graph
+    dir_graph = networkx.DiGraph()
+    for node_id in range(0, num_nodes):
+        dir_graph.add_node(node_id)
+    for a, b in undirected_edges:
+        dir_graph.add_edge(a, b, capacity=data_rate_megabit_per_s)
+        dir_graph.add_edge(b, a, capacity=data_rate_megabit_per_s)
+    return dir_graph
+
+
+def calculate_flow_path(dir_graph, from_node_id, to_node_id, flow_id, cache_shortest_paths):
+    """
+    Select the path of a flow among the equal-cost shortest paths between its endpoints,
+    which resembles ECMP routing in that each flow sticks to one path.
+
+    :param dir_graph:               Directed graph
+    :param from_node_id:            Source node id
+    :param to_node_id:              Destination node id
+    :param flow_id:                 Flow identifier
+    :param cache_shortest_paths:    Mapping of (from, to) to the sorted list of shortest paths (in/out)
+
+    :return: Path as a tuple of node ids
+    """
+    if (from_node_id, to_node_id) not in cache_shortest_paths:
+        cache_shortest_paths[(from_node_id, to_node_id)] = sorted(map(
+            tuple, networkx.all_shortest_paths(dir_graph, from_node_id, to_node_id)
+        ))
+    shortest_paths = cache_shortest_paths[(from_node_id, to_node_id)]
+    return shortest_paths[flow_id % len(shortest_paths)]
+
+
+def calculate_strict_priority_mmf_rates(dir_graph, list_flow_path_and_is_high_priority):
+    """
+    Calculate the rate of each flow: first the high priority flows are allocated the max-min
+    fair rates, after which the low priority flows are allocated the max-min fair rates
+    of the remainder capacity. Low priority flows which cross a link without remainder
+    capacity are allocated zero.
+
+    :param dir_graph:                               Directed graph with capacity on each edge
+    :param list_flow_path_and_is_high_priority:     List of (path, is high priority) for each flow
+
+    :return: List of the rate of each flow
+    """
+    rates = [0.0] * len(list_flow_path_and_is_high_priority)
+    remainder_graph = dir_graph
+    for is_high_priority in (True, False):
+        indices = []
+        for i, (path, flow_is_high_priority) in enumerate(list_flow_path_and_is_high_priority):
+            if flow_is_high_priority == is_high_priority and all(
+                remainder_graph.get_edge_data(path[j], path[j + 1])["capacity"] > 0
+                for j in range(len(path) - 1)
+            ):
+                indices.append(i)
+        if len(indices) == 0:
+            continue
+
+        flow_paths = [list_flow_path_and_is_high_priority[i][0] for i in indices]
+        flow_id_to_allocation = solve_mmfa(remainder_graph, flow_paths)
+        for k, i in enumerate(indices):
+            rates[i] = flow_id_to_allocation[k]
+
+        # Remainder capacity for the next priority (very small remainders due to rounding are discarded)
+        if is_high_priority:
+            remainder_graph = dir_graph.copy()
+            for k, path in enumerate(flow_paths):
+                for j in range(len(path) - 1):
+                    remainder_graph[path[j]][path[j + 1]]["capacity"] -= flow_id_to_allocation[k]
+            for a, b, data in remainder_graph.edges(data=True):
+                if data["capacity"] < dir_graph[a][b]["capacity"] * 1e-9:
+                    data["capacity"] = 0.0
+
+    return rates
+
+
+def simulate_flow_level(
+        dir_graph,
+        flow_schedule,
+        simulation_end_time_ns,
+        utilization_interval_ns
+):
+    """
+    Flow-level event-driven simulation: at each flow arrival and departure, the rate of all
+    active flows is recomputed as their (strict priority) max-min fair rate. Packet-level effects
+    (e.g., slow start, queueing delay, losses, propagation delay) are not modeled.
+
+    :param dir_graph:                   Directed graph with capacity (Mbit/s) on each edge
+    :param flow_schedule:               List of (flow id, from, to, size (byte), start time (ns),
+                                        is high priority), ordered by start time
+    :param simulation_end_time_ns:      Simulation end time (ns)
+    :param utilization_interval_ns:     Interval (ns) of the utilization tracking
+
+    :return: (
+                 list of (end time (ns), amount sent (byte), finished) for each flow,
+                 mapping of each directed edge to its list of busy time (ns) in each interval
+             )
+    """
+
+    # Flow paths
+    cache_shortest_paths = {}
+    flow_paths = []
+    for flow_id, from_node_id, to_node_id, _, _, _ in flow_schedule:
+        flow_paths.append(calculate_flow_path(dir_graph, from_node_id, to_node_id, flow_id, cache_shortest_paths))
+
+    # Utilization tracking
+    num_intervals = int(math.ceil(simulation_end_time_ns / float(utilization_interval_ns)))
+    edge_to_busy_time_ns = {}
+    for edge in dir_graph.edges:
+        edge_to_busy_time_ns[edge] = [0.0] * num_intervals
+
+    # Result of each flow
+    flow_results = [(simulation_end_time_ns, 0, "NO_ONGOING")] * len(flow_schedule)
+
+    # Event loop
+    t_ns = 0.0
+    next_arrival = 0
+    active_flow_to_remainder_byte = {}
+    while t_ns < simulation_end_time_ns:
+
+        # Arrivals at the current time
+        while next_arrival < len(flow_schedule) and flow_schedule[next_arrival][4] <= t_ns:
+            active_flow_to_remainder_byte[next_arrival] = float(flow_schedule[next_arrival][3])
+            next_arrival += 1
+
+        # Rates of the active flows (Mbit/s) in byte/ns
+        active_flows = sorted(active_flow_to_remainder_byte.keys())
+        rates_byte_per_ns = list(map(lambda x: x / 8000.0, calculate_strict_priority_mmf_rates(
+            dir_graph,
+            list(map(lambda x: (flow_paths[x], flow_schedule[x][5]), active_flows))
+        ))) if len(active_flows) > 0 else []
+
+        # Next event: arrival, departure or end of the simulation
+        next_t_ns = float(simulation_end_time_ns)
+        if next_arrival < len(flow_schedule):
+            next_t_ns = min(next_t_ns, float(flow_schedule[next_arrival][4]))
+        for i, flow in enumerate(active_flows):
+            if rates_byte_per_ns[i] > 0:
+                next_t_ns = min(next_t_ns, t_ns + active_flow_to_remainder_byte[flow] / rates_byte_per_ns[i])
+        duration_ns = next_t_ns - t_ns
+
+        # Busy time of each link in the utilization intervals the period overlaps with
+        edge_to_busy_fraction = {}
+        for i, flow in enumerate(active_flows):
+            path = flow_paths[flow]
+            for j in range(len(path) - 1):
+                edge = (path[j], path[j + 1])
+                edge_to_busy_fraction[edge] = (
+                    edge_to_busy_fraction.get(edge, 0.0)
+                    + rates_byte_per_ns[i] * 8000.0 / dir_graph[path[j]][path[j + 1]]["capacity"]
+                )
+        if len(edge_to_busy_fraction) > 0:
+            first_interval = int(t_ns // utilization_interval_ns)
+            last_interval = min(num_intervals - 1, int(next_t_ns // utilization_interval_ns))
+            for interval in range(first_interval, last_interval + 1):
+                overlap_ns = (
+                    min(next_t_ns, (interval + 1) * utilization_interval_ns)
+                    - max(t_ns, interval * utilization_interval_ns)
+                )
+                if overlap_ns > 0:
+                    for edge, busy_fraction in edge_to_busy_fraction.items():
+                        edge_to_busy_time_ns[edge][interval] += min(1.0, busy_fraction) * overlap_ns
+
+        # Progress the active flows, of which those which have (practically) nothing left depart
+        for i, flow in enumerate(active_flows):
+            active_flow_to_remainder_byte[flow] -= rates_byte_per_ns[i] * duration_ns
+            if active_flow_to_remainder_byte[flow] < 1e-3:
+                del active_flow_to_remainder_byte[flow]
+                end_time_ns = max(flow_schedule[flow][4], int(round(next_t_ns)))
+                flow_results[flow] = (end_time_ns, flow_schedule[flow][3], "YES")
+
+        t_ns = next_t_ns
+
+    # Flows which did not finish in time
+    for flow, remainder_byte in active_flow_to_remainder_byte.items():
+        flow_results[flow] = (
+            simulation_end_time_ns,
+            int(flow_schedule[flow][3] - math.ceil(remainder_byte)),
+            "NO_ONGOING"
+        )
+
+    return flow_results, edge_to_busy_time_ns
+
+
+def main_flow_level_sim(run_dir, logs_dir):
+
+    # Create logs directory if not already exists
+    os.makedirs(logs_dir, exist_ok=True)
+
+    # Finished: no
+    with open(logs_dir + "/finished.txt", "w+") as f_finished:
+        f_finished.write("No")
+
+    # Input
+    config = exputil.PropertiesConfig(run_dir + "/config_ns3.properties")
+    simulation_end_time_ns = exputil.parse_positive_int(config.get_property_or_fail("simulation_end_time_ns"))
+    utilization_interval_ns = exputil.parse_positive_int(
+        config.get_property_or_default("link_net_device_utilization_tracking_interval_ns", "100000000")
+    )
+    dir_graph = read_ptop_topology(run_dir + "/" + config.get_property_or_fail("topology_ptop_filename"))
+    schedule_columns = exputil.read_csv_direct_in_columns(
+        run_dir + "/" + config.get_property_or_fail("tcp_flow_schedule_filename"),
+        "idx_int,pos_int,pos_int,pos_int,pos_int,string,string"
+    )
+    flow_schedule = list(zip(
+        schedule_columns[0],
+        schedule_columns[1],
+        schedule_columns[2],
+        schedule_columns[3],
+        schedule_columns[4],
+        map(lambda x: x == "high", schedule_columns[5])
+    ))
+    for i in range(1, len(flow_schedule)):
+        if flow_schedule[i][4] < flow_schedule[i - 1][4]:
+            raise ValueError("Flow schedule is not ordered by start time at flow %d" % i)
+
+    # Simulate
+    flow_results, edge_to_busy_time_ns = simulate_flow_level(
+        dir_graph, flow_schedule, simulation_end_time_ns, utilization_interval_ns
+    )
+
+    # TCP flows in the same format as basic-sim
+    with open(logs_dir + "/tcp_flows.csv", "w+") as f_out:
+        for flow, (end_time_ns, amount_sent_byte, finished) in enumerate(flow_results):
+            flow_id, from_node_id, to_node_id, size_byte, start_time_ns, _ = flow_schedule[flow]
+            f_out.write("%d,%d,%d,%d,%d,%d,%d,%d,%s,%s\n" % (
+                flow_id, from_node_id, to_node_id, size_byte, start_time_ns, end_time_ns,
+                end_time_ns - start_time_ns, amount_sent_byte, finished, schedule_columns[6][flow]
+            ))
+
+    # Link utilization in the same format as basic-sim
+    with open(logs_dir + "/link_net_device_utilization.csv", "w+") as f_out:
+        for edge in sorted(edge_to_busy_time_ns.keys()):
+            for interval, busy_time_ns in enumerate(edge_to_busy_time_ns[edge]):
+                f_out.write("%d,%d,%d,%d,%d\n" % (
+                    edge[0], edge[1],
+                    interval * utilization_interval_ns,
+                    min(simulation_end_time_ns, (interval + 1) * utilization_interval_ns),
+                    int(round(busy_time_ns))
+                ))
+
+    # Finished: Yes
+    with open(logs_dir + "/finished.txt", "w+") as f_finished:
+        f_finished.write("Yes")
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) != 2:
+        print("Must supply exactly two arguments")
+        print("Usage: python3 flow_level_sim.py [run_dir] [logs_dir]")
+        print("")
+        print("     The run_dir must have a basic-sim config_ns3.properties, which refers to its")
+        print("     point-to-point topology and TCP flow schedule")
+        print("")
+        exit(1)
+    else:
+        main_flow_level_sim(
+            args[0],
+            args[1],
+        )
+
+
+if __name__ == "__main__":
+    main()
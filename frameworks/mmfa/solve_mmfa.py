@@ -184,34 +184,28 @@ def solve_mmfa(graph, flow_paths):
     if len(flow_paths) == 0:
         raise ValueError("There are no flows, as such there is no max-min fair allocation to solve.")
 
-    # For the algorithm
+    # Find all flows present on each link (in order of flow identifier), going over each path once
+    link_to_present_flows = {}
+    for flow_id, path in enumerate(flow_paths):
+        links_of_path = set()
+        for i in range(len(path) - 1):
+            assert(graph.has_edge(path[i], path[i + 1]))
+            links_of_path.add((path[i], path[i + 1]))
+        for link in links_of_path:
+            if link not in link_to_present_flows:
+                link_to_present_flows[link] = []
+            link_to_present_flows[link].append((flow_id, path))
+
+    # Only links with flows present are added to the list of links to tighten
     link_tightness_ordered = []
     link_to_num_fixed_flows = {}
-    link_to_present_flows = {}
     link_to_remainder_capacity = {}
     for link in graph.edges:
-
-        # Find all flows present on this link
-        present_flows = []
-        flow_id = 0
-        for path in flow_paths:
-            link_is_there = False
-            for i in range(len(path) - 1):
-                assert(graph.has_edge(path[i], path[i + 1]))
-                if path[i] == link[0] and path[i + 1] == link[1]:
-                    link_is_there = True
-                    break
-            if link_is_there:
-                present_flows.append((flow_id, path))
-            flow_id += 1
-
-        # Only if there are flows present, do we add them to the list of links to tighten
-        if len(present_flows) > 0:
+        if link in link_to_present_flows:
             link_to_num_fixed_flows[link] = 0
-            link_to_present_flows[link] = present_flows
             link_to_remainder_capacity[link] = graph.get_edge_data(link[0], link[1])["capacity"]
             link_tightness_ordered.append(
-                (calculate_tightness(link_to_remainder_capacity[link], len(present_flows), 0), link)
+                (calculate_tightness(link_to_remainder_capacity[link], len(link_to_present_flows[link]), 0), link)
             )
 
     # Final result
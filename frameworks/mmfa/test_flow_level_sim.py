@@ -0,0 +1,123 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2021 ETH Zurich
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import os
+from flow_level_sim import main_flow_level_sim
+
+
+def get_resulting_tcp_flows(simulation_end_time_ns, tcp_flow_schedule_content):
+
+    # Write input: two nodes connected by a 8 Mbit/s (= 0.001 byte/ns) link
+    os.makedirs("temp-run", exist_ok=True)
+    with open("temp-run/config_ns3.properties", "w+") as f_out:
+        f_out.write(
+            "simulation_end_time_ns=%d\n"
+            "topology_ptop_filename=\"ptop_topology.properties\"\n"
+            "link_net_device_utilization_tracking_interval_ns=1000000\n"
+            "tcp_flow_schedule_filename=\"tcp_flow_schedule.csv\"\n" % simulation_end_time_ns
+        )
+    with open("temp-run/ptop_topology.properties", "w+") as f_out:
+        f_out.write(
+            "num_nodes=2\n"
+            "num_undirected_edges=1\n"
+            "undirected_edges=set(0-1)\n"
+            "link_net_device_data_rate_megabit_per_s=8.0\n"
+        )
+    with open("temp-run/tcp_flow_schedule.csv", "w+") as f_out:
+        f_out.write(tcp_flow_schedule_content)
+
+    # Simulate
+    main_flow_level_sim("temp-run", "temp-run/logs")
+
+    # Read result
+    tcp_flows = []
+    with open("temp-run/logs/tcp_flows.csv", "r") as f_in:
+        for line in f_in:
+            spl = line.strip().split(",")
+            tcp_flows.append((int(spl[5]), int(spl[6]), int(spl[7]), spl[8]))
+    with open("temp-run/logs/link_net_device_utilization.csv", "r") as f_in:
+        utilization = list(map(lambda x: tuple(map(int, x.strip().split(","))), f_in.readlines()))
+
+    # Clean up
+    for filename in ["finished.txt", "tcp_flows.csv", "link_net_device_utilization.csv"]:
+        os.remove("temp-run/logs/" + filename)
+    os.removedirs("temp-run/logs")
+    for filename in ["config_ns3.properties", "ptop_topology.properties", "tcp_flow_schedule.csv"]:
+        os.remove("temp-run/" + filename)
+    os.removedirs("temp-run")
+
+    return tcp_flows, utilization
+
+
+class TestFlowLevelSim(unittest.TestCase):
+
+    def test_one(self):
+        tcp_flows, utilization = get_resulting_tcp_flows(
+            3000000,
+            "0,0,1,1000,0,low,\n"
+        )
+        self.assertEqual(tcp_flows, [(1000000, 1000000, 1000, "YES")])
+        self.assertIn((0, 1, 0, 1000000, 1000000), utilization)
+        self.assertIn((0, 1, 1000000, 2000000, 0), utilization)
+        self.assertIn((1, 0, 0, 1000000, 0), utilization)
+
+    def test_fair_share(self):
+        tcp_flows, _ = get_resulting_tcp_flows(
+            10000000,
+            "0,0,1,1000,0,low,\n"
+            "1,0,1,1000,500000,low,\n"
+        )
+        # First alone for 500 byte, then both at half the rate for 1000 us
+        self.assertEqual(tcp_flows[0], (1500000, 1500000, 1000, "YES"))
+        self.assertEqual(tcp_flows[1], (2000000, 1500000, 1000, "YES"))
+
+    def test_opposite_directions(self):
+        tcp_flows, _ = get_resulting_tcp_flows(
+            10000000,
+            "0,0,1,1000,0,low,\n"
+            "1,1,0,1000,0,low,\n"
+        )
+        self.assertEqual(tcp_flows[0], (1000000, 1000000, 1000, "YES"))
+        self.assertEqual(tcp_flows[1], (1000000, 1000000, 1000, "YES"))
+
+    def test_strict_priority(self):
+        tcp_flows, _ = get_resulting_tcp_flows(
+            10000000,
+            "0,0,1,1000,0,low,\n"
+            "1,0,1,1000,0,high,\n"
+        )
+        self.assertEqual(tcp_flows[0], (2000000, 2000000, 1000, "YES"))
+        self.assertEqual(tcp_flows[1], (1000000, 1000000, 1000, "YES"))
+
+    def test_not_finished(self):
+        tcp_flows, _ = get_resulting_tcp_flows(
+            1000000,
+            "0,0,1,1000,0,low,\n"
+            "1,0,1,1000,0,low,\n"
+        )
+        self.assertEqual(tcp_flows[0], (1000000, 1000000, 500, "NO_ONGOING"))
+        self.assertEqual(tcp_flows[1], (1000000, 1000000, 500, "NO_ONGOING"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,28 +10,20 @@ if [[ "$#" -ne 0  ]]; then
   exit 1
 fi
 
+# The LaTeX source files which include ExperimenTeX are defined in tex_files.sh
+source tex_files.sh || exit 1
+
 echo "REPRODUCING..."
 echo ""
 
-echo "(Step 1/5) Building..."
-bash step_1_build.sh || { echo "Build unsuccessful." 1>&2 ; exit 1; }
-echo "(Step 1/5) Build is completed."
-
-echo "(Step 2/5) Interpreting ExperimenTeX..."
-bash step_2_interpret.sh || { echo "Interpreting ExperimenTeX failed." 1>&2 ; exit 1; }
-echo "(Step 2/5) Paper ExperimenTeX is interpreted into runs."
-
-echo "(Step 3/5) Executing runs..."
-bash step_3_run.sh || { echo "Running failed." 1>&2 ; exit 1; }
-echo "(Step 3/5) Runs are executed."
-
-echo "(Step 4/5) Performing plotting..."
-bash step_4_plot.sh || { echo "Plotting failed." 1>&2 ; exit 1; }
-echo "(Step 4/5) Plots are made."
-
-echo "(Step 5/5) Generating final PDF from LaTeX..."
-bash step_5_pdf.sh || { echo "Generating final PDF failed." 1>&2 ; exit 1; }
-echo "(Step 5/5) Final PDF is generated."
+# The five steps (build, interpret, run, plot, pdf) are performed by a
+# dependency-graph build driver, which only rebuilds what is stale
+# since the previous time (recorded in temp/make-state.txt)
+echo "Building, interpreting, running, plotting and generating the final PDF (only what is stale)..."
+cd experimentex || exit 1
+python3 make.py ${tex_source_files_list_with_prefix[@]} || { echo "Reproducing failed." 1>&2 ; exit 1; }
+cd .. || exit 1
+echo "All steps are completed."
 
 echo ""
 echo "Paper has been reproduced."
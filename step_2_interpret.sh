@@ -1,15 +1,5 @@
 #!/bin/bash
 
-# Below you must define the list of all LaTeX
-# source files which include ExperimenTeX.
-
-tex_source_files_list=(
-  "paper-latex/02-example.tex"
-  "paper-latex/05-cc-showcase.tex"
-  "paper-latex/06-netload-showcase.tex"
-  "paper-latex/07-toplists-showcase.tex"
-)
-
 ######################################################################
 ######################################################################
 ######################################################################
@@ -17,12 +7,9 @@ tex_source_files_list=(
 ######################################################################
 # YOU SHOULD NOT NEED TO EDIT BELOW
 
-tex_source_files_list_with_prefix=()
-for i in ${tex_source_files_list[@]}
-do
-  tex_source_files_list_with_prefix+="../${i} "
-done
+# The LaTeX source files which include ExperimenTeX are defined in tex_files.sh
+source tex_files.sh || exit 1
 
 cd experimentex || exit 1
-python3 interpret.py ${tex_source_files_list_with_prefix[@]} || exit 1
+python3 interpret.py "$@" ${tex_source_files_list_with_prefix[@]} || exit 1
 cd .. || exit 1
@@ -1,21 +1,22 @@
 #!/bin/bash
 
-# YOU SHOULD NOT NEED TO EDIT THIS FILE UNLESS YOU HAVE A MORE SOPHISTICATED
+######################################################################
+######################################################################
+######################################################################
+######################################################################
+######################################################################
+# YOU SHOULD NOT NEED TO EDIT BELOW UNLESS YOU HAVE A MORE SOPHISTICATED
 # WAY OF PERFORMING THE RUNS
 
-# In this step, we go over all the run directories and execute the run.sh
-# executable in it to run. Of course, this could also be done in parallel,
-# or with a job scheduler. We trust that the run.sh if it has already been
-# run just simply exit(0) instead of rerunning itself.
+# In this step, we go over all the run directories (or, if --only <glob>
+# is given, only those needed by the selected experiment instances) and
+# execute the run.sh executable in it to run. Of course, this could also be
+# done in parallel, or with a job scheduler. We trust that the run.sh if it
+# has already been run just simply exit(0) instead of rerunning itself.
 
-for run_dir in temp/runs/*/ ; do
-    if test -f "${run_dir}run.sh"; then
-       echo "Running: ${run_dir}" || exit 1
-       cd ${run_dir} || exit 1
-       bash run.sh || exit 1
-       cd ../../.. || exit 1
-    else
-       echo "Directory in temp/runs does not have a run.sh: ${run_dir}" || exit 1
-       exit 1
-    fi
-done
+# The LaTeX source files which include ExperimenTeX are defined in tex_files.sh
+source tex_files.sh || exit 1
+
+cd experimentex || exit 1
+python3 run.py "$@" ${tex_source_files_list_with_prefix[@]} || exit 1
+cd .. || exit 1